@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'drf_yasg',
     'django_filters',
+    'channels',
     
     # Local apps
     'users',
@@ -89,6 +90,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'alistpros.wsgi.application'
+ASGI_APPLICATION = 'alistpros.asgi.application'
 
 
 # Database
@@ -118,6 +120,61 @@ else:
     }
 
 
+# Redis, shared by the channel layer and other services when configured
+REDIS_URL = config('REDIS_URL', default='')
+
+# Cache: Redis when configured, otherwise per-process memory
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Channel layer for WebSocket events: Redis in production, in-memory for a
+# single development process
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+
+# Background tasks run in an in-process thread pool after commit; set
+# BACKGROUND_TASKS_EAGER to run them inline instead (tests, scripts)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=4, cast=int)
+
+
+# Password hashing: PBKDF2 at PASSWORD_HASH_ITERATIONS, the first hasher,
+# also handles existing pbkdf2_sha256 hashes and rehashes those with another
+# iteration count at the next login
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=600000, cast=int)
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -163,9 +220,76 @@ DEFAULT_FROM_EMAIL = 'noreply@alistpros.com'
 SITE_URL = config('SITE_URL', default='http://localhost:8000')
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
 
+# Transactional emails are queued in the outbox and sent by the
+# send_queued_emails worker, EMAIL_OUTBOX_BATCH_SIZE per SMTP connection;
+# failed sends are retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubling
+# each time, up to EMAIL_OUTBOX_MAX_ATTEMPTS attempts
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)
+
+# 'signed' email verification tokens need no table; 'stored' keeps them in
+# the EmailVerification table
+EMAIL_VERIFICATION_MODE = config('EMAIL_VERIFICATION_MODE', default='signed')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# File storage: S3 via django-storages when a bucket is configured, otherwise
+# the local filesystem under MEDIA_ROOT
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='')
+if AWS_STORAGE_BUCKET_NAME:
+    AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default=None)
+    AWS_S3_CUSTOM_DOMAIN = config('AWS_S3_CUSTOM_DOMAIN', default=None)
+    AWS_DEFAULT_ACL = None
+    AWS_S3_FILE_OVERWRITE = False
+    DEFAULT_STORAGE_BACKEND = 'storages.backends.s3boto3.S3Boto3Storage'
+else:
+    DEFAULT_STORAGE_BACKEND = 'django.core.files.storage.FileSystemStorage'
+
+STORAGES = {
+    'default': {'BACKEND': DEFAULT_STORAGE_BACKEND},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Message attachments are uploaded in chunks of at most ATTACHMENT_CHUNK_SIZE
+ATTACHMENT_MAX_SIZE = config('ATTACHMENT_MAX_SIZE', default=25 * 1024 * 1024, cast=int)
+ATTACHMENT_CHUNK_SIZE = config('ATTACHMENT_CHUNK_SIZE', default=5 * 1024 * 1024, cast=int)
+
+# Admin broadcasts insert notifications BROADCAST_CHUNK_SIZE at a time,
+# pausing BROADCAST_CHUNK_DELAY seconds between chunks
+BROADCAST_CHUNK_SIZE = config('BROADCAST_CHUNK_SIZE', default=1000, cast=int)
+BROADCAST_CHUNK_DELAY = config('BROADCAST_CHUNK_DELAY', default=0.2, cast=float)
+
+# Templated notifications are sent per channel in batches of
+# NOTIFICATION_BATCH_SIZE; failed sends are retried after
+# NOTIFICATION_RETRY_DELAY seconds, doubling each time, up to
+# NOTIFICATION_MAX_ATTEMPTS attempts
+NOTIFICATION_BATCH_SIZE = config('NOTIFICATION_BATCH_SIZE', default=100, cast=int)
+NOTIFICATION_MAX_ATTEMPTS = config('NOTIFICATION_MAX_ATTEMPTS', default=5, cast=int)
+NOTIFICATION_RETRY_DELAY = config('NOTIFICATION_RETRY_DELAY', default=60, cast=int)
+NOTIFICATION_TRANSPORTS = {
+    'in_app': 'notifications.transports.InAppTransport',
+    'email': 'notifications.transports.EmailTransport',
+    'sms': 'notifications.transports.LocalStubTransport',
+    'push': 'notifications.transports.LocalStubTransport',
+}
+
+# Sliding-window limits per user role ('default' for unlisted roles, None
+# for no limit) on sending messages to one conversation and on starting
+# conversations
+MESSAGING_RATE_LIMITS = {
+    'message': {
+        'default': config('MESSAGE_RATE_LIMIT', default='30/min'),
+        'admin': None,
+    },
+    'conversation': {
+        'default': config('CONVERSATION_RATE_LIMIT', default='20/hour'),
+        'contractor': config('CONTRACTOR_CONVERSATION_RATE_LIMIT', default='60/hour'),
+        'admin': None,
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import DashboardStat, ContractorStat, ServiceCategoryStat, UserActivity, SearchQuery
+from .models import (
+    DashboardStat, ContractorStat, ServiceCategoryStat, UserActivity, SearchQuery,
+    DemandHeatmap, CapacityForecast
+)
 
 
 @admin.register(DashboardStat)
@@ -47,3 +50,19 @@ class SearchQueryAdmin(admin.ModelAdmin):
     def query_preview(self, obj):
         return obj.query[:50] + '...' if len(obj.query) > 50 else obj.query
     query_preview.short_description = 'Query'
+
+
+@admin.register(DemandHeatmap)
+class DemandHeatmapAdmin(admin.ModelAdmin):
+    list_display = ['id', 'service_category', 'zip_prefix', 'period_start', 'period_end', 'appointment_count']
+    list_filter = ['service_category']
+    search_fields = ['service_category__name', 'zip_prefix']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(CapacityForecast)
+class CapacityForecastAdmin(admin.ModelAdmin):
+    list_display = ['id', 'service_category', 'zip_prefix', 'week_start', 'forecast_appointments', 'supply_hours', 'utilization']
+    list_filter = ['week_start', 'service_category']
+    search_fields = ['service_category__name', 'zip_prefix']
+    readonly_fields = ['created_at', 'updated_at']
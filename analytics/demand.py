@@ -0,0 +1,266 @@
+"""
+Demand heatmaps and capacity forecasts for service categories and ZIP areas.
+
+Appointments are streamed with values_list() in chunks and binned with NumPy
+into day-of-week x hour heatmaps and weekly series per (service category,
+ZIP prefix). The demand forecast is a linear trend fitted to the recent
+weekly series, scaled by a yearly seasonal index: how busy the forecast weeks
+were a year ago relative to the weeks matching the history window. The
+day-of-week and hour profile is the heatmap itself. Forecast demand is
+compared with the weekly hours contractors in the same category and area make
+available through their availability slots.
+The results are written to DemandHeatmap and CapacityForecast so the admin
+endpoints only read precomputed rows.
+"""
+import re
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from contractors.models import ContractorProfile
+from core.models import Address
+from scheduling.models import Appointment, AppointmentStatus, AvailabilitySlot
+from .models import DemandHeatmap, CapacityForecast
+
+ZIP_RE = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+HOURS_PER_WEEK = 7 * 24
+EPOCH_WEEKDAY_OFFSET = 3  # 1970-01-01 was a Thursday
+SEASON_WEEKS = 52
+
+
+def zip_prefix(text):
+    """Return the first three digits of the last ZIP code in text, or ''."""
+    matches = ZIP_RE.findall(text or '')
+    return matches[-1][:3] if matches else ''
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def load_demand_arrays(period_start, period_end, chunk_size=5000, zip_index=None):
+    """
+    Stream appointments in a period into NumPy arrays.
+
+    Args:
+        period_start: First day to load.
+        period_end: Last day to load.
+        chunk_size: How many appointment rows to fetch per round trip.
+        zip_index: Optional dict mapping ZIP prefixes to indexes, shared
+            between calls so arrays from different periods line up.
+
+    Returns:
+        tuple: (arrays, zip_prefixes) where arrays maps 'category', 'zip',
+        'day', 'hour' and 'minutes' to equal-length int64 arrays (day is
+        days since the epoch) and zip_prefixes lists the prefix for each
+        zip index.
+    """
+    rows = Appointment.objects.filter(
+        appointment_date__range=(period_start, period_end),
+        service_category__isnull=False
+    ).exclude(
+        status=AppointmentStatus.CANCELLED
+    ).values_list(
+        'service_category_id', 'location', 'appointment_date', 'start_time', 'end_time'
+    ).order_by().iterator(chunk_size=chunk_size)
+
+    if zip_index is None:
+        zip_index = {}
+    columns = {'category': [], 'zip': [], 'day': [], 'hour': [], 'minutes': []}
+
+    def flush(chunk):
+        count = len(chunk)
+        starts = np.fromiter((row[3].hour * 60 + row[3].minute for row in chunk), dtype=np.int64, count=count)
+        ends = np.fromiter((row[4].hour * 60 + row[4].minute for row in chunk), dtype=np.int64, count=count)
+        columns['category'].append(np.fromiter((row[0] for row in chunk), dtype=np.int64, count=count))
+        columns['zip'].append(np.fromiter(
+            (zip_index.setdefault(zip_prefix(row[1]), len(zip_index)) for row in chunk),
+            dtype=np.int64, count=count
+        ))
+        columns['day'].append(np.array([row[2] for row in chunk], dtype='datetime64[D]').astype(np.int64))
+        columns['hour'].append(starts // 60)
+        columns['minutes'].append(np.clip(ends - starts, 0, None))
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    arrays = {
+        name: np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        for name, parts in columns.items()
+    }
+    zip_prefixes = sorted(zip_index, key=zip_index.get)
+    return arrays, zip_prefixes
+
+
+def weekly_supply_hours():
+    """
+    Return weekly available hours per (service category id, ZIP prefix).
+
+    A contractor's area comes from their primary address (or any address if
+    none is primary). Their slot hours count towards every category they offer.
+    """
+    contractor_zip = {}
+    addresses = Address.objects.filter(
+        user__contractor_profile__isnull=False
+    ).values_list('user__contractor_profile', 'zip_code', 'is_primary').order_by('is_primary')
+    for contractor_id, zip_code, is_primary in addresses.iterator():
+        # Primary addresses sort last and win
+        contractor_zip[contractor_id] = (zip_code or '')[:3]
+
+    contractor_hours = {}
+    slots = AvailabilitySlot.objects.values_list(
+        'contractor_id', 'start_time', 'end_time'
+    ).order_by().iterator(chunk_size=5000)
+    for contractor_id, start, end in slots:
+        minutes = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
+        if minutes > 0:
+            contractor_hours[contractor_id] = contractor_hours.get(contractor_id, 0) + minutes / 60
+
+    supply = {}
+    links = ContractorProfile.service_categories.through.objects.values_list(
+        'contractorprofile_id', 'servicecategory_id'
+    ).iterator()
+    for contractor_id, category_id in links:
+        hours = contractor_hours.get(contractor_id)
+        if hours:
+            key = (category_id, contractor_zip.get(contractor_id, ''))
+            supply[key] = supply.get(key, 0) + hours
+    return supply
+
+
+def rebuild_demand_tables(history_weeks=12, forecast_weeks=4, chunk_size=5000):
+    """
+    Recompute the demand heatmaps and capacity forecasts.
+
+    Args:
+        history_weeks: How many complete weeks of appointments to analyse.
+        forecast_weeks: How many weeks ahead to forecast.
+        chunk_size: How many appointment rows to fetch per round trip.
+
+    Returns:
+        dict: Counts of the rows written and the period analysed.
+    """
+    current_week = week_start(timezone.now().date())
+    period_start = current_week - timedelta(weeks=history_weeks)
+    period_end = current_week - timedelta(days=1)
+
+    # The same weeks a year earlier, followed by the weeks being forecast
+    season_start = period_start - timedelta(weeks=SEASON_WEEKS)
+    season_weeks = history_weeks + forecast_weeks
+    season_end = season_start + timedelta(weeks=season_weeks, days=-1)
+
+    zip_index = {}
+    arrays, _ = load_demand_arrays(period_start, period_end, chunk_size, zip_index)
+    last_year, zip_prefixes = load_demand_arrays(season_start, season_end, chunk_size, zip_index)
+    appointment_total = len(arrays['category'])
+
+    group_keys = arrays['category'] * max(len(zip_prefixes), 1) + arrays['zip']
+    groups, group_index = np.unique(group_keys, return_inverse=True)
+    group_count = len(groups)
+
+    # Last year's rows for areas with no recent demand are dropped
+    last_year_keys = last_year['category'] * max(len(zip_prefixes), 1) + last_year['zip']
+    last_year_index = np.searchsorted(groups, last_year_keys)
+    in_groups = last_year_index < group_count
+    in_groups[in_groups] = groups[last_year_index[in_groups]] == last_year_keys[in_groups]
+    last_year_week = (last_year['day'] - np.datetime64(season_start, 'D').astype(np.int64)) // 7
+
+    weekday = (arrays['day'] + EPOCH_WEEKDAY_OFFSET) % 7
+    week = (arrays['day'] - np.datetime64(period_start, 'D').astype(np.int64)) // 7
+
+    heatmaps = np.bincount(
+        group_index * HOURS_PER_WEEK + weekday * 24 + arrays['hour'],
+        minlength=group_count * HOURS_PER_WEEK
+    ).reshape(group_count, 7, 24)
+    weekly = np.bincount(
+        group_index * history_weeks + week,
+        minlength=group_count * history_weeks
+    ).reshape(group_count, history_weeks)
+    counts = np.bincount(group_index, minlength=group_count)
+    minutes = np.bincount(group_index, weights=arrays['minutes'], minlength=group_count)
+    seasonal_weekly = np.bincount(
+        last_year_index[in_groups] * season_weeks + last_year_week[in_groups],
+        minlength=group_count * season_weeks
+    ).reshape(group_count, season_weeks)
+
+    # Linear trend per group, fitted to all weekly series at once
+    if group_count and history_weeks > 1:
+        slope, intercept = np.polyfit(np.arange(history_weeks), weekly.T.astype(float), 1)
+    else:
+        slope = np.zeros(group_count)
+        intercept = weekly.mean(axis=1) if group_count else np.zeros(0)
+    future = np.arange(history_weeks, history_weeks + forecast_weeks)
+    trend = intercept[:, None] + slope[:, None] * future[None, :]
+
+    # Yearly seasonal index; areas without last year's data keep the plain trend
+    baseline = seasonal_weekly[:, :history_weeks].mean(axis=1)[:, None]
+    seasonal_index = np.divide(
+        seasonal_weekly[:, history_weeks:], baseline,
+        out=np.ones((group_count, forecast_weeks)), where=baseline > 0
+    )
+    forecast = np.clip(trend * seasonal_index, 0, None)
+    average_hours = np.divide(minutes, counts, out=np.zeros(group_count), where=counts > 0) / 60
+
+    demand_keys = []
+    heatmap_rows = []
+    for position, key in enumerate(groups.tolist()):
+        category_id, zip_position = divmod(key, max(len(zip_prefixes), 1))
+        prefix = zip_prefixes[zip_position] if zip_prefixes else ''
+        demand_keys.append((category_id, prefix))
+        heatmap_rows.append(DemandHeatmap(
+            service_category_id=category_id,
+            zip_prefix=prefix,
+            period_start=period_start,
+            period_end=period_end,
+            appointment_count=int(counts[position]),
+            cells=heatmaps[position].tolist(),
+        ))
+
+    supply = weekly_supply_hours()
+    forecast_rows = []
+    for position, (category_id, prefix) in enumerate(demand_keys):
+        supply_hours = supply.pop((category_id, prefix), 0)
+        for offset in range(forecast_weeks):
+            appointments = float(forecast[position, offset])
+            hours = appointments * float(average_hours[position])
+            forecast_rows.append(CapacityForecast(
+                service_category_id=category_id,
+                zip_prefix=prefix,
+                week_start=current_week + timedelta(weeks=offset),
+                forecast_appointments=round(appointments, 2),
+                forecast_hours=round(hours, 2),
+                supply_hours=round(supply_hours, 2),
+                utilization=round(hours / supply_hours, 3) if supply_hours else None,
+            ))
+    # Areas with supply but no recent demand still get a forecast of zero
+    for (category_id, prefix), supply_hours in supply.items():
+        for offset in range(forecast_weeks):
+            forecast_rows.append(CapacityForecast(
+                service_category_id=category_id,
+                zip_prefix=prefix,
+                week_start=current_week + timedelta(weeks=offset),
+                supply_hours=round(supply_hours, 2),
+                utilization=0,
+            ))
+
+    with transaction.atomic():
+        DemandHeatmap.objects.all().delete()
+        CapacityForecast.objects.all().delete()
+        DemandHeatmap.objects.bulk_create(heatmap_rows, batch_size=1000)
+        CapacityForecast.objects.bulk_create(forecast_rows, batch_size=1000)
+
+    return {
+        'period_start': period_start,
+        'period_end': period_end,
+        'appointments': appointment_total,
+        'heatmaps': len(heatmap_rows),
+        'forecasts': len(forecast_rows),
+    }
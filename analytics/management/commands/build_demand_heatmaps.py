@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from analytics.demand import rebuild_demand_tables
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds demand heatmaps and capacity forecasts per service category and ZIP area'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history-weeks',
+            type=int,
+            default=12,
+            help='Number of complete weeks of appointments to analyse'
+        )
+        parser.add_argument(
+            '--forecast-weeks',
+            type=int,
+            default=4,
+            help='Number of weeks ahead to forecast'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of appointment rows fetched per round trip'
+        )
+
+    def handle(self, *args, **options):
+        result = rebuild_demand_tables(
+            history_weeks=options['history_weeks'],
+            forecast_weeks=options['forecast_weeks'],
+            chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Analysed {result['appointments']} appointments from {result['period_start']} to "
+            f"{result['period_end']}: {result['heatmaps']} heatmaps, {result['forecasts']} forecast rows"
+        ))
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contractors', '0002_initial'),
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandHeatmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('zip_prefix', models.CharField(blank=True, help_text='First three digits of the ZIP code, blank when the location has none', max_length=3)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('appointment_count', models.IntegerField(default=0)),
+                ('cells', models.JSONField(default=list, help_text='7 rows (Monday first) of 24 hourly appointment counts')),
+                ('service_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_heatmaps', to='contractors.servicecategory')),
+            ],
+            options={
+                'ordering': ['service_category', 'zip_prefix'],
+                'unique_together': {('service_category', 'zip_prefix')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CapacityForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('zip_prefix', models.CharField(blank=True, max_length=3)),
+                ('week_start', models.DateField()),
+                ('forecast_appointments', models.FloatField(default=0)),
+                ('forecast_hours', models.FloatField(default=0)),
+                ('supply_hours', models.FloatField(default=0)),
+                ('utilization', models.FloatField(blank=True, help_text='Forecast hours divided by supply hours, empty when there is no supply', null=True)),
+                ('service_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capacity_forecasts', to='contractors.servicecategory')),
+            ],
+            options={
+                'ordering': ['week_start', 'service_category', 'zip_prefix'],
+                'unique_together': {('service_category', 'zip_prefix', 'week_start')},
+            },
+        ),
+    ]
@@ -103,3 +103,57 @@ class SearchQuery(TimeStampedModel):
     
     def __str__(self):
         return f"Search: {self.query[:30]}... ({self.results_count} results)"
+
+
+class DemandHeatmap(TimeStampedModel):
+    """Precomputed day-of-week x hour appointment demand for a service category and ZIP area"""
+    service_category = models.ForeignKey(
+        ServiceCategory,
+        on_delete=models.CASCADE,
+        related_name='demand_heatmaps'
+    )
+    zip_prefix = models.CharField(
+        max_length=3,
+        blank=True,
+        help_text='First three digits of the ZIP code, blank when the location has none'
+    )
+    period_start = models.DateField()
+    period_end = models.DateField()
+    appointment_count = models.IntegerField(default=0)
+    cells = models.JSONField(
+        default=list,
+        help_text='7 rows (Monday first) of 24 hourly appointment counts'
+    )
+    
+    class Meta:
+        ordering = ['service_category', 'zip_prefix']
+        unique_together = ['service_category', 'zip_prefix']
+    
+    def __str__(self):
+        return f"Demand for {self.service_category.name} in {self.zip_prefix or 'unknown area'}"
+
+
+class CapacityForecast(TimeStampedModel):
+    """Forecast weekly demand against contractor supply for a service category and ZIP area"""
+    service_category = models.ForeignKey(
+        ServiceCategory,
+        on_delete=models.CASCADE,
+        related_name='capacity_forecasts'
+    )
+    zip_prefix = models.CharField(max_length=3, blank=True)
+    week_start = models.DateField()
+    forecast_appointments = models.FloatField(default=0)
+    forecast_hours = models.FloatField(default=0)
+    supply_hours = models.FloatField(default=0)
+    utilization = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='Forecast hours divided by supply hours, empty when there is no supply'
+    )
+    
+    class Meta:
+        ordering = ['week_start', 'service_category', 'zip_prefix']
+        unique_together = ['service_category', 'zip_prefix', 'week_start']
+    
+    def __str__(self):
+        return f"Forecast for {self.service_category.name} in {self.zip_prefix or 'unknown area'} week of {self.week_start}"
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import DashboardStat, ContractorStat, ServiceCategoryStat, UserActivity, SearchQuery
+from .models import (
+    DashboardStat, ContractorStat, ServiceCategoryStat, UserActivity, SearchQuery,
+    DemandHeatmap, CapacityForecast
+)
 
 
 class DashboardStatSerializer(serializers.ModelSerializer):
@@ -55,3 +58,29 @@ class SearchQuerySerializer(serializers.ModelSerializer):
             'id', 'user', 'query', 'filters', 'results_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class DemandHeatmapSerializer(serializers.ModelSerializer):
+    """Serializer for precomputed demand heatmaps"""
+    service_category_name = serializers.CharField(source='service_category.name', read_only=True)
+    
+    class Meta:
+        model = DemandHeatmap
+        fields = [
+            'id', 'service_category', 'service_category_name', 'zip_prefix',
+            'period_start', 'period_end', 'appointment_count', 'cells', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class CapacityForecastSerializer(serializers.ModelSerializer):
+    """Serializer for weekly capacity forecasts"""
+    service_category_name = serializers.CharField(source='service_category.name', read_only=True)
+    
+    class Meta:
+        model = CapacityForecast
+        fields = [
+            'id', 'service_category', 'service_category_name', 'zip_prefix', 'week_start',
+            'forecast_appointments', 'forecast_hours', 'supply_hours', 'utilization', 'updated_at'
+        ]
+        read_only_fields = fields
@@ -1,18 +1,24 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.db.models import Sum, Avg, Count
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import get_user_model
 
-from .models import DashboardStat, ContractorStat, ServiceCategoryStat, UserActivity, SearchQuery
+from .models import (
+    DashboardStat, ContractorStat, ServiceCategoryStat, UserActivity, SearchQuery,
+    DemandHeatmap, CapacityForecast
+)
 from .serializers import (
     DashboardStatSerializer,
     ContractorStatSerializer,
     ServiceCategoryStatSerializer,
     UserActivitySerializer,
-    SearchQuerySerializer
+    SearchQuerySerializer,
+    DemandHeatmapSerializer,
+    CapacityForecastSerializer
 )
 from users.permissions import IsAdmin
 from contractors.models import ContractorProfile, ServiceCategory
@@ -285,3 +291,44 @@ class AnalyticsDashboardViewSet(viewsets.ViewSet):
             'upcoming_appointments': upcoming_appointments_data,
             'recent_contractors': recent_contractors_data
         })
+
+    
+    def filter_by_area(self, queryset, request):
+        """Apply the optional service_category and zip_prefix query parameters"""
+        service_category = request.query_params.get('service_category')
+        zip_prefix = request.query_params.get('zip_prefix')
+        if service_category:
+            if not service_category.isdigit():
+                raise ValidationError({'service_category': 'A valid service category id is required.'})
+            queryset = queryset.filter(service_category_id=int(service_category))
+        if zip_prefix is not None:
+            queryset = queryset.filter(zip_prefix=zip_prefix[:3])
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def demand_heatmap(self, request):
+        """Get precomputed day-of-week x hour demand per service category and ZIP area"""
+        if not request.user.is_admin:
+            return Response(
+                {'detail': 'You do not have permission to view platform statistics.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        heatmaps = self.filter_by_area(
+            DemandHeatmap.objects.select_related('service_category'), request
+        )
+        return Response(DemandHeatmapSerializer(heatmaps, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def capacity_forecast(self, request):
+        """Get the precomputed weekly demand forecast against contractor supply"""
+        if not request.user.is_admin:
+            return Response(
+                {'detail': 'You do not have permission to view platform statistics.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        forecasts = self.filter_by_area(
+            CapacityForecast.objects.select_related('service_category'), request
+        )
+        return Response(CapacityForecastSerializer(forecasts, many=True).data)
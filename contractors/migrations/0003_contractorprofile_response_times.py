@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contractors', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractorprofile',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='contractorprofile',
+            name='response_time_median',
+            field=models.FloatField(blank=True, db_index=True, help_text='Median first-response time to client messages, in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='contractorprofile',
+            name='response_time_p90',
+            field=models.FloatField(blank=True, help_text='90th percentile first-response time to client messages, in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='contractorprofile',
+            name='response_time_sketch',
+            field=models.JSONField(blank=True, default=dict, help_text='Streaming quantile state behind the response time figures'),
+        ),
+    ]
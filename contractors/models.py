@@ -31,6 +31,19 @@ class ContractorProfile(TimeStampedModel):
     profile_image = models.ImageField(upload_to='contractor_profiles/', blank=True, null=True)
     is_onboarded = models.BooleanField(default=False)
     service_categories = models.ManyToManyField(ServiceCategory, related_name='contractors')
+    response_time_median = models.FloatField(
+        null=True, blank=True, db_index=True,
+        help_text='Median first-response time to client messages, in seconds'
+    )
+    response_time_p90 = models.FloatField(
+        null=True, blank=True,
+        help_text='90th percentile first-response time to client messages, in seconds'
+    )
+    response_count = models.PositiveIntegerField(default=0)
+    response_time_sketch = models.JSONField(
+        default=dict, blank=True,
+        help_text='Streaming quantile state behind the response time figures'
+    )
     
     def __str__(self):
         return f"{self.business_name} - {self.user.email}"
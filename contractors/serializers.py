@@ -54,9 +54,13 @@ class ContractorProfileSerializer(serializers.ModelSerializer):
             'years_of_experience', 'license_number', 'insurance_info',
             'service_radius', 'profile_image', 'is_onboarded',
             'service_categories', 'portfolio_items', 'reviews',
-            'average_rating', 'created_at', 'updated_at'
+            'average_rating', 'response_time_median', 'response_time_p90',
+            'response_count', 'created_at', 'updated_at'
+        )
+        read_only_fields = (
+            'user', 'is_onboarded', 'response_time_median', 'response_time_p90',
+            'response_count', 'created_at', 'updated_at'
         )
-        read_only_fields = ('user', 'is_onboarded', 'created_at', 'updated_at')
     
     def get_average_rating(self, obj):
         reviews = obj.reviews.all()
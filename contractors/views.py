@@ -35,7 +35,9 @@ class ContractorProfileViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ContractorFilter
     search_fields = ['business_name', 'description', 'user__name', 'service_categories__name']
-    ordering_fields = ['business_name', 'years_in_business', 'created_at']
+    ordering_fields = [
+        'business_name', 'years_in_business', 'created_at', 'response_time_median', 'response_time_p90'
+    ]
     ordering = ['business_name']
 
 
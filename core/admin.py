@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import OutboundEmail
 
-# Register your models here.
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'template_name']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['created_at', 'updated_at', 'sent_at']
+    raw_id_fields = ['user']
@@ -0,0 +1,97 @@
+"""
+Shared helpers for the management command benchmark suites.
+
+Each benchmark case is a callable timed over many iterations; the recorder
+keeps wall clock samples and SQL query counts and turns them into a JSON
+report that can be compared between runs.
+"""
+import json
+import math
+import platform
+import statistics
+import time
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of samples using nearest-rank."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class BenchmarkRecorder:
+    """Time benchmark cases and collect their latency and query statistics"""
+
+    def __init__(self, warmup=3):
+        self.warmup = warmup
+        self.results = {}
+
+    def measure(self, name, func, iterations):
+        """
+        Time func over a number of iterations.
+
+        Args:
+            name: The name of the case in the report.
+            func: A callable taking the iteration index. It may return a
+                short outcome label (e.g. 'valid'/'invalid') which is tallied.
+            iterations: How many timed calls to make.
+
+        Returns:
+            dict: The statistics recorded for this case.
+        """
+        for index in range(self.warmup):
+            func(index)
+
+        samples = []
+        query_counts = []
+        outcomes = {}
+        for index in range(iterations):
+            # The query log is a bounded deque; start each call from empty
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                outcome = func(index)
+                elapsed = time.perf_counter() - started
+            samples.append(elapsed * 1000)
+            query_counts.append(len(queries.captured_queries))
+            if outcome is not None:
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        self.results[name] = {
+            'iterations': iterations,
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'max_ms': round(max(samples), 3),
+            'queries_p50': percentile(query_counts, 50),
+            'queries_max': max(query_counts),
+            'outcomes': outcomes,
+        }
+        return self.results[name]
+
+    def report(self, **metadata):
+        """Build the report dictionary, including environment details."""
+        return {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            **metadata,
+            'benchmarks': self.results,
+        }
+
+
+def write_report(path, report):
+    """Write a benchmark report as pretty-printed JSON."""
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2, default=str)
+        report_file.write('\n')
@@ -10,6 +10,7 @@ from users.models import UserRole
 from contractors.models import ServiceCategory, ContractorProfile, ContractorPortfolio, ContractorReview
 from scheduling.models import AvailabilitySlot, UnavailableDate, Appointment, AppointmentNote
 from messaging.models import Conversation, Message, Notification
+from messaging.inbox import mark_read_up_to
 from analytics.models import DashboardStat, ContractorStat, ServiceCategoryStat, UserActivity, SearchQuery
 from notifications.models import NotificationTemplate, NotificationSetting, Notification as SystemNotification
 
@@ -441,7 +442,7 @@ class Command(BaseCommand):
                 # Mark some messages as read
                 if random.random() < 0.8:  # 80% chance to be read
                     recipient = contractor if sender == client else client
-                    message.read_by.add(recipient)
+                    mark_read_up_to(message, recipient)
             
             created_conversations.append(conversation)
             
@@ -0,0 +1,47 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import outbox_metrics, send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Sends queued transactional emails in batches, one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails sent per SMTP connection (default: EMAIL_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the outbox instead of exiting when it is empty'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls with --loop'
+        )
+        parser.add_argument(
+            '--metrics',
+            action='store_true',
+            help='Only print outbox metrics as JSON'
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics']:
+            self.stdout.write(json.dumps(outbox_metrics(), indent=2))
+            return
+        while True:
+            sent, failed = send_queued_emails(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'{sent} sent, {failed} failed')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Outbox drained'))
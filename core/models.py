@@ -31,3 +31,44 @@ class Address(TimeStampedModel):
 
     class Meta:
         verbose_name_plural = 'Addresses'
+
+
+class OutboundEmailStatus(models.TextChoices):
+    QUEUED = 'QUEUED', 'Queued'
+    SENT = 'SENT', 'Sent'
+    FAILED = 'FAILED', 'Failed'
+
+
+class OutboundEmail(TimeStampedModel):
+    """
+    A transactional email waiting in the outbox or already sent
+    """
+    to_email = models.EmailField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outbound_emails',
+        help_text='Passed to the template as user'
+    )
+    subject = models.CharField(max_length=255)
+    template_name = models.CharField(max_length=255)
+    context = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=OutboundEmailStatus.choices, default=OutboundEmailStatus.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            # The worker's scan for due emails
+            models.Index(fields=['status', 'next_attempt_at']),
+            # Send latency over recent emails
+            models.Index(fields=['sent_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.status})"
@@ -0,0 +1,183 @@
+"""
+Transactional email outbox.
+
+Requests queue an email by inserting one OutboundEmail row, so they never
+wait on template rendering or SMTP. The send_queued_emails worker leases due
+rows a batch at a time, renders them and sends the whole batch over one
+SMTP connection. Failed sends are retried with exponential backoff up to
+EMAIL_OUTBOX_MAX_ATTEMPTS. outbox_metrics() reports queue depth and send
+latency (from queueing to sending) for monitoring.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .benchmarks import percentile
+from .models import OutboundEmail, OutboundEmailStatus
+
+logger = logging.getLogger(__name__)
+
+LEASE_DURATION = timedelta(minutes=5)
+
+
+def queue_email(to_email, subject, template_name, context=None, user=None):
+    """
+    Add an email to the outbox.
+
+    Args:
+        to_email: The recipient's address.
+        subject: The subject line.
+        template_name: The HTML template to render when sending.
+        context: JSON-serializable template variables.
+        user: A user passed to the template as user.
+
+    Returns:
+        OutboundEmail: The queued email.
+    """
+    return OutboundEmail.objects.create(
+        to_email=to_email,
+        user=user,
+        subject=subject,
+        template_name=template_name,
+        context=context or {},
+        next_attempt_at=timezone.now()
+    )
+
+
+def lease_emails(batch_size):
+    """Claim a batch of due emails for sending."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(
+            status=OutboundEmailStatus.QUEUED, next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        OutboundEmail.objects.filter(id__in=ids).update(
+            next_attempt_at=now + LEASE_DURATION,
+            attempts=F('attempts') + 1,
+            updated_at=now
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).select_related('user'))
+
+
+def build_message(email, smtp_connection):
+    html_message = render_to_string(email.template_name, {**email.context, 'user': email.user})
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email.to_email],
+        connection=smtp_connection
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def send_batch(batch_size):
+    """
+    Send one batch of due emails over a single SMTP connection.
+
+    Returns:
+        tuple: The number of emails sent and failed; (0, 0) if none were due.
+    """
+    emails = lease_emails(batch_size)
+    if not emails:
+        return 0, 0
+
+    errors = {}
+    smtp_connection = get_connection()
+    try:
+        smtp_connection.open()
+        for email in emails:
+            try:
+                build_message(email, smtp_connection).send()
+            except Exception as e:
+                errors[email.id] = str(e)
+    except Exception as e:
+        # Could not connect; everything not already sent is retried
+        logger.exception('Could not open an SMTP connection')
+        errors.update({email.id: str(e) for email in emails if email.id not in errors})
+    finally:
+        smtp_connection.close()
+
+    now = timezone.now()
+    retried = []
+    for email in emails:
+        if email.id not in errors:
+            continue
+        email.last_error = errors[email.id][:1000]
+        email.updated_at = now
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboundEmailStatus.FAILED
+        else:
+            email.next_attempt_at = now + timedelta(
+                seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+            )
+        retried.append(email)
+    with transaction.atomic():
+        OutboundEmail.objects.filter(id__in=[email.id for email in emails if email.id not in errors]).update(
+            status=OutboundEmailStatus.SENT, sent_at=now, last_error='', updated_at=now
+        )
+        if retried:
+            OutboundEmail.objects.bulk_update(retried, ['status', 'next_attempt_at', 'last_error', 'updated_at'])
+    return len(emails) - len(errors), len(errors)
+
+
+def send_queued_emails(batch_size=None, max_batches=None):
+    """
+    Send due emails until none are left.
+
+    Returns:
+        tuple: The number of emails sent and failed.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    sent = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        batch_sent, batch_failed = send_batch(batch_size)
+        if not batch_sent and not batch_failed:
+            break
+        batches += 1
+        sent += batch_sent
+        failed += batch_failed
+    return sent, failed
+
+
+def outbox_metrics(window=timedelta(hours=1)):
+    """
+    Report the state of the outbox.
+
+    Args:
+        window: How far back to measure send latency.
+
+    Returns:
+        dict: Queued and due email counts, the age of the oldest queued email,
+            permanently failed emails, and emails sent in the window with
+            their p50/p95 send latency, in seconds.
+    """
+    now = timezone.now()
+    queued = OutboundEmail.objects.filter(status=OutboundEmailStatus.QUEUED)
+    oldest = queued.order_by('created_at').values_list('created_at', flat=True).first()
+    latencies = [
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in OutboundEmail.objects.filter(
+            status=OutboundEmailStatus.SENT, sent_at__gte=now - window
+        ).values_list('created_at', 'sent_at')
+    ]
+    return {
+        'queued': queued.count(),
+        'due': queued.filter(next_attempt_at__lte=now).count(),
+        'oldest_queued_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'failed': OutboundEmail.objects.filter(status=OutboundEmailStatus.FAILED).count(),
+        'sent': len(latencies),
+        'send_latency_p50': percentile(latencies, 50),
+        'send_latency_p95': percentile(latencies, 95),
+    }
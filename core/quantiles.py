@@ -0,0 +1,97 @@
+"""
+Streaming quantile estimation with the P² algorithm.
+
+P² (Jain & Chlamtac, 1985) tracks one quantile of a stream with five
+markers, so the state is a handful of numbers however many observations
+have been seen. It is small enough to keep in a JSON field and update one
+observation at a time.
+"""
+import math
+
+
+class P2Quantile:
+    """Estimate the p-quantile of a stream of numbers in constant space"""
+
+    def __init__(self, p, state=None):
+        self.p = p
+        state = state or {}
+        self.count = state.get('count', 0)
+        # Until five observations have been seen the raw values are kept
+        self.heights = list(state.get('heights', []))
+        self.positions = list(state.get('positions', []))
+        self.desired = list(state.get('desired', []))
+
+    @property
+    def increments(self):
+        p = self.p
+        return [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        self.count += 1
+        if self.count <= 5:
+            self.heights.append(value)
+            self.heights.sort()
+            if self.count == 5:
+                p = self.p
+                self.positions = [1, 2, 3, 4, 5]
+                self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+            return
+
+        heights = self.heights
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(index for index in range(4) if heights[index] <= value < heights[index + 1])
+
+        for index in range(cell + 1, 5):
+            self.positions[index] += 1
+        for index, increment in enumerate(self.increments):
+            self.desired[index] += increment
+
+        for index in range(1, 4):
+            offset = self.desired[index] - self.positions[index]
+            if ((offset >= 1 and self.positions[index + 1] - self.positions[index] > 1)
+                    or (offset <= -1 and self.positions[index - 1] - self.positions[index] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self.parabolic(index, step)
+                if not heights[index - 1] < height < heights[index + 1]:
+                    height = self.linear(index, step)
+                heights[index] = height
+                self.positions[index] += step
+
+    def parabolic(self, index, step):
+        heights, positions = self.heights, self.positions
+        return heights[index] + step / (positions[index + 1] - positions[index - 1]) * (
+            (positions[index] - positions[index - 1] + step)
+            * (heights[index + 1] - heights[index]) / (positions[index + 1] - positions[index])
+            + (positions[index + 1] - positions[index] - step)
+            * (heights[index] - heights[index - 1]) / (positions[index] - positions[index - 1])
+        )
+
+    def linear(self, index, step):
+        heights, positions = self.heights, self.positions
+        return heights[index] + step * (heights[index + step] - heights[index]) / (
+            positions[index + step] - positions[index]
+        )
+
+    def value(self):
+        """Return the current estimate, or None before any observation."""
+        if not self.count:
+            return None
+        if self.count < 5:
+            # Nearest-rank on the few values seen so far
+            rank = max(math.ceil(self.p * self.count), 1)
+            return self.heights[rank - 1]
+        return self.heights[2]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'heights': self.heights,
+            'positions': self.positions,
+            'desired': self.desired,
+        }
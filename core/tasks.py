@@ -0,0 +1,61 @@
+"""
+Lightweight background tasks.
+
+Work that does not need to finish before a response is sent (notification
+fan-out, thumbnails, ...) is handed to a small in-process thread pool once
+the surrounding transaction commits, so tasks never see uncommitted rows and
+are dropped if the transaction rolls back.
+
+Set BACKGROUND_TASKS_EAGER to run tasks synchronously instead, e.g. in
+tests and management commands where a deterministic order matters.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 4),
+                    thread_name_prefix='background-task'
+                )
+    return _executor
+
+
+def run_task(func, args, kwargs):
+    """Run a task, logging failures instead of losing them silently."""
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background task {func.__module__}.{func.__name__} failed")
+    finally:
+        close_old_connections()
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) in the background after the current transaction commits.
+
+    Args:
+        func: A module-level callable. Pass ids rather than model instances
+            so the task reads fresh rows.
+    """
+    def submit():
+        if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+            func(*args, **kwargs)
+        else:
+            get_executor().submit(run_task, func, args, kwargs)
+    transaction.on_commit(submit)
@@ -1,3 +1,134 @@
-from django.test import TestCase
+import smtplib
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import OutboundEmail, OutboundEmailStatus
+from .outbox import outbox_metrics, queue_email, send_batch, send_queued_emails
+
+
+class CountingBackend(EmailBackend):
+    """The locmem backend, counting the connections it opens"""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class RejectingBackend(EmailBackend):
+    """Reject every message, as a failing SMTP server would"""
+
+    def send_messages(self, messages):
+        raise smtplib.SMTPException('Mailbox unavailable')
+
+
+class UnreachableBackend(EmailBackend):
+    """Fail to connect at all"""
+
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.tests.CountingBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_DELAY=60,
+)
+class EmailOutboxTests(TestCase):
+    """Queued emails are sent in batches by the worker and retried with backoff"""
+
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def queue(self, count=1):
+        return [
+            queue_email(
+                f'user{index}@example.com', 'Verify Your Email', 'users/email_verification.html',
+                {'verification_url': 'https://example.com/verify/', 'expiration_days': 1}
+            )
+            for index in range(count)
+        ]
+
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_queueing_only_inserts_a_row(self):
+        with self.assertNumQueries(1):
+            self.queue()
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmailStatus.QUEUED)
+
+    def test_each_batch_is_sent_over_one_connection(self):
+        self.queue(5)
+
+        self.assertEqual(send_queued_emails(batch_size=2), (5, 0))
+
+        self.assertEqual(CountingBackend.opened, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn('https://example.com/verify/', mail.outbox[0].alternatives[0][0])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmailStatus.SENT).exists())
+        self.assertFalse(OutboundEmail.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(send_batch(10), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='core.tests.RejectingBackend')
+    def test_failed_sends_back_off_exponentially(self):
+        self.queue()
+
+        delays = []
+        for _ in range(2):
+            started = timezone.now()
+            self.assertEqual(send_batch(10), (0, 1))
+            email = OutboundEmail.objects.get()
+            delays.append((email.next_attempt_at - started).total_seconds())
+            # Not due again until the delay has passed
+            self.assertEqual(send_batch(10), (0, 0))
+            self.make_due()
+
+        self.assertEqual(email.status, OutboundEmailStatus.QUEUED)
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(email.last_error, 'Mailbox unavailable')
+        self.assertAlmostEqual(delays[0], 60, delta=5)
+        self.assertAlmostEqual(delays[1], 120, delta=5)
+
+    @override_settings(EMAIL_BACKEND='core.tests.RejectingBackend')
+    def test_gives_up_after_max_attempts(self):
+        self.queue()
+
+        for _ in range(3):
+            send_batch(10)
+            self.make_due()
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmailStatus.FAILED)
+        self.assertEqual(email.attempts, 3)
+        self.assertEqual(send_batch(10), (0, 0))
+        self.assertEqual(outbox_metrics()['failed'], 1)
+
+    @override_settings(EMAIL_BACKEND='core.tests.UnreachableBackend')
+    def test_connection_failure_retries_the_whole_batch(self):
+        self.queue(3)
+
+        with self.assertLogs('core.outbox', 'ERROR'):
+            self.assertEqual(send_batch(10), (0, 3))
+
+        self.assertEqual(
+            set(OutboundEmail.objects.values_list('status', 'attempts')),
+            {(OutboundEmailStatus.QUEUED, 1)}
+        )
+
+    def test_metrics_report_queue_depth_and_latency(self):
+        self.queue(3)
+        send_queued_emails(batch_size=2, max_batches=1)
+        self.queue()
+
+        metrics = outbox_metrics()
+
+        self.assertEqual(metrics['queued'], 2)
+        self.assertEqual(metrics['due'], 2)
+        self.assertEqual(metrics['sent'], 2)
+        self.assertGreaterEqual(metrics['send_latency_p95'], metrics['send_latency_p50'])
+        self.assertGreaterEqual(metrics['oldest_queued_seconds'], 0)
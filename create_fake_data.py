@@ -24,6 +24,7 @@ from users.models import UserRole, EmailVerification
 from contractors.models import ContractorProfile, ContractorPortfolio, ServiceCategory, ContractorReview
 from scheduling.models import AvailabilitySlot, UnavailableDate, Appointment, AppointmentStatus
 from messaging.models import Conversation, Message
+from messaging.inbox import mark_read_up_to
 from notifications.models import Notification, SMSVerification
 
 User = get_user_model()
@@ -449,15 +450,10 @@ def create_conversations_and_messages(clients, contractors):
                         content=content
                     )
                     
-                    # Mark as read by the other participant if sender is contractor
-                    if sender == contractor:
-                        message.read_by.add(contractor)
-                        if random.choice([True, False]):
-                            message.read_by.add(client)
-                    else:
-                        # If client is sender, contractor might have read it
-                        if random.choice([True, False]):
-                            message.read_by.add(contractor)
+                    # The other participant might have read up to this message
+                    reader = client if sender == contractor else contractor
+                    if random.choice([True, False]):
+                        mark_read_up_to(message, reader)
                     
                     print(f"Created message from {sender.name} in conversation {conversation.id}")
             except IntegrityError:
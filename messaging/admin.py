@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Conversation, Message, Notification
+
+from core.tasks import enqueue
+from .broadcasts import send_broadcast
+from .models import (
+    Attachment, AttachmentUpload, Broadcast, Conversation, Message, Notification, InboxEntry, MessageArchive
+)
 
 
 class MessageInline(admin.TabularInline):
@@ -32,7 +37,6 @@ class MessageAdmin(admin.ModelAdmin):
     list_filter = ['created_at', 'sender']
     search_fields = ['content', 'sender__email', 'sender__name']
     readonly_fields = ['created_at', 'updated_at']
-    filter_horizontal = ['read_by']
     
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -46,3 +50,54 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ['title', 'content', 'user__email', 'user__name']
     readonly_fields = ['created_at', 'updated_at']
     list_editable = ['read']
+
+
+@admin.register(InboxEntry)
+class InboxEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'conversation', 'last_message_at', 'unread_count', 'last_read_message_id']
+    search_fields = ['user__email', 'user__name', 'conversation__title']
+    readonly_fields = ['last_message', 'created_at', 'updated_at']
+    raw_id_fields = ['user', 'conversation']
+
+
+@admin.register(MessageArchive)
+class MessageArchiveAdmin(admin.ModelAdmin):
+    list_display = ['id', 'conversation', 'message_count', 'first_created_at', 'last_created_at', 'raw_size']
+    search_fields = ['conversation__title']
+    exclude = ['data']
+    readonly_fields = ['conversation', 'codec', 'message_count', 'first_message_id', 'last_message_id',
+                       'first_created_at', 'last_created_at', 'raw_size', 'created_at', 'updated_at']
+
+
+@admin.register(Attachment)
+class AttachmentAdmin(admin.ModelAdmin):
+    list_display = ['id', 'sha256', 'content_type', 'size', 'thumbnail_status', 'created_at']
+    list_filter = ['content_type', 'thumbnail_status']
+    search_fields = ['sha256']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(AttachmentUpload)
+class AttachmentUploadAdmin(admin.ModelAdmin):
+    list_display = ['token', 'user', 'conversation', 'filename', 'received_size', 'total_size', 'status']
+    list_filter = ['status']
+    search_fields = ['filename', 'user__email']
+    readonly_fields = ['token', 'created_at', 'updated_at']
+
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ['id', 'title', 'status', 'sent_count', 'recipient_count', 'created_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['title', 'content']
+    readonly_fields = ['created_by', 'status', 'recipient_count', 'sent_count', 'last_user_id',
+                       'started_at', 'completed_at', 'created_at', 'updated_at']
+    
+    def has_change_permission(self, request, obj=None):
+        # A broadcast cannot be edited once it may have started sending
+        return obj is None
+    
+    def save_model(self, request, obj, form, change):
+        obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        enqueue(send_broadcast, obj.id)
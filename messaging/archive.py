@@ -0,0 +1,188 @@
+"""
+Cold storage for the history of quiet conversations.
+
+Once a conversation has had no messages for a while, all but its latest
+message are packed into one zlib-compressed JSON block in MessageArchive and
+deleted from the Message table, keeping the hot table and its indexes small.
+The latest message stays hot so inbox entries keep pointing at it. Ids and
+timestamps are preserved, so read cursors and history cursors keep working
+and the history endpoint reads archived messages back transparently.
+
+Archived messages are no longer found by message search.
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Attachment, Message, MessageArchive
+
+User = get_user_model()
+
+COMPRESSION_LEVEL = 9
+
+
+def pack_messages(rows, attachment_ids):
+    """
+    Compress (id, sender id, content, created_at, updated_at) rows with their attachment ids.
+
+    Args:
+        rows: The message rows, oldest first.
+        attachment_ids: message id -> ids of its attachments.
+    """
+    payload = json.dumps([
+        [message_id, sender_id, content, created_at.isoformat(), updated_at.isoformat(),
+         attachment_ids.get(message_id, [])]
+        for message_id, sender_id, content, created_at, updated_at in rows
+    ], separators=(',', ':')).encode()
+    return zlib.compress(payload, COMPRESSION_LEVEL), len(payload)
+
+
+def unpack_archive(archive):
+    """
+    Return the messages of an archive as unsaved Message instances, oldest first.
+
+    Attachment ids are kept in archived_attachment_ids.
+    """
+    messages = []
+    for message_id, sender_id, content, created_at, updated_at, attachment_ids in json.loads(
+        zlib.decompress(bytes(archive.data))
+    ):
+        message = Message(
+            id=message_id,
+            conversation_id=archive.conversation_id,
+            sender_id=sender_id,
+            content=content,
+            created_at=parse_datetime(created_at),
+            updated_at=parse_datetime(updated_at),
+        )
+        message.archived_attachment_ids = attachment_ids
+        messages.append(message)
+    return messages
+
+
+def archive_conversation(conversation_id, cutoff=None):
+    """
+    Move all but the latest message of a conversation into one archive block.
+
+    Args:
+        conversation_id: The conversation to archive.
+        cutoff: When given, the conversation is skipped unless its latest
+            message is still older than this, and only older messages move.
+
+    Returns:
+        MessageArchive: The new archive, or None if there was nothing to move.
+    """
+    with transaction.atomic():
+        latest = Message.objects.filter(conversation_id=conversation_id).order_by(
+            '-created_at', '-id'
+        ).values_list('id', 'created_at').select_for_update().first()
+        if latest is None:
+            return None
+        latest_id, latest_created_at = latest
+        if cutoff is not None and latest_created_at >= cutoff:
+            # A reply arrived since the conversation was selected
+            return None
+        messages = Message.objects.filter(conversation_id=conversation_id).exclude(id=latest_id)
+        if cutoff is not None:
+            messages = messages.filter(created_at__lt=cutoff)
+        rows = list(messages.order_by('created_at', 'id').values_list(
+            'id', 'sender_id', 'content', 'created_at', 'updated_at'
+        ))
+        if not rows:
+            return None
+
+        attachment_ids = {}
+        for message_id, attachment_id in Message.attachments.through.objects.filter(
+            message_id__in=[row[0] for row in rows]
+        ).values_list('message_id', 'attachment_id'):
+            attachment_ids.setdefault(message_id, []).append(attachment_id)
+        data, raw_size = pack_messages(rows, attachment_ids)
+        archive = MessageArchive.objects.create(
+            conversation_id=conversation_id,
+            data=data,
+            message_count=len(rows),
+            first_message_id=min(row[0] for row in rows),
+            last_message_id=max(row[0] for row in rows),
+            first_created_at=rows[0][3],
+            last_created_at=rows[-1][3],
+            raw_size=raw_size,
+        )
+        messages.filter(id__in=[row[0] for row in rows]).delete()
+    return archive
+
+
+def quiet_cutoff(months):
+    """Return the time before which a conversation's messages count as quiet."""
+    return timezone.now() - timedelta(days=30 * months)
+
+
+def quiet_conversation_ids(cutoff):
+    """
+    Return the ids of conversations with several hot messages and none since cutoff.
+
+    The messages table is grouped once per run; callers archive the result in
+    batches, passing the same cutoff so conversations that became active in
+    the meantime are skipped.
+    """
+    return list(
+        Message.objects.order_by().values('conversation_id').annotate(
+            latest=Max('created_at'),
+            hot=Count('id')
+        ).filter(latest__lt=cutoff, hot__gt=1).values_list('conversation_id', flat=True).order_by('conversation_id')
+    )
+
+
+def archived_messages(conversation_id, key=None, direction='before', limit=50):
+    """
+    Read archived messages of a conversation around a (created_at, id) key.
+
+    Args:
+        conversation_id: The conversation to read.
+        key: The history cursor; None starts from the newest archived message.
+        direction: 'before' for older messages (newest first) or 'after'
+            for newer ones (oldest first).
+        limit: The maximum number of messages to return.
+
+    Returns:
+        list: Unsaved Message instances with their senders loaded.
+    """
+    archives = MessageArchive.objects.filter(conversation_id=conversation_id)
+    if direction == 'before':
+        if key:
+            archives = archives.filter(first_created_at__lte=key[0])
+        archives = archives.order_by('-first_created_at')
+    else:
+        if key:
+            archives = archives.filter(last_created_at__gte=key[0])
+        archives = archives.order_by('first_created_at')
+
+    found = []
+    for archive in archives.iterator():
+        messages = unpack_archive(archive)
+        if direction == 'before':
+            messages.reverse()
+            if key:
+                messages = [message for message in messages if (message.created_at, message.id) < key]
+        elif key:
+            messages = [message for message in messages if (message.created_at, message.id) > key]
+        found.extend(messages[:limit - len(found)])
+        if len(found) >= limit:
+            break
+
+    senders = User.objects.in_bulk({message.sender_id for message in found})
+    attachments = Attachment.objects.in_bulk(
+        {attachment_id for message in found for attachment_id in message.archived_attachment_ids}
+    )
+    for message in found:
+        message.sender = senders.get(message.sender_id)
+        message.archived_attachments = [
+            attachments[attachment_id] for attachment_id in message.archived_attachment_ids
+            if attachment_id in attachments
+        ]
+    return found
@@ -0,0 +1,255 @@
+"""
+Chunked, resumable attachment uploads.
+
+A client opens an upload with the file's name, type and size, then sends
+the bytes in chunks, each one a PUT whose Upload-Offset header must equal
+the bytes received so far; after a dropped connection it asks for the
+offset and carries on from there. Every chunk is streamed from the request
+into its own object in the storage backend, so no worker holds more than a
+small buffer and any worker can take the next chunk.
+
+When the last chunk arrives the upload moves to PROCESSING and a background
+task streams the chunks, in order, into the final file while hashing them, so
+the last PUT returns at once; clients follow the upload's status until it is
+COMPLETE. Content already stored under the same SHA-256 is reused instead of
+kept twice. Image thumbnails are generated in the background.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from core.tasks import enqueue
+from .models import Attachment, AttachmentUpload, UploadStatus
+
+STREAM_BLOCK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    """Raised when a chunk cannot be accepted"""
+
+
+class UploadOffsetMismatch(UploadError):
+    """Raised when a chunk does not start where the previous one ended"""
+
+
+def chunk_name(upload, index):
+    return f'attachment_uploads/{upload.token}/{index:06d}'
+
+
+class LimitedReader(io.RawIOBase):
+    """Read at most limit bytes from a stream, counting what was read"""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.remaining = limit
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        self.count += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class ChunkReader(io.RawIOBase):
+    """Read an upload's chunks back to back from storage, hashing as it goes"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.current = None
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = STREAM_BLOCK_SIZE
+        while True:
+            if self.current is None:
+                if not self.names:
+                    return b''
+                self.current = default_storage.open(self.names.pop(0), 'rb')
+            data = self.current.read(size)
+            if data:
+                self.sha256.update(data)
+                self.size += len(data)
+                return data
+            self.current.close()
+            self.current = None
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def start_upload(user, conversation, filename, content_type, total_size):
+    """
+    Open an upload.
+
+    Raises:
+        UploadError: If the file is empty or too large.
+    """
+    if total_size <= 0:
+        raise UploadError('The file is empty.')
+    if total_size > settings.ATTACHMENT_MAX_SIZE:
+        raise UploadError(f'Attachments are limited to {settings.ATTACHMENT_MAX_SIZE} bytes.')
+    return AttachmentUpload.objects.create(
+        user=user,
+        conversation=conversation,
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type or 'application/octet-stream',
+        total_size=total_size,
+    )
+
+
+def append_chunk(upload, stream, offset, length):
+    """
+    Stream one chunk of a request body into storage.
+
+    Args:
+        upload: The AttachmentUpload being written.
+        stream: A file-like object to read the chunk from.
+        offset: Where the client says the chunk starts.
+        length: The chunk's length from the Content-Length header.
+
+    Returns:
+        AttachmentUpload: The upload; PROCESSING with its assembly queued if
+        this was the last chunk.
+
+    Raises:
+        UploadOffsetMismatch: If offset is not the number of bytes received.
+        UploadError: If the chunk is empty, too long or truncated.
+    """
+    if upload.status != UploadStatus.IN_PROGRESS:
+        raise UploadError('This upload has already received all of its chunks.')
+    if offset != upload.received_size:
+        raise UploadOffsetMismatch('Chunk does not start at the current offset.')
+    if length <= 0 or length > settings.ATTACHMENT_CHUNK_SIZE:
+        raise UploadError(f'Chunks must be between 1 and {settings.ATTACHMENT_CHUNK_SIZE} bytes.')
+    if offset + length > upload.total_size:
+        raise UploadError('Chunk goes past the declared file size.')
+
+    name = chunk_name(upload, upload.chunk_count)
+    if default_storage.exists(name):
+        # Left over from an interrupted attempt at the same chunk
+        default_storage.delete(name)
+    reader = LimitedReader(stream, length)
+    default_storage.save(name, File(reader, name=name))
+    if reader.count != length:
+        default_storage.delete(name)
+        raise UploadError('The chunk was shorter than its Content-Length.')
+
+    received_size = offset + length
+    new_status = UploadStatus.PROCESSING if received_size == upload.total_size else UploadStatus.IN_PROGRESS
+    with transaction.atomic():
+        updated = AttachmentUpload.objects.filter(
+            pk=upload.pk, received_size=offset, status=UploadStatus.IN_PROGRESS
+        ).update(received_size=received_size, chunk_count=upload.chunk_count + 1, status=new_status)
+        if not updated:
+            raise UploadOffsetMismatch('Another request wrote this chunk first.')
+        if new_status == UploadStatus.PROCESSING:
+            enqueue(finalize_upload, upload.pk)
+    upload.received_size = received_size
+    upload.chunk_count += 1
+    upload.status = new_status
+    return upload
+
+
+def finalize_upload(upload_id):
+    """Assemble an upload's chunks into a deduplicated Attachment (background task)."""
+    upload = AttachmentUpload.objects.filter(pk=upload_id, status=UploadStatus.PROCESSING).first()
+    if upload is None:
+        return
+    try:
+        assemble_upload(upload)
+    except Exception:
+        logger.exception('Could not assemble upload %s', upload.token)
+        AttachmentUpload.objects.filter(pk=upload_id).update(status=UploadStatus.FAILED)
+
+
+def assemble_upload(upload):
+    """Stream the chunks into the final file, dedupe it by SHA-256 and clean up."""
+    names = [chunk_name(upload, index) for index in range(upload.chunk_count)]
+    reader = ChunkReader(names)
+    stored_name = default_storage.save(
+        f'message_attachments/{upload.token}{os.path.splitext(upload.filename)[1][:16]}',
+        File(reader, name=upload.filename)
+    )
+    sha256 = reader.sha256.hexdigest()
+
+    attachment = Attachment.objects.filter(sha256=sha256).first()
+    if attachment is None:
+        try:
+            with transaction.atomic():
+                attachment = Attachment.objects.create(
+                    sha256=sha256,
+                    file=stored_name,
+                    content_type=upload.content_type,
+                    size=reader.size,
+                    thumbnail_status='PENDING' if upload.content_type.startswith('image/') else 'NONE',
+                )
+        except IntegrityError:
+            # The same content was finalized concurrently
+            attachment = Attachment.objects.get(sha256=sha256)
+        else:
+            stored_name = None
+            if attachment.thumbnail_status == 'PENDING':
+                enqueue(generate_thumbnail, attachment.id)
+    if stored_name:
+        default_storage.delete(stored_name)
+
+    for name in names:
+        default_storage.delete(name)
+    upload.attachment = attachment
+    upload.status = UploadStatus.COMPLETE
+    upload.save(update_fields=['attachment', 'status', 'updated_at'])
+    return upload
+
+
+def generate_thumbnail(attachment_id):
+    """Render a JPEG thumbnail of an image attachment (background task)."""
+    from PIL import Image
+
+    attachment = Attachment.objects.filter(id=attachment_id).first()
+    if attachment is None or attachment.thumbnail_status != 'PENDING':
+        return
+    try:
+        with attachment.file.open('rb') as source:
+            image = Image.open(source)
+            # Let JPEG decode at a reduced scale instead of full resolution
+            image.draft('RGB', (THUMBNAIL_SIZE[0] * 2, THUMBNAIL_SIZE[1] * 2))
+            image = image.convert('RGB')
+            image.thumbnail(THUMBNAIL_SIZE)
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=85)
+    except (OSError, Image.DecompressionBombError):
+        Attachment.objects.filter(id=attachment_id).update(thumbnail_status='FAILED')
+        return
+    attachment.thumbnail.save(f'{attachment.sha256}.jpg', ContentFile(output.getvalue()), save=False)
+    attachment.thumbnail_status = 'READY'
+    attachment.save(update_fields=['thumbnail', 'thumbnail_status', 'updated_at'])
@@ -0,0 +1,83 @@
+"""
+Badge counts for the app shell.
+
+Unread messages come from the counters maintained on InboxEntry, unread
+notifications and upcoming appointments from one grouped query each. The
+result is cached per user for a short time and dropped whenever something
+that feeds it is written, so the cache mostly absorbs repeated polling.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from scheduling.models import Appointment, AppointmentStatus
+from .models import InboxEntry, Notification
+
+BADGE_CACHE_TIMEOUT = 60
+UPCOMING_STATUSES = [AppointmentStatus.REQUESTED, AppointmentStatus.CONFIRMED]
+
+
+def badge_cache_key(user_id):
+    return f'messaging:badges:{user_id}'
+
+
+def compute_badges(user):
+    """
+    Count what the app shell shows badges for.
+
+    Returns:
+        dict: unread messages and conversations, unread notifications per
+        type and upcoming appointments per status.
+    """
+    inbox = InboxEntry.objects.filter(user=user).aggregate(
+        messages=Sum('unread_count'),
+        conversations=Count('id', filter=Q(unread_count__gt=0))
+    )
+
+    notifications = {
+        row['notification_type']: row['total']
+        for row in Notification.objects.filter(user=user, read=False).order_by()
+        .values('notification_type').annotate(total=Count('id'))
+    }
+
+    appointments = Appointment.objects.filter(
+        appointment_date__gte=timezone.now().date(),
+        status__in=UPCOMING_STATUSES
+    )
+    if hasattr(user, 'contractor_profile'):
+        appointments = appointments.filter(contractor=user.contractor_profile)
+    else:
+        appointments = appointments.filter(client=user)
+    by_status = dict(appointments.order_by().values_list('status').annotate(total=Count('id')))
+
+    return {
+        'unread_messages': inbox['messages'] or 0,
+        'unread_conversations': inbox['conversations'],
+        'unread_notifications': {
+            'total': sum(notifications.values()),
+            'by_type': notifications,
+        },
+        'upcoming_appointments': {
+            'total': sum(by_status.values()),
+            'requested': by_status.get(AppointmentStatus.REQUESTED, 0),
+            'confirmed': by_status.get(AppointmentStatus.CONFIRMED, 0),
+        },
+    }
+
+
+def get_badges(user):
+    """Return a user's badge counts from the cache, computing them on a miss."""
+    key = badge_cache_key(user.id)
+    badges = cache.get(key)
+    if badges is None:
+        badges = compute_badges(user)
+        cache.set(key, badges, BADGE_CACHE_TIMEOUT)
+    return badges
+
+
+def invalidate_badges(user_ids):
+    """Drop cached badge counts of users whose counters changed, once the change commits."""
+    keys = [badge_cache_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,129 @@
+"""
+Admin announcements sent as notifications to many users at once.
+
+The audience (by role and address area) is resolved with one query into an
+ordered list of user ids. A background job then inserts the SYSTEM
+notifications in chunks, each its own short transaction with one
+bulk_create, and records progress on the broadcast after every chunk. It
+pauses between chunks so a large broadcast does not monopolize the primary
+database, and the last notified user id lets an interrupted broadcast resume
+where it stopped.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .badges import invalidate_badges
+from .models import Broadcast, BroadcastStatus, Notification
+from .notification_feed import notify_users
+
+User = get_user_model()
+
+
+def audience_queryset(broadcast):
+    """Return the active users a broadcast is addressed to."""
+    users = User.objects.filter(is_active=True)
+    if broadcast.roles:
+        users = users.filter(role__in=broadcast.roles)
+    area = Q()
+    if broadcast.states:
+        area &= Q(addresses__state__in=broadcast.states)
+    if broadcast.cities:
+        area &= Q(addresses__city__in=broadcast.cities)
+    if broadcast.zip_codes:
+        area &= Q(addresses__zip_code__in=broadcast.zip_codes)
+    if area:
+        # Users with several matching addresses are joined more than once
+        users = users.filter(area).distinct()
+    return users
+
+
+def claim_broadcast(broadcast_id, stalled_after=None):
+    """
+    Mark a broadcast as sending unless another job already is.
+
+    Args:
+        broadcast_id: The broadcast to claim.
+        stalled_after: Also take over a broadcast left SENDING with no
+            progress for this long (a timedelta), e.g. after a restart.
+
+    Returns:
+        bool: Whether the caller may send it.
+    """
+    claimable = Q(status=BroadcastStatus.PENDING)
+    if stalled_after is not None:
+        claimable |= Q(status=BroadcastStatus.SENDING, updated_at__lt=timezone.now() - stalled_after)
+    return bool(Broadcast.objects.filter(claimable, id=broadcast_id).update(
+        status=BroadcastStatus.SENDING,
+        started_at=Coalesce('started_at', Value(timezone.now())),
+        updated_at=timezone.now()
+    ))
+
+
+def send_broadcast(broadcast_id, stalled_after=None):
+    """
+    Send a broadcast's notifications (background task).
+
+    Args:
+        broadcast_id: The broadcast to send.
+        stalled_after: See claim_broadcast.
+    """
+    if not claim_broadcast(broadcast_id, stalled_after):
+        return
+    broadcast = Broadcast.objects.get(id=broadcast_id)
+    chunk_size = settings.BROADCAST_CHUNK_SIZE
+    try:
+        recipient_ids = list(
+            audience_queryset(broadcast).filter(id__gt=broadcast.last_user_id).order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+        Broadcast.objects.filter(id=broadcast_id).update(
+            recipient_count=broadcast.sent_count + len(recipient_ids),
+            updated_at=timezone.now()
+        )
+        for start in range(0, len(recipient_ids), chunk_size):
+            chunk = recipient_ids[start:start + chunk_size]
+            with transaction.atomic():
+                Notification.objects.bulk_create([
+                    Notification(
+                        user_id=user_id,
+                        notification_type='SYSTEM',
+                        title=broadcast.title,
+                        content=broadcast.content,
+                        related_object_id=broadcast.id,
+                        related_object_type='broadcast',
+                    )
+                    for user_id in chunk
+                ])
+                Broadcast.objects.filter(id=broadcast_id).update(
+                    sent_count=F('sent_count') + len(chunk),
+                    last_user_id=chunk[-1],
+                    updated_at=timezone.now()
+                )
+                notify_users(chunk)
+                invalidate_badges(chunk)
+            if start + chunk_size < len(recipient_ids):
+                time.sleep(settings.BROADCAST_CHUNK_DELAY)
+    except Exception:
+        Broadcast.objects.filter(id=broadcast_id).update(status=BroadcastStatus.FAILED, updated_at=timezone.now())
+        raise
+    Broadcast.objects.filter(id=broadcast_id).update(
+        status=BroadcastStatus.COMPLETE,
+        completed_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+
+
+def unfinished_broadcast_ids(stalled_minutes):
+    """Return broadcasts still pending or sending without progress for stalled_minutes."""
+    stalled = timezone.now() - timedelta(minutes=stalled_minutes)
+    return list(Broadcast.objects.filter(
+        Q(status=BroadcastStatus.PENDING) | Q(status=BroadcastStatus.SENDING, updated_at__lt=stalled)
+    ).order_by('id').values_list('id', flat=True))
@@ -0,0 +1,85 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .inbox import mark_read_up_to
+from .membership import is_participant
+from .models import Message
+from .realtime import participant_ids, publish_read_receipt, user_group
+
+
+class MessagingConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket gateway pushing messaging events to a signed-in user.
+
+    Server events: message.created, message.read and typing.
+    Client events:
+        {"type": "typing", "conversation": <id>}
+        {"type": "read", "message": <id>}
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.user = user
+        self.conversation_ids = set()
+        self.group = user_group(user.id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        event_type = content.get('type')
+        if event_type == 'typing':
+            await self.handle_typing(content.get('conversation'))
+        elif event_type == 'read':
+            await self.handle_read(content.get('message'))
+        else:
+            await self.send_json({'type': 'error', 'detail': 'Unknown event type.'})
+
+    async def messaging_event(self, event):
+        """Forward an event published to this user's group"""
+        await self.send_json(event['event'])
+
+    async def handle_typing(self, conversation_id):
+        if not await self.is_participant(conversation_id):
+            await self.send_json({'type': 'error', 'detail': 'Conversation not found.'})
+            return
+        recipients = [user_id for user_id in await database_sync_to_async(participant_ids)(conversation_id)
+                      if user_id != self.user.id]
+        event = {'type': 'typing', 'conversation': int(conversation_id), 'user': self.user.id}
+        for user_id in recipients:
+            await self.channel_layer.group_send(user_group(user_id), {'type': 'messaging.event', 'event': event})
+
+    async def handle_read(self, message_id):
+        if not await self.mark_read(message_id):
+            await self.send_json({'type': 'error', 'detail': 'Message not found.'})
+
+    async def is_participant(self, conversation_id):
+        """Check membership once per conversation and connection"""
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            return False
+        if conversation_id not in self.conversation_ids:
+            if not await database_sync_to_async(is_participant)(self.user.id, conversation_id):
+                return False
+            self.conversation_ids.add(conversation_id)
+        return True
+
+    @database_sync_to_async
+    def mark_read(self, message_id):
+        message = Message.objects.filter(
+            id=message_id,
+            conversation__inbox_entries__user=self.user
+        ).first() if str(message_id).isdigit() else None
+        if message is None:
+            return False
+        cursor = mark_read_up_to(message, self.user)
+        if cursor:
+            publish_read_receipt(message.conversation_id, self.user.id, cursor)
+        return True
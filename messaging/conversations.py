@@ -0,0 +1,79 @@
+"""
+Canonical conversations per participant set.
+
+A conversation created through get_or_create_conversation() stores a hash of
+its sorted participant ids in participant_key, which is unique, so finding
+"the" conversation between a set of users is one indexed lookup and two
+concurrent requests cannot create it twice. A conversation opened through
+the create endpoint claims the key when its participant set has no canonical
+conversation yet; later ones are separate threads and keep a null key.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+
+from .models import Conversation
+
+
+def participant_key(user_ids):
+    """Return the canonical key of a set of participant ids."""
+    canonical = ','.join(str(user_id) for user_id in sorted(set(user_ids)))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def get_or_create_conversation(user_ids, title=''):
+    """
+    Return the canonical conversation between a set of users, creating it if needed.
+
+    Args:
+        user_ids: The ids of every participant, including the requesting user.
+        title: The title used if the conversation is created.
+
+    Returns:
+        tuple: (conversation, created)
+    """
+    key = participant_key(user_ids)
+    conversation = Conversation.objects.filter(participant_key=key).first()
+    if conversation is not None:
+        return conversation, False
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(participant_key=key, title=title)
+            conversation.participants.set(set(user_ids))
+    except IntegrityError:
+        # Another request created it between the lookup and the insert
+        return Conversation.objects.get(participant_key=key), False
+    return conversation, True
+
+
+def claim_participant_key(conversation, user_ids):
+    """
+    Make a new conversation canonical for its participants unless another one already is.
+
+    Returns:
+        bool: Whether the conversation now holds the key.
+    """
+    user_ids = set(user_ids)
+    if len(user_ids) < 2:
+        return False
+    key = participant_key(user_ids)
+    if Conversation.objects.filter(participant_key=key).exists():
+        return False
+    try:
+        with transaction.atomic():
+            Conversation.objects.filter(pk=conversation.pk).update(participant_key=key)
+    except IntegrityError:
+        # Another request claimed it between the lookup and the update
+        return False
+    conversation.participant_key = key
+    return True
+
+
+def refresh_participant_key(conversation):
+    """Drop the key of a canonical conversation whose participants changed."""
+    if not conversation.participant_key:
+        return
+    user_ids = conversation.participants.values_list('id', flat=True)
+    if participant_key(user_ids) != conversation.participant_key:
+        Conversation.objects.filter(pk=conversation.pk).update(participant_key=None)
+        conversation.participant_key = None
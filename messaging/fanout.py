@@ -0,0 +1,77 @@
+"""
+Coalesced "new message" notifications.
+
+Each recipient has at most one unread MESSAGE notification per conversation.
+A new message replaces that row with one carrying the running count and the
+time of the latest message, so the notifications table grows per
+conversation rather than per message. The row is re-inserted rather than
+updated so it gets a new id and shows up in the notification change feed.
+"""
+from django.db import transaction
+
+from .badges import invalidate_badges
+from .models import InboxEntry, Message, Notification
+from .notification_feed import notify_users
+
+
+def message_notification_title(sender, count):
+    if count == 1:
+        return f"New message from {sender.name}"
+    return f"{count} new messages from {sender.name}"
+
+
+def fan_out_message_notifications(message_id):
+    """
+    Notify the other participants of a conversation about a new message.
+
+    Runs as a background task; the whole fan-out is one SELECT, one DELETE
+    and one bulk INSERT regardless of the number of recipients.
+
+    Args:
+        message_id: The id of the message that was sent.
+    """
+    message = Message.objects.select_related('sender').filter(id=message_id).first()
+    if message is None:
+        return
+
+    with transaction.atomic():
+        # Locking the recipients' inbox entries serializes concurrent fan-outs
+        # for the same conversation, so two messages cannot both miss the
+        # other's notification row
+        recipient_ids = list(
+            InboxEntry.objects.select_for_update().filter(
+                conversation_id=message.conversation_id
+            ).exclude(user_id=message.sender_id).order_by('user_id').values_list('user_id', flat=True)
+        )
+        if not recipient_ids:
+            return
+
+        pending = Notification.objects.filter(
+            user_id__in=recipient_ids,
+            notification_type='MESSAGE',
+            related_object_type='conversation',
+            related_object_id=message.conversation_id,
+            read=False
+        )
+        previous_counts = {}
+        for user_id, count in pending.values_list('user_id', 'count'):
+            previous_counts[user_id] = previous_counts.get(user_id, 0) + count
+        if previous_counts:
+            pending.delete()
+
+        notifications = []
+        for user_id in recipient_ids:
+            count = previous_counts.get(user_id, 0) + 1
+            notifications.append(Notification(
+                user_id=user_id,
+                notification_type='MESSAGE',
+                title=message_notification_title(message.sender, count),
+                content=f"{message.sender.name} sent you a message",
+                related_object_id=message.conversation_id,
+                related_object_type='conversation',
+                count=count,
+                latest_at=message.created_at,
+            ))
+        Notification.objects.bulk_create(notifications)
+        notify_users(recipient_ids)
+        invalidate_badges(recipient_ids)
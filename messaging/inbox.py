@@ -0,0 +1,165 @@
+"""
+Maintenance of the denormalized per-participant inbox.
+
+Each participant of a conversation has one InboxEntry holding the last
+message, when it was sent and how many messages they have not read, so the
+conversation list is a single indexed query instead of per-row aggregates.
+
+The entry is also the participant's read cursor: every message with an id up
+to last_read_message_id has been read, so marking a conversation read is one
+UPDATE and unread counts are range counts.
+"""
+from django.db.models import BigIntegerField, Case, DateTimeField, F, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .badges import invalidate_badges
+from .models import InboxEntry, Message
+from .responsiveness import record_response_time
+
+
+def add_inbox_entries(conversation, user_ids):
+    """
+    Create inbox entries for users who joined a conversation.
+
+    Args:
+        conversation: The conversation that was joined.
+        user_ids: The ids of the new participants.
+    """
+    last_message = conversation.messages.order_by('-created_at', '-id').first()
+    InboxEntry.objects.bulk_create(
+        [
+            InboxEntry(
+                conversation=conversation,
+                user_id=user_id,
+                last_message=last_message,
+                last_message_at=last_message.created_at if last_message else None,
+            )
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True
+    )
+
+
+def remove_inbox_entries(conversation, user_ids=None):
+    """Delete inbox entries for users who left a conversation (all if None)."""
+    entries = InboxEntry.objects.filter(conversation=conversation)
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+
+
+def record_message(message):
+    """
+    Update every participant's inbox entry for a new message.
+
+    One UPDATE moves the conversation to the top of each inbox and bumps the
+    unread count of everyone except the sender.
+    The sender has implicitly read everything up to their own message, so
+    their read cursor moves to it and their unread count is cleared.
+    The sender no longer owes a reply, while everyone else now does if they
+    did not already; a contractor's reply is timed for their responsiveness.
+    """
+    entries = InboxEntry.objects.filter(conversation_id=message.conversation_id)
+    if message.sender.is_contractor:
+        awaiting_since = entries.filter(user_id=message.sender_id).values_list(
+            'awaiting_reply_since', flat=True
+        ).first()
+        if awaiting_since is not None:
+            record_response_time(message.sender_id, (message.created_at - awaiting_since).total_seconds())
+    entries.update(
+        last_message=message,
+        last_message_at=message.created_at,
+        unread_count=Case(
+            When(user_id=message.sender_id, then=Value(0)),
+            default=F('unread_count') + 1
+        ),
+        last_read_message_id=Case(
+            When(user_id=message.sender_id, then=Value(message.id)),
+            default=F('last_read_message_id'),
+            output_field=BigIntegerField()
+        ),
+        awaiting_reply_since=Case(
+            When(user_id=message.sender_id, then=Value(None)),
+            When(awaiting_reply_since__isnull=True, then=Value(message.created_at)),
+            default=F('awaiting_reply_since'),
+            output_field=DateTimeField()
+        )
+    )
+
+
+def mark_inbox_read(conversation, user):
+    """
+    Move a participant's read cursor to the last message with one UPDATE.
+
+    Returns:
+        int: The new read cursor, or None if the user has no inbox entry.
+    """
+    entries = InboxEntry.objects.filter(conversation=conversation, user=user)
+    entries.update(
+        last_read_message_id=Greatest(
+            F('last_read_message_id'),
+            Coalesce(F('last_message_id'), Value(0)),
+            output_field=BigIntegerField()
+        ),
+        last_read_at=timezone.now(),
+        unread_count=0
+    )
+    invalidate_badges([user.id])
+    return entries.values_list('last_read_message_id', flat=True).first()
+
+
+def count_unread(conversation_id, user_id, cursor):
+    """Count messages from others after a read cursor."""
+    return Message.objects.filter(
+        conversation_id=conversation_id,
+        id__gt=cursor
+    ).exclude(sender_id=user_id).count()
+
+
+def mark_read_up_to(message, user):
+    """
+    Advance a participant's read cursor to a message and recount unread.
+
+    The cursor never moves backwards, so marking an older message read is a
+    no-op apart from the recount.
+
+    Returns:
+        int: The new read cursor, or None if the user has no inbox entry.
+    """
+    entry = InboxEntry.objects.filter(conversation_id=message.conversation_id, user=user).first()
+    if entry is None:
+        return None
+    cursor = max(entry.last_read_message_id, message.id)
+    InboxEntry.objects.filter(pk=entry.pk).update(
+        last_read_message_id=cursor,
+        last_read_at=timezone.now(),
+        unread_count=count_unread(message.conversation_id, user.id, cursor)
+    )
+    invalidate_badges([user.id])
+    return cursor
+
+
+def read_cursors(conversation_ids):
+    """
+    Return every participant's read cursor for a set of conversations.
+
+    Returns:
+        dict: conversation id -> {user id: last read message id}
+    """
+    cursors = {}
+    entries = InboxEntry.objects.filter(conversation_id__in=list(conversation_ids)).order_by().values_list(
+        'conversation_id', 'user_id', 'last_read_message_id'
+    )
+    for conversation_id, user_id, cursor in entries:
+        cursors.setdefault(conversation_id, {})[user_id] = cursor
+    return cursors
+
+
+def message_is_read(message, cursors):
+    """Check a message against preloaded read cursors of its conversation."""
+    return all(
+        cursor >= message.id
+        for user_id, cursor in cursors.items()
+        if user_id != message.sender_id
+    )
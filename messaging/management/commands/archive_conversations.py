@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from messaging.archive import archive_conversation, quiet_conversation_ids, quiet_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Moves the history of conversations with no recent messages into compressed archive blocks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=6,
+            help='Archive conversations with no messages for this many months'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of conversations archived per batch'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: until none are left)'
+        )
+
+    def handle(self, *args, **options):
+        archives, messages, raw_size, stored_size = archive_batches(
+            options['months'], options['batch_size'], options['max_batches'], stdout=self.stdout
+        )
+        ratio = f' ({raw_size / stored_size:.1f}x compression)' if stored_size else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {messages} messages into {archives} blocks{ratio}'
+        ))
+
+
+def archive_batches(months, batch_size, max_batches=None, stdout=None):
+    """Archive quiet conversations a batch at a time, each conversation in its own transaction."""
+    archives = messages = raw_size = stored_size = batches = 0
+    cutoff = quiet_cutoff(months)
+    quiet_ids = quiet_conversation_ids(cutoff)
+    for start in range(0, len(quiet_ids), batch_size):
+        if max_batches is not None and batches >= max_batches:
+            break
+        conversation_ids = quiet_ids[start:start + batch_size]
+        batches += 1
+        for conversation_id in conversation_ids:
+            archive = archive_conversation(conversation_id, cutoff)
+            if archive is None:
+                continue
+            archives += 1
+            messages += archive.message_count
+            raw_size += archive.raw_size
+            stored_size += len(archive.data)
+        if stdout:
+            stdout.write(f'Batch {batches}: {len(conversation_ids)} conversations')
+    return archives, messages, raw_size, stored_size
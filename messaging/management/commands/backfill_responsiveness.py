@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from contractors.models import ContractorProfile
+from messaging.archive import unpack_archive
+from messaging.models import Conversation, InboxEntry, Message, MessageArchive
+from messaging.responsiveness import ResponseTimeSketch, replay_conversation
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds contractor response times and pending replies from the message history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of conversations replayed per batch'
+        )
+
+    def handle(self, *args, **options):
+        conversations, observations = backfill_responsiveness(options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {conversations} conversations into {observations} response times'
+        ))
+
+
+def conversation_messages(conversation_ids):
+    """Return conversation id -> its archived and hot messages, oldest first."""
+    messages = {conversation_id: [] for conversation_id in conversation_ids}
+    for archive in MessageArchive.objects.filter(conversation_id__in=conversation_ids).iterator():
+        messages[archive.conversation_id].extend(unpack_archive(archive))
+    for message in Message.objects.filter(conversation_id__in=conversation_ids).only(
+        'id', 'conversation_id', 'sender_id', 'created_at'
+    ).iterator():
+        messages[message.conversation_id].append(message)
+    for conversation in messages.values():
+        conversation.sort(key=lambda message: (message.created_at, message.id))
+    return messages
+
+
+def backfill_responsiveness(batch_size, stdout=None):
+    """
+    Replay every conversation, a batch of ids at a time, and rebuild the
+    response time sketches of all contractors from scratch.
+
+    Run it while messaging is quiet: replies recorded during the backfill are
+    overwritten when the profiles are saved at the end.
+    """
+    sketches = {
+        user_id: ResponseTimeSketch()
+        for user_id in ContractorProfile.objects.values_list('user_id', flat=True)
+    }
+    conversations = 0
+    last_id = 0
+    while True:
+        conversation_ids = list(
+            Conversation.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not conversation_ids:
+            break
+        last_id = conversation_ids[-1]
+
+        entries = list(InboxEntry.objects.filter(conversation_id__in=conversation_ids).only(
+            'id', 'conversation_id', 'user_id', 'awaiting_reply_since'
+        ))
+        participants = {}
+        for entry in entries:
+            participants.setdefault(entry.conversation_id, []).append(entry.user_id)
+        awaiting = {}
+        for conversation_id, messages in conversation_messages(conversation_ids).items():
+            for user_id, since in replay_conversation(
+                messages, participants.get(conversation_id, []), sketches
+            ).items():
+                awaiting[conversation_id, user_id] = since
+        for entry in entries:
+            entry.awaiting_reply_since = awaiting.get((entry.conversation_id, entry.user_id))
+        InboxEntry.objects.bulk_update(entries, ['awaiting_reply_since'], batch_size=500)
+
+        conversations += len(conversation_ids)
+        if stdout:
+            stdout.write(f'Replayed {conversations} conversations')
+
+    profiles = list(ContractorProfile.objects.only('id', 'user_id'))
+    for profile in profiles:
+        sketches[profile.user_id].apply_to(profile)
+    with transaction.atomic():
+        ContractorProfile.objects.bulk_update(
+            profiles,
+            ['response_time_sketch', 'response_time_median', 'response_time_p90', 'response_count'],
+            batch_size=500
+        )
+    return conversations, sum(sketch.sketches['p50'].count for sketch in sketches.values())
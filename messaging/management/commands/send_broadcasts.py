@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from messaging.broadcasts import send_broadcast, unfinished_broadcast_ids
+
+
+class Command(BaseCommand):
+    help = 'Sends broadcasts that are pending or were interrupted, resuming where they stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stalled-minutes',
+            type=int,
+            default=10,
+            help='Resume broadcasts that have been sending without progress for this many minutes'
+        )
+
+    def handle(self, *args, **options):
+        stalled_after = timedelta(minutes=options['stalled_minutes'])
+        broadcast_ids = unfinished_broadcast_ids(options['stalled_minutes'])
+        for broadcast_id in broadcast_ids:
+            send_broadcast(broadcast_id, stalled_after=stalled_after)
+            self.stdout.write(f'Broadcast {broadcast_id} sent')
+        self.stdout.write(self.style.SUCCESS(f'Sent {len(broadcast_ids)} broadcasts'))
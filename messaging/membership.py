@@ -0,0 +1,72 @@
+"""
+Conversation membership checks for message authorization.
+
+Membership is one EXISTS probe on the participants through table, which has
+a unique index on (conversation, user), so group conversations cost the same
+as one-to-one ones. Answers are memoized on the request and in the cache;
+the cached entries are dropped when participants change (see signals).
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Conversation
+
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+participants_field = Conversation._meta.get_field('participants')
+Participant = participants_field.remote_field.through
+PARTICIPANT_USER = f'{participants_field.m2m_reverse_field_name()}_id'
+
+
+def membership_cache_key(conversation_id, user_id):
+    return f'messaging:member:{conversation_id}:{user_id}'
+
+
+def is_participant(user_id, conversation_id, request=None):
+    """
+    Check whether a user takes part in a conversation.
+
+    Args:
+        user_id: The id of the user.
+        conversation_id: The id of the conversation.
+        request: The current request, if any, to memoize the answer on.
+
+    Returns:
+        bool: True if the user is a participant.
+    """
+    try:
+        conversation_id = int(conversation_id)
+    except (TypeError, ValueError):
+        return False
+    memo = None
+    if request is not None:
+        memo = getattr(request, '_conversation_membership', None)
+        if memo is None:
+            memo = request._conversation_membership = {}
+        if (conversation_id, user_id) in memo:
+            return memo[conversation_id, user_id]
+
+    key = membership_cache_key(conversation_id, user_id)
+    member = cache.get(key)
+    if member is None:
+        member = Participant.objects.filter(
+            conversation_id=conversation_id, **{PARTICIPANT_USER: user_id}
+        ).exists()
+        cache.set(key, member, MEMBERSHIP_CACHE_TIMEOUT)
+
+    if memo is not None:
+        memo[conversation_id, user_id] = member
+    return member
+
+
+def invalidate_membership(pairs):
+    """
+    Drop cached answers for (conversation id, user id) pairs.
+
+    They are dropped at once and again after commit, in case a check made
+    before the commit cached the old answer.
+    """
+    keys = [membership_cache_key(conversation_id, user_id) for conversation_id, user_id in pairs]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
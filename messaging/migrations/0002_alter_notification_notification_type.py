@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('MESSAGE', 'New Message'), ('REVIEW', 'New Review'), ('PAYMENT', 'Payment Update'), ('APPOINTMENT', 'Appointment Update'), ('SYSTEM', 'System Notification')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def backfill_inbox_entries(apps, schema_editor):
+    """Build inbox entries for existing conversations, a batch of conversations at a time"""
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+    InboxEntry = apps.get_model('messaging', 'InboxEntry')
+    participants_field = Conversation._meta.get_field('participants')
+    Participant = participants_field.remote_field.through
+    participant_user = participants_field.m2m_reverse_field_name()
+    read_by_field = Message._meta.get_field('read_by')
+    ReadBy = read_by_field.remote_field.through
+    reader = read_by_field.m2m_reverse_field_name()
+
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    last_id = 0
+    while True:
+        conversations = list(
+            Conversation.objects.filter(id__gt=last_id).order_by('id').annotate(
+                last_message_id=Subquery(latest.values('id')[:1]),
+                last_message_at=Subquery(latest.values('created_at')[:1]),
+            ).values_list('id', 'last_message_id', 'last_message_at')[:BATCH_SIZE]
+        )
+        if not conversations:
+            break
+        last_id = conversations[-1][0]
+        ids = [conversation[0] for conversation in conversations]
+
+        totals = dict(
+            Message.objects.filter(conversation_id__in=ids).values('conversation_id')
+            .annotate(n=Count('id')).values_list('conversation_id', 'n')
+        )
+        sent = {
+            (row['conversation_id'], row['sender_id']): row['n']
+            for row in Message.objects.filter(conversation_id__in=ids).values('conversation_id', 'sender_id')
+            .annotate(n=Count('id'))
+        }
+        read = {
+            (row['message__conversation_id'], row[f'{reader}_id']): row['n']
+            for row in ReadBy.objects.filter(message__conversation_id__in=ids)
+            .exclude(message__sender_id=F(f'{reader}_id'))
+            .values('message__conversation_id', f'{reader}_id').annotate(n=Count('id'))
+        }
+
+        latest_by_conversation = {conversation[0]: conversation[1:] for conversation in conversations}
+        entries = []
+        for conversation_id, user_id in Participant.objects.filter(
+            conversation_id__in=ids
+        ).values_list('conversation_id', f'{participant_user}_id'):
+            key = (conversation_id, user_id)
+            last_message_id, last_message_at = latest_by_conversation[conversation_id]
+            entries.append(InboxEntry(
+                conversation_id=conversation_id,
+                user_id=user_id,
+                last_message_id=last_message_id,
+                last_message_at=last_message_at,
+                unread_count=max(totals.get(conversation_id, 0) - sent.get(key, 0) - read.get(key, 0), 0),
+            ))
+        InboxEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0002_alter_notification_notification_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='messaging.conversation')),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Inbox entries',
+                'ordering': ['-last_message_at'],
+                'indexes': [models.Index(fields=['user', '-last_message_at'], name='messaging_i_user_id_500d06_idx')],
+                'unique_together': {('conversation', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_inbox_entries, migrations.RunPython.noop),
+    ]
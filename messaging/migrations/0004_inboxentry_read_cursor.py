@@ -0,0 +1,85 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:06
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def backfill_read_cursors(apps, schema_editor):
+    """
+    Turn read_by rows into read cursors, a batch of conversations at a time.
+
+    A participant's cursor is placed just before the first message from
+    someone else they had not read, so no unread message is hidden; the unread
+    count is recomputed from the cursor.
+    """
+    Message = apps.get_model('messaging', 'Message')
+    InboxEntry = apps.get_model('messaging', 'InboxEntry')
+    read_by_field = Message._meta.get_field('read_by')
+    ReadBy = read_by_field.remote_field.through
+    reader = read_by_field.m2m_reverse_field_name()
+
+    last_id = 0
+    while True:
+        ids = list(
+            InboxEntry.objects.filter(conversation_id__gt=last_id).order_by('conversation_id')
+            .values_list('conversation_id', flat=True).distinct()[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        entries = {
+            (entry.conversation_id, entry.user_id): entry
+            for entry in InboxEntry.objects.filter(conversation_id__in=ids)
+        }
+        read = set(
+            ReadBy.objects.filter(message__conversation_id__in=ids).values_list('message_id', f'{reader}_id')
+        )
+        participants = {}
+        for conversation_id, user_id in entries:
+            participants.setdefault(conversation_id, []).append(user_id)
+
+        cursors = {}
+        unread = {}
+        messages = Message.objects.filter(conversation_id__in=ids).order_by(
+            'conversation_id', 'id'
+        ).values_list('conversation_id', 'id', 'sender_id')
+        for conversation_id, message_id, sender_id in messages.iterator(chunk_size=2000):
+            for user_id in participants.get(conversation_id, ()):
+                key = (conversation_id, user_id)
+                if key in unread:
+                    if sender_id != user_id:
+                        unread[key] += 1
+                elif sender_id == user_id or (message_id, user_id) in read:
+                    cursors[key] = message_id
+                else:
+                    unread[key] = 1
+
+        for key, entry in entries.items():
+            entry.last_read_message_id = cursors.get(key, 0)
+            entry.unread_count = unread.get(key, 0)
+        InboxEntry.objects.bulk_update(
+            entries.values(), ['last_read_message_id', 'unread_count'], batch_size=BATCH_SIZE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_inboxentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxentry',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='inboxentry',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0, help_text='Read cursor: every message up to this id has been read'),
+        ),
+        migrations.RunPython(backfill_read_cursors, migrations.RunPython.noop),
+    ]
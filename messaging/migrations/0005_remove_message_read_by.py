@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:06
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_inboxentry_read_cursor'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='message',
+            name='read_by',
+        ),
+    ]
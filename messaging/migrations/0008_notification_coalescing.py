@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0007_notification_user_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1, help_text='Number of events coalesced into this notification'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='latest_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
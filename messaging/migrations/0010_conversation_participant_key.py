@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:12
+
+import hashlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_participant_keys(apps, schema_editor):
+    """Make the oldest conversation of every participant set its canonical conversation"""
+    Conversation = apps.get_model('messaging', 'Conversation')
+    participants_field = Conversation._meta.get_field('participants')
+    Participant = participants_field.remote_field.through
+    participant_user = f'{participants_field.m2m_reverse_field_name()}_id'
+
+    seen = set()
+    last_id = 0
+    while True:
+        ids = list(
+            Conversation.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        members = {}
+        for conversation_id, user_id in Participant.objects.filter(
+            conversation_id__in=ids
+        ).values_list('conversation_id', participant_user):
+            members.setdefault(conversation_id, []).append(user_id)
+
+        updates = []
+        for conversation_id in ids:
+            user_ids = members.get(conversation_id)
+            if not user_ids:
+                continue
+            canonical = ','.join(str(user_id) for user_id in sorted(set(user_ids)))
+            key = hashlib.sha256(canonical.encode()).hexdigest()
+            if key not in seen:
+                seen.add(key)
+                updates.append(Conversation(id=conversation_id, participant_key=key))
+        Conversation.objects.bulk_update(updates, ['participant_key'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0009_message_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_key',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of the sorted participant ids of the canonical conversation between them', max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_participant_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0010_conversation_participant_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('codec', models.CharField(default='zlib+json', max_length=20)),
+                ('data', models.BinaryField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('first_message_id', models.BigIntegerField()),
+                ('last_message_id', models.BigIntegerField()),
+                ('first_created_at', models.DateTimeField()),
+                ('last_created_at', models.DateTimeField()),
+                ('raw_size', models.PositiveIntegerField(help_text='Size of the uncompressed payload in bytes')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_archives', to='messaging.conversation')),
+            ],
+            options={
+                'ordering': ['conversation', 'first_created_at'],
+                'indexes': [models.Index(fields=['conversation', 'first_created_at'], name='messaging_m_convers_9919a5_idx'), models.Index(fields=['conversation', 'last_created_at'], name='messaging_m_convers_bbf8c6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0012_message_attachments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxentry',
+            name='awaiting_reply_since',
+            field=models.DateTimeField(blank=True, help_text='When the oldest message this participant has not replied to was sent', null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0013_inboxentry_awaiting_reply_since'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('title', models.CharField(max_length=255)),
+                ('content', models.TextField()),
+                ('roles', models.JSONField(blank=True, default=list, help_text='User roles to reach; empty for all roles')),
+                ('states', models.JSONField(blank=True, default=list, help_text='Address states to reach; empty for any')),
+                ('cities', models.JSONField(blank=True, default=list, help_text='Address cities to reach; empty for any')),
+                ('zip_codes', models.JSONField(blank=True, default=list, help_text='Address ZIP codes to reach; empty for any')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENDING', 'Sending'), ('COMPLETE', 'Complete'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('recipient_count', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('last_user_id', models.BigIntegerField(default=0, help_text='Recipients up to this user id have been notified')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcasts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
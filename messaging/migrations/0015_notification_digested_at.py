@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0014_broadcast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='digested_at',
+            field=models.DateTimeField(blank=True, help_text='When the notification was included in an email digest', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('digested_at__isnull', True), ('read', False)), fields=['created_at'], name='notification_digest_pending'),
+        ),
+    ]
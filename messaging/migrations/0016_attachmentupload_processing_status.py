@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0015_notification_digested_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attachmentupload',
+            name='status',
+            field=models.CharField(choices=[('IN_PROGRESS', 'In progress'), ('PROCESSING', 'Processing'), ('COMPLETE', 'Complete'), ('FAILED', 'Failed')], default='IN_PROGRESS', max_length=20),
+        ),
+    ]
@@ -0,0 +1,60 @@
+import hashlib
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_missing_participant_keys(apps, schema_editor):
+    """
+    Give participant sets without a canonical conversation their oldest keyless one.
+
+    0010 keyed the conversations that existed then; conversations opened
+    through the create endpoint afterwards were left without a key.
+    """
+    Conversation = apps.get_model('messaging', 'Conversation')
+    participants_field = Conversation._meta.get_field('participants')
+    Participant = participants_field.remote_field.through
+    participant_user = f'{participants_field.m2m_reverse_field_name()}_id'
+
+    last_id = 0
+    while True:
+        ids = list(
+            Conversation.objects.filter(
+                id__gt=last_id, participant_key__isnull=True
+            ).order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        members = {}
+        for conversation_id, user_id in Participant.objects.filter(
+            conversation_id__in=ids
+        ).values_list('conversation_id', participant_user):
+            members.setdefault(conversation_id, []).append(user_id)
+
+        keys = {}
+        for conversation_id in ids:
+            user_ids = set(members.get(conversation_id, ()))
+            if len(user_ids) < 2:
+                continue
+            canonical = ','.join(str(user_id) for user_id in sorted(user_ids))
+            keys.setdefault(hashlib.sha256(canonical.encode()).hexdigest(), conversation_id)
+        taken = set(Conversation.objects.filter(participant_key__in=list(keys)).values_list('participant_key', flat=True))
+        Conversation.objects.bulk_update(
+            [Conversation(id=conversation_id, participant_key=key) for key, conversation_id in keys.items()
+             if key not in taken],
+            ['participant_key'],
+            batch_size=BATCH_SIZE
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0016_attachmentupload_processing_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_missing_participant_keys, migrations.RunPython.noop),
+    ]
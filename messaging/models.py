@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from core.models import TimeStampedModel
@@ -10,6 +12,14 @@ class Conversation(TimeStampedModel):
         related_name='conversations'
     )
     title = models.CharField(max_length=255, blank=True)
+    participant_key = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Hash of the sorted participant ids of the canonical conversation between them'
+    )
     
     class Meta:
         ordering = ['-updated_at']
@@ -22,6 +32,30 @@ class Conversation(TimeStampedModel):
         return self.messages.order_by('-created_at').first()
 
 
+class Attachment(TimeStampedModel):
+    """A stored file, shared by every message that sent the same content"""
+    THUMBNAIL_STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+        ('NONE', 'Not applicable'),
+    )
+    
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='message_attachments/', max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    thumbnail = models.ImageField(upload_to='message_attachments/thumbnails/', blank=True, null=True)
+    thumbnail_status = models.CharField(max_length=10, choices=THUMBNAIL_STATUS_CHOICES, default='NONE')
+    
+    def __str__(self):
+        return f"Attachment {self.sha256[:12]} ({self.size} bytes)"
+    
+    @property
+    def is_image(self):
+        return self.content_type.startswith('image/')
+
+
 class Message(TimeStampedModel):
     """A message within a conversation"""
     conversation = models.ForeignKey(
@@ -34,15 +68,19 @@ class Message(TimeStampedModel):
         on_delete=models.CASCADE,
         related_name='sent_messages'
     )
-    content = models.TextField()
-    read_by = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name='read_messages',
-        blank=True
+    content = models.TextField(blank=True)
+    attachments = models.ManyToManyField(
+        Attachment,
+        blank=True,
+        related_name='messages'
     )
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Keyset pagination of a conversation's history
+            models.Index(fields=['conversation', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Message {self.id} from {self.sender.name}"
@@ -50,8 +88,10 @@ class Message(TimeStampedModel):
     @property
     def is_read(self):
         """Check if message has been read by all participants"""
-        participants = self.conversation.participants.all()
-        return all(participant in self.read_by.all() for participant in participants if participant != self.sender)
+        return not InboxEntry.objects.filter(
+            conversation_id=self.conversation_id,
+            last_read_message_id__lt=self.id
+        ).exclude(user_id=self.sender_id).exists()
 
 
 class Notification(TimeStampedModel):
@@ -60,6 +100,7 @@ class Notification(TimeStampedModel):
         ('MESSAGE', 'New Message'),
         ('REVIEW', 'New Review'),
         ('PAYMENT', 'Payment Update'),
+        ('APPOINTMENT', 'Appointment Update'),
         ('SYSTEM', 'System Notification'),
     )
     
@@ -74,9 +115,181 @@ class Notification(TimeStampedModel):
     read = models.BooleanField(default=False)
     related_object_id = models.PositiveIntegerField(null=True, blank=True)
     related_object_type = models.CharField(max_length=50, blank=True)
+    count = models.PositiveIntegerField(
+        default=1,
+        help_text='Number of events coalesced into this notification'
+    )
+    latest_at = models.DateTimeField(null=True, blank=True)
+    digested_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the notification was included in an email digest'
+    )
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Probe for notifications newer than a change feed cursor
+            models.Index(fields=['user', 'id']),
+            # Scan of the notifications a digest run still has to summarize
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(read=False, digested_at__isnull=True),
+                name='notification_digest_pending'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} notification for {self.user.email}"
+
+
+class InboxEntry(TimeStampedModel):
+    """A participant's denormalized view of a conversation in their inbox"""
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='inbox_entries'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='inbox_entries'
+    )
+    last_message = models.ForeignKey(
+        Message,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+    last_read_message_id = models.BigIntegerField(
+        default=0,
+        help_text='Read cursor: every message up to this id has been read'
+    )
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    awaiting_reply_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the oldest message this participant has not replied to was sent'
+    )
+    
+    class Meta:
+        ordering = ['-last_message_at']
+        unique_together = ['conversation', 'user']
+        indexes = [
+            models.Index(fields=['user', '-last_message_at']),
+        ]
+        verbose_name_plural = 'Inbox entries'
+    
+    def __str__(self):
+        return f"Inbox entry for {self.user.email} in conversation {self.conversation_id}"
+
+
+class MessageArchive(TimeStampedModel):
+    """A compressed block of old messages moved out of the Message table"""
+    CODEC_ZLIB_JSON = 'zlib+json'
+    
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='message_archives'
+    )
+    codec = models.CharField(max_length=20, default=CODEC_ZLIB_JSON)
+    data = models.BinaryField()
+    message_count = models.PositiveIntegerField()
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    raw_size = models.PositiveIntegerField(help_text='Size of the uncompressed payload in bytes')
+    
+    class Meta:
+        ordering = ['conversation', 'first_created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'first_created_at']),
+            models.Index(fields=['conversation', 'last_created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Archive of {self.message_count} messages in conversation {self.conversation_id}"
+
+
+class UploadStatus(models.TextChoices):
+    IN_PROGRESS = 'IN_PROGRESS', 'In progress'
+    PROCESSING = 'PROCESSING', 'Processing'
+    COMPLETE = 'COMPLETE', 'Complete'
+    FAILED = 'FAILED', 'Failed'
+
+
+class AttachmentUpload(TimeStampedModel):
+    """A resumable upload of an attachment, received in chunks"""
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attachment_uploads'
+    )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='attachment_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    chunk_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=UploadStatus.choices, default=UploadStatus.IN_PROGRESS)
+    attachment = models.ForeignKey(
+        Attachment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='uploads'
+    )
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Upload {self.token} of {self.filename} ({self.received_size}/{self.total_size})"
+
+
+class BroadcastStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    SENDING = 'SENDING', 'Sending'
+    COMPLETE = 'COMPLETE', 'Complete'
+    FAILED = 'FAILED', 'Failed'
+
+
+class Broadcast(TimeStampedModel):
+    """An announcement sent by an admin as a notification to many users"""
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='broadcasts'
+    )
+    title = models.CharField(max_length=255)
+    content = models.TextField()
+    roles = models.JSONField(default=list, blank=True, help_text='User roles to reach; empty for all roles')
+    states = models.JSONField(default=list, blank=True, help_text='Address states to reach; empty for any')
+    cities = models.JSONField(default=list, blank=True, help_text='Address cities to reach; empty for any')
+    zip_codes = models.JSONField(default=list, blank=True, help_text='Address ZIP codes to reach; empty for any')
+    status = models.CharField(max_length=20, choices=BroadcastStatus.choices, default=BroadcastStatus.PENDING)
+    recipient_count = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    last_user_id = models.BigIntegerField(
+        default=0,
+        help_text='Recipients up to this user id have been notified'
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Broadcast {self.title} ({self.sent_count}/{self.recipient_count})"
@@ -0,0 +1,161 @@
+"""
+Change signals for the long-poll notification feed.
+
+A waiting request first subscribes, then probes the database for
+notifications newer than its cursor, and only waits if there are none, so
+a notification created between the probe and the wait is never missed.
+Waiting costs no queries and no thread: the async view awaits until a change
+is signalled for its user or the timeout passes.
+
+Within one process the signal is an asyncio event per waiting request, set
+thread-safely by whichever thread commits the notification. When REDIS_URL
+is configured the signal is a Redis pub/sub message instead, so a
+notification created by any worker wakes waiters in every other worker.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+CHANNEL_PREFIX = 'notifications.user.'
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessNotificationBus:
+    """Wake waiting requests in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = {}
+
+    def publish(self, user_ids):
+        with self.lock:
+            subscriptions = [
+                subscription
+                for user_id in user_ids
+                for subscription in self.waiters.get(user_id, ())
+            ]
+        for subscription in subscriptions:
+            subscription.signal()
+
+    async def subscribe(self, user_id):
+        subscription = InProcessSubscription(self, user_id)
+        with self.lock:
+            self.waiters.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            waiters = self.waiters.get(subscription.user_id)
+            if waiters is not None:
+                waiters.discard(subscription)
+                if not waiters:
+                    del self.waiters[subscription.user_id]
+
+
+class InProcessSubscription:
+
+    def __init__(self, bus, user_id):
+        self.bus = bus
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def signal(self):
+        """Set the event from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # The waiting request's event loop has already closed
+            pass
+
+    async def wait(self, timeout):
+        """Wait until the user's notifications change; return False on timeout."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def close(self):
+        self.bus.unsubscribe(self)
+
+
+class RedisNotificationBus:
+    """Wake waiting requests in every process through Redis pub/sub"""
+
+    def __init__(self, url):
+        import redis
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        self.errors = (redis.RedisError, OSError)
+
+    def publish(self, user_ids):
+        """Publish change messages; the notifications are already committed, so failures are only logged."""
+        pipeline = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipeline.publish(f'{CHANNEL_PREFIX}{user_id}', 1)
+        try:
+            pipeline.execute()
+        except self.errors:
+            logger.exception('Could not publish notification changes to Redis')
+
+    async def subscribe(self, user_id):
+        subscription = RedisSubscription(self.url, user_id)
+        await subscription.pubsub.subscribe(f'{CHANNEL_PREFIX}{user_id}')
+        return subscription
+
+
+class RedisSubscription:
+
+    def __init__(self, url, user_id):
+        # Async clients belong to the event loop they are used on, so each
+        # waiting request gets its own connection
+        import redis.asyncio
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+
+    async def wait(self, timeout):
+        """Wait until a change message arrives; return False on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if await self.pubsub.get_message(timeout=remaining) is not None:
+                return True
+
+    async def close(self):
+        await self.pubsub.close()
+        await self.client.close()
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """Return the process-wide notification bus for the configured backend."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                redis_url = getattr(settings, 'REDIS_URL', '')
+                _bus = RedisNotificationBus(redis_url) if redis_url else InProcessNotificationBus()
+    return _bus
+
+
+def notify_users(user_ids):
+    """
+    Wake long-poll requests of users whose notifications changed.
+
+    Call after creating notifications with bulk_create, which sends no
+    post_save signal; the signal is sent once the transaction commits.
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: get_bus().publish(user_ids))
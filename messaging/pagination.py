@@ -0,0 +1,134 @@
+"""
+Keyset pagination for message history.
+
+Messages are fetched in windows relative to a cursor on (created_at, id)
+instead of by page number, so every page is a bounded range scan of the
+(conversation, created_at, id) index and no count query is needed. Views
+with an archived_messages(key, direction, limit) method continue into
+archived history once the hot rows run out.
+
+    ?before=<cursor>  older messages, the most recent window when omitted
+    ?after=<cursor>   newer messages, e.g. to catch up after reconnecting
+    ?limit=<n>        window size
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def encode_cursor(message):
+    """Return an opaque cursor pointing at a message."""
+    raw = f'{message.created_at.isoformat()}|{message.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor into its (created_at, id) key.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, message_id = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        message_id = int(message_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if created_at is None:
+        raise ValueError('Invalid cursor')
+    return created_at, message_id
+
+
+class MessageHistoryPagination(BasePagination):
+    """Window through a conversation's messages with before/after cursors"""
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(limit, 1), self.max_page_size)
+
+    def get_cursor(self, request, name):
+        cursor = request.query_params.get(name)
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        limit = self.get_limit(request)
+        after = self.get_cursor(request, 'after')
+        before = None if after else self.get_cursor(request, 'before')
+        self.direction = 'after' if after else 'before'
+
+        if after:
+            created_at, message_id = after
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=message_id)
+            ).order_by('created_at', 'id')
+        else:
+            if before:
+                created_at, message_id = before
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+                )
+            queryset = queryset.order_by('-created_at', '-id')
+
+        # One extra row tells whether there is more without counting
+        archived = getattr(view, 'archived_messages', None)
+        if self.direction == 'after' and archived:
+            # Archived messages are all older than hot ones
+            window = archived(after, 'after', limit + 1)
+            if len(window) <= limit:
+                window += list(queryset[:limit + 1 - len(window)])
+        else:
+            window = list(queryset[:limit + 1])
+            if archived and len(window) <= limit:
+                window += archived(before, 'before', limit + 1 - len(window))
+        self.has_more = len(window) > limit
+        window = window[:limit]
+        if self.direction == 'before':
+            window.reverse()
+        self.window = window
+        return window
+
+    def get_paginated_response(self, data):
+        first = encode_cursor(self.window[0]) if self.window else None
+        last = encode_cursor(self.window[-1]) if self.window else None
+        if self.direction == 'before':
+            next_cursor = first if self.has_more else None
+        else:
+            next_cursor = last if self.has_more else None
+        return Response({
+            'results': data,
+            'has_more': self.has_more,
+            'next': next_cursor,
+            'before': first,
+            'after': last,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        cursor = {'type': 'string', 'nullable': True}
+        return {
+            'type': 'object',
+            'properties': {
+                'results': schema,
+                'has_more': {'type': 'boolean'},
+                'next': cursor,
+                'before': cursor,
+                'after': cursor,
+            },
+        }
@@ -0,0 +1,77 @@
+"""
+Publishing of real-time messaging events to connected WebSocket clients.
+
+Every connected user joins a channel layer group of their own; events for a
+conversation are fanned out to the groups of its participants. Events are
+published only after the surrounding transaction commits, so clients never
+hear about rows they cannot read yet. Publishing is best effort: the rows are
+already committed, so a channel layer failure is logged rather than raised.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import InboxEntry
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    """Return the channel layer group name of a user's connections."""
+    return f'messaging.user.{user_id}'
+
+
+def participant_ids(conversation_id):
+    """Return the ids of a conversation's participants from their inbox entries."""
+    return list(InboxEntry.objects.filter(conversation_id=conversation_id).values_list('user_id', flat=True))
+
+
+def send_to_users(user_ids, event):
+    """Send an event to every connection of the given users, logging channel layer failures."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        for user_id in user_ids:
+            async_to_sync(channel_layer.group_send)(user_group(user_id), {'type': 'messaging.event', 'event': event})
+    except Exception:
+        logger.exception('Could not publish %s event to the channel layer', event.get('type'))
+
+
+def publish_on_commit(conversation_id, event, exclude_user_id=None):
+    """Fan an event out to a conversation's participants once the transaction commits."""
+    def publish():
+        user_ids = [user_id for user_id in participant_ids(conversation_id) if user_id != exclude_user_id]
+        send_to_users(user_ids, event)
+    transaction.on_commit(publish)
+
+
+def publish_message(message):
+    """
+    Push a newly created message to the participants of its conversation.
+
+    The message is serialized after commit so attachments added in the same
+    transaction are included.
+    """
+    from .serializers import MessageSerializer
+
+    def publish():
+        event = {
+            'type': 'message.created',
+            'conversation': message.conversation_id,
+            'message': dict(MessageSerializer(message).data),
+        }
+        send_to_users(participant_ids(message.conversation_id), event)
+    transaction.on_commit(publish)
+
+
+def publish_read_receipt(conversation_id, user_id, message_id):
+    """Tell the other participants how far a user has read."""
+    publish_on_commit(conversation_id, {
+        'type': 'message.read',
+        'conversation': conversation_id,
+        'user': user_id,
+        'last_read_message_id': message_id,
+    }, exclude_user_id=user_id)
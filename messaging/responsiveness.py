@@ -0,0 +1,85 @@
+"""
+How quickly pros reply to messages.
+
+Each participant's inbox entry remembers since when they have owed a reply
+(awaiting_reply_since: the oldest message from someone else they have not
+answered). When a contractor sends a message while owing a reply, the time
+since then is one first-response observation. Observations update P²
+quantile sketches of the median and 90th percentile stored on the
+contractor's profile, so the directory can show and sort by responsiveness
+without reading messages.
+"""
+from django.db import transaction
+
+from contractors.models import ContractorProfile
+from core.quantiles import P2Quantile
+
+QUANTILES = {'p50': 0.5, 'p90': 0.9}
+
+
+class ResponseTimeSketch:
+    """The median and p90 sketches of one contractor"""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.sketches = {name: P2Quantile(p, state.get(name)) for name, p in QUANTILES.items()}
+
+    def add(self, seconds):
+        for sketch in self.sketches.values():
+            sketch.add(seconds)
+
+    def apply_to(self, profile):
+        """Copy the estimates and sketch state onto a contractor profile."""
+        profile.response_time_sketch = {name: sketch.to_dict() for name, sketch in self.sketches.items()}
+        profile.response_time_median = self.sketches['p50'].value()
+        profile.response_time_p90 = self.sketches['p90'].value()
+        profile.response_count = self.sketches['p50'].count
+
+
+def record_response_time(user_id, seconds):
+    """
+    Add a first-response observation for a contractor.
+
+    Args:
+        user_id: The id of the user who replied; ignored unless they have a
+            contractor profile.
+        seconds: How long they took to reply.
+    """
+    with transaction.atomic():
+        profile = ContractorProfile.objects.select_for_update().filter(user_id=user_id).only(
+            'id', 'response_time_sketch'
+        ).first()
+        if profile is None:
+            return
+        sketch = ResponseTimeSketch(profile.response_time_sketch)
+        sketch.add(max(seconds, 0))
+        sketch.apply_to(profile)
+        profile.save(update_fields=[
+            'response_time_sketch', 'response_time_median', 'response_time_p90', 'response_count', 'updated_at'
+        ])
+
+
+def replay_conversation(messages, participant_ids, sketches):
+    """
+    Replay a conversation's messages to rebuild response times.
+
+    Args:
+        messages: The conversation's messages, oldest first.
+        participant_ids: The ids of its current participants.
+        sketches: user id -> ResponseTimeSketch of every contractor; their
+            replies are added to it.
+
+    Returns:
+        dict: participant id -> awaiting_reply_since after the last message.
+    """
+    awaiting = dict.fromkeys(participant_ids)
+    for message in messages:
+        since = awaiting.get(message.sender_id)
+        if since is not None and message.sender_id in sketches:
+            sketches[message.sender_id].add(max((message.created_at - since).total_seconds(), 0))
+        for user_id in awaiting:
+            if user_id == message.sender_id:
+                awaiting[user_id] = None
+            elif awaiting[user_id] is None:
+                awaiting[user_id] = message.created_at
+    return awaiting
@@ -0,0 +1,144 @@
+"""
+Full-text search over the messages of a user's conversations.
+
+On PostgreSQL messages are matched with a GIN index on
+to_tsvector('english', content); on SQLite with an external-content FTS5
+table kept in sync by triggers (see migration 0009). Other databases fall
+back to a case-insensitive substring scan.
+
+Results are ordered newest first and paginated by message id, so every page
+is a bounded scan below the previous page's last id. Snippets mark matches
+with <mark> tags; the surrounding text is HTML-escaped.
+"""
+import html
+import re
+
+from django.db import connection
+
+from .models import InboxEntry, Message
+
+FTS_TABLE = 'messaging_message_fts'
+SNIPPET_WORDS = 16
+# Control characters cannot occur in user text, so they can mark matches
+# inside the database before the snippet is escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def render_snippet(raw):
+    """Escape a snippet and turn the match markers into <mark> tags."""
+    escaped = html.escape(raw.replace(MATCH_START, '').replace(MATCH_END, ''), quote=False)
+    if MATCH_START not in raw:
+        return escaped
+    parts = []
+    for index, chunk in enumerate(re.split(f'[{MATCH_START}{MATCH_END}]', raw)):
+        chunk = html.escape(chunk, quote=False)
+        parts.append(f'<mark>{chunk}</mark>' if index % 2 else chunk)
+    return ''.join(parts)
+
+
+def fts5_query(terms):
+    """Quote each term so user input cannot use FTS5 query syntax; the last term matches as a prefix."""
+    quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_sqlite(user_id, terms, before, limit):
+    sql = f"""
+        SELECT m.id, snippet({FTS_TABLE}, 0, %s, %s, '…', {SNIPPET_WORDS})
+        FROM {FTS_TABLE}
+        JOIN messaging_message m ON m.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s
+          AND m.conversation_id IN (
+              SELECT conversation_id FROM messaging_inboxentry WHERE user_id = %s
+          )
+          {'AND m.id < %s' if before else ''}
+        ORDER BY m.id DESC
+        LIMIT %s
+    """
+    params = [MATCH_START, MATCH_END, fts5_query(terms), user_id]
+    if before:
+        params.append(before)
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_postgresql(user_id, terms, before, limit):
+    headline_options = (
+        f'StartSel={MATCH_START}, StopSel={MATCH_END}, '
+        f'MaxWords={SNIPPET_WORDS}, MinWords=5, MaxFragments=1'
+    )
+    sql = f"""
+        SELECT m.id, ts_headline('english', m.content, query, %s)
+        FROM messaging_message m, plainto_tsquery('english', %s) query
+        WHERE to_tsvector('english', m.content) @@ query
+          AND m.conversation_id IN (
+              SELECT conversation_id FROM messaging_inboxentry WHERE user_id = %s
+          )
+          {'AND m.id < %s' if before else ''}
+        ORDER BY m.id DESC
+        LIMIT %s
+    """
+    params = [headline_options, ' '.join(terms), user_id]
+    if before:
+        params.append(before)
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_fallback(user_id, terms, before, limit):
+    messages = Message.objects.filter(
+        conversation_id__in=InboxEntry.objects.filter(user_id=user_id).values('conversation_id')
+    )
+    for term in terms:
+        messages = messages.filter(content__icontains=term)
+    if before:
+        messages = messages.filter(id__lt=before)
+    rows = []
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    for message_id, content in messages.order_by('-id').values_list('id', 'content')[:limit]:
+        match = pattern.search(content)
+        start = max(match.start() - 60, 0) if match else 0
+        excerpt = content[start:start + 160]
+        excerpt = pattern.sub(lambda found: f'{MATCH_START}{found.group(0)}{MATCH_END}', excerpt)
+        rows.append((message_id, ('…' if start else '') + excerpt))
+    return rows
+
+
+SEARCH_BACKENDS = {
+    'sqlite': search_sqlite,
+    'postgresql': search_postgresql,
+}
+
+
+def search_messages(user, query, before=None, limit=20):
+    """
+    Search the messages of conversations a user takes part in.
+
+    Args:
+        user: The user searching.
+        query: Free text; every word must match.
+        before: Only return messages with a smaller id (the keyset cursor).
+        limit: The maximum number of results.
+
+    Returns:
+        list: (message, snippet) pairs, newest first, with the sender loaded.
+    """
+    terms = TOKEN_RE.findall(query or '')
+    if not terms:
+        return []
+    backend = SEARCH_BACKENDS.get(connection.vendor, search_fallback)
+    rows = backend(user.id, terms, before, limit)
+    messages = Message.objects.select_related('sender').in_bulk([message_id for message_id, _ in rows])
+    return [
+        (messages[message_id], render_snippet(snippet))
+        for message_id, snippet in rows
+        if message_id in messages
+    ]
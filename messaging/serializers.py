@@ -1,6 +1,14 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.db import transaction
 from django.contrib.auth import get_user_model
-from .models import Conversation, Message, Notification
+from core.tasks import enqueue
+from users.models import UserRole
+from .conversations import claim_participant_key
+from .fanout import fan_out_message_notifications
+from .inbox import message_is_read, read_cursors
+from .membership import is_participant
+from .models import Attachment, AttachmentUpload, Broadcast, Conversation, Message, Notification, UploadStatus
 
 User = get_user_model()
 
@@ -12,32 +20,110 @@ class UserBasicSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'name', 'role']
 
 
+class AttachmentSerializer(serializers.ModelSerializer):
+    """Serializer for stored message attachments"""
+    url = serializers.FileField(source='file', read_only=True, use_url=True)
+    thumbnail_url = serializers.ImageField(source='thumbnail', read_only=True, use_url=True)
+    
+    class Meta:
+        model = Attachment
+        fields = ['id', 'url', 'content_type', 'size', 'sha256', 'thumbnail_url', 'thumbnail_status']
+
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    """Serializer for opening and following a chunked attachment upload"""
+    chunk_size = serializers.SerializerMethodField()
+    attachment = AttachmentSerializer(read_only=True)
+    
+    class Meta:
+        model = AttachmentUpload
+        fields = ['token', 'filename', 'content_type', 'total_size', 'received_size', 'chunk_size',
+                  'status', 'attachment', 'created_at']
+        read_only_fields = ['token', 'received_size', 'status', 'created_at']
+    
+    def get_chunk_size(self, obj):
+        return settings.ATTACHMENT_CHUNK_SIZE
+
+
 class MessageSerializer(serializers.ModelSerializer):
     """Serializer for messages"""
     sender = UserBasicSerializer(read_only=True)
-    is_read = serializers.BooleanField(read_only=True)
+    is_read = serializers.SerializerMethodField()
+    attachments = serializers.SerializerMethodField()
     
     class Meta:
         model = Message
-        fields = ['id', 'sender', 'content', 'created_at', 'is_read']
+        fields = ['id', 'sender', 'content', 'created_at', 'is_read', 'attachments']
         read_only_fields = ['created_at']
+    
+    def get_attachments(self, obj):
+        """Attachments of hot messages are prefetched; archived ones carry their own"""
+        attachments = getattr(obj, 'archived_attachments', None)
+        if attachments is None:
+            attachments = obj.attachments.all()
+        return AttachmentSerializer(attachments, many=True, context=self.context).data
+    
+    def get_is_read(self, obj):
+        """
+        Check the message against its conversation's read cursors.
+
+        Views preload them; otherwise they are loaded once per conversation
+        and kept in the context, never queried per message.
+        """
+        loaded = self.context.setdefault('read_cursors', {})
+        if obj.conversation_id not in loaded:
+            loaded.update(read_cursors([obj.conversation_id]) or {obj.conversation_id: {}})
+        return message_is_read(obj, loaded[obj.conversation_id])
 
 
 class ConversationSerializer(serializers.ModelSerializer):
     """Serializer for conversations"""
     participants = UserBasicSerializer(many=True, read_only=True)
-    last_message = MessageSerializer(read_only=True)
+    last_message = serializers.SerializerMethodField()
+    last_activity = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
-        fields = ['id', 'participants', 'title', 'created_at', 'updated_at', 'last_message', 'unread_count']
+        fields = ['id', 'participants', 'title', 'created_at', 'updated_at', 'last_message',
+                  'last_activity', 'unread_count']
         read_only_fields = ['created_at', 'updated_at']
     
+    def get_inbox_entry(self, obj):
+        """Return the current user's inbox entry, prefetched by the viewset when listing"""
+        entries = getattr(obj, 'user_inbox_entries', None)
+        if entries is None:
+            user = self.context['request'].user
+            entries = list(obj.inbox_entries.filter(user=user).select_related('last_message__sender'))
+            obj.user_inbox_entries = entries
+        return entries[0] if entries else None
+    
+    def get_last_message(self, obj):
+        """Get the last message from the current user's inbox entry"""
+        entry = self.get_inbox_entry(obj)
+        message = entry.last_message if entry else obj.last_message
+        if message is None:
+            return None
+        context = self.context
+        cursors = getattr(obj, 'read_cursor_entries', None)
+        if cursors is not None:
+            context = {
+                **self.context,
+                'read_cursors': {obj.id: {entry.user_id: entry.last_read_message_id for entry in cursors}},
+            }
+        return MessageSerializer(message, context=context).data
+    
+    def get_last_activity(self, obj):
+        """Get when the last message in the conversation was sent"""
+        entry = self.get_inbox_entry(obj)
+        if entry is None or entry.last_message_at is None:
+            return None
+        return serializers.DateTimeField().to_representation(entry.last_message_at)
+    
     def get_unread_count(self, obj):
         """Get count of unread messages for the current user"""
-        user = self.context['request'].user
-        return obj.messages.exclude(read_by=user).exclude(sender=user).count()
+        entry = self.get_inbox_entry(obj)
+        return entry.unread_count if entry else 0
 
 
 class ConversationCreateSerializer(serializers.ModelSerializer):
@@ -67,6 +153,7 @@ class ConversationCreateSerializer(serializers.ModelSerializer):
         
         conversation = Conversation.objects.create(**validated_data)
         conversation.participants.set(participants)
+        claim_participant_key(conversation, [participant.id for participant in participants])
         
         # Create the first message
         Message.objects.create(
@@ -78,39 +165,83 @@ class ConversationCreateSerializer(serializers.ModelSerializer):
         return conversation
 
 
+class ConversationLookupSerializer(serializers.Serializer):
+    """Serializer for finding the conversation between a set of users"""
+    participants = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.all(),
+        many=True
+    )
+    title = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate_participants(self, participants):
+        """Ensure current user is included and someone else is too"""
+        user = self.context['request'].user
+        if user not in participants:
+            participants.append(user)
+        if len(set(participants)) < 2:
+            raise serializers.ValidationError("A conversation needs at least one other participant")
+        return participants
+
+
+class MessageSearchResultSerializer(serializers.ModelSerializer):
+    """Serializer for a message found by search"""
+    sender = UserBasicSerializer(read_only=True)
+    
+    class Meta:
+        model = Message
+        fields = ['id', 'conversation', 'sender', 'created_at']
+
+
 class MessageCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating a new message"""
+    uploads = serializers.ListField(
+        child=serializers.UUIDField(),
+        write_only=True,
+        required=False,
+        help_text='Tokens of completed attachment uploads to send with the message'
+    )
+    attachments = AttachmentSerializer(many=True, read_only=True)
+    
     class Meta:
         model = Message
-        fields = ['id', 'conversation', 'content']
+        fields = ['id', 'conversation', 'content', 'uploads', 'attachments']
     
     def validate_conversation(self, conversation):
         """Ensure user is a participant in the conversation"""
-        user = self.context['request'].user
-        if user not in conversation.participants.all():
+        request = self.context['request']
+        if not is_participant(request.user.id, conversation.id, request):
             raise serializers.ValidationError("You are not a participant in this conversation")
         return conversation
     
+    def validate(self, attrs):
+        """Resolve uploads and require some content"""
+        tokens = set(attrs.pop('uploads', []))
+        uploads = list(AttachmentUpload.objects.filter(
+            token__in=tokens,
+            user=self.context['request'].user,
+            conversation=attrs['conversation'],
+            status=UploadStatus.COMPLETE
+        )) if tokens else []
+        if len(uploads) != len(tokens):
+            raise serializers.ValidationError({'uploads': "Unknown or incomplete upload."})
+        if not attrs.get('content', '').strip() and not uploads:
+            raise serializers.ValidationError({'content': "A message needs content or an attachment."})
+        attrs['attachment_ids'] = [upload.attachment_id for upload in uploads]
+        return attrs
+    
     def create(self, validated_data):
-        """Create message and mark as read by sender"""
-        message = Message.objects.create(
-            conversation=validated_data['conversation'],
-            sender=self.context['request'].user,
-            content=validated_data['content']
-        )
-        message.read_by.add(self.context['request'].user)
-        
-        # Create notification for other participants
-        for participant in message.conversation.participants.all():
-            if participant != self.context['request'].user:
-                Notification.objects.create(
-                    user=participant,
-                    notification_type='MESSAGE',
-                    title=f"New message from {self.context['request'].user.name}",
-                    content=f"{self.context['request'].user.name} sent you a message",
-                    related_object_id=message.conversation.id,
-                    related_object_type='conversation'
-                )
+        """Create message and notify the other participants"""
+        with transaction.atomic():
+            message = Message.objects.create(
+                conversation=validated_data['conversation'],
+                sender=self.context['request'].user,
+                content=validated_data.get('content', '')
+            )
+            if validated_data['attachment_ids']:
+                message.attachments.set(validated_data['attachment_ids'])
+            
+            # Notify the other participants once the message is committed
+            enqueue(fan_out_message_notifications, message.id)
         
         return message
 
@@ -120,5 +251,22 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ['id', 'notification_type', 'title', 'content', 'created_at', 'read', 
-                  'related_object_id', 'related_object_type']
+                  'related_object_id', 'related_object_type', 'count', 'latest_at']
         read_only_fields = ['created_at']
+
+
+class BroadcastSerializer(serializers.ModelSerializer):
+    """Serializer for admin broadcasts and their progress"""
+    roles = serializers.ListField(
+        child=serializers.ChoiceField(choices=UserRole.choices), required=False
+    )
+    states = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    cities = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    zip_codes = serializers.ListField(child=serializers.CharField(max_length=20), required=False)
+    
+    class Meta:
+        model = Broadcast
+        fields = ['id', 'title', 'content', 'roles', 'states', 'cities', 'zip_codes', 'status',
+                  'recipient_count', 'sent_count', 'started_at', 'completed_at', 'created_at']
+        read_only_fields = ['status', 'recipient_count', 'sent_count', 'started_at', 'completed_at',
+                            'created_at']
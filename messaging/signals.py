@@ -0,0 +1,91 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from contractors.models import ContractorProfile
+from scheduling.models import Appointment
+from .badges import invalidate_badges
+from .conversations import refresh_participant_key
+from .inbox import add_inbox_entries, record_message, remove_inbox_entries
+from .membership import invalidate_membership
+from .models import Conversation, Message, Notification
+from .notification_feed import notify_users
+from .realtime import participant_ids, publish_message
+
+
+@receiver(post_save, sender=Message)
+def message_created(sender, instance, created, **kwargs):
+    """Keep participants' inboxes up to date and push the message to them"""
+    if created and not kwargs.get('raw'):
+        record_message(instance)
+        publish_message(instance)
+        invalidate_badges(participant_ids(instance.conversation_id))
+
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created, **kwargs):
+    """Wake the user's long-poll requests for new notifications"""
+    if created and not kwargs.get('raw'):
+        notify_users([instance.user_id])
+    invalidate_badges([instance.user_id])
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    invalidate_badges([instance.user_id])
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    """Upcoming appointment badges of both parties may have changed"""
+    if Appointment.contractor.is_cached(instance):
+        contractor_user_ids = [instance.contractor.user_id]
+    else:
+        # Read just the user id rather than loading the whole profile
+        contractor_user_ids = list(
+            ContractorProfile.objects.filter(pk=instance.contractor_id).values_list('user_id', flat=True)
+        )
+    invalidate_badges([instance.client_id] + contractor_user_ids)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Create or remove inbox entries as participants join or leave"""
+    if action in ('post_add', 'post_remove'):
+        invalidate_badges([instance.pk] if reverse else pk_set)
+        invalidate_membership(
+            [(conversation_id, instance.pk) for conversation_id in pk_set] if reverse
+            else [(instance.pk, user_id) for user_id in pk_set]
+        )
+    elif action == 'pre_clear':
+        # The rows are gone by post_clear, so collect who is affected now
+        if reverse:
+            pairs = [(conversation_id, instance.pk)
+                     for conversation_id in instance.conversations.values_list('id', flat=True)]
+        else:
+            pairs = [(instance.pk, user_id) for user_id in instance.participants.values_list('id', flat=True)]
+        invalidate_badges(user_id for _, user_id in pairs)
+        invalidate_membership(pairs)
+    if reverse:
+        # Changed from the user side: instance is a user, pk_set conversations
+        conversations = Conversation.objects.filter(pk__in=pk_set or [])
+        if action == 'post_add':
+            for conversation in conversations:
+                add_inbox_entries(conversation, [instance.pk])
+                refresh_participant_key(conversation)
+        elif action == 'post_remove':
+            for conversation in conversations:
+                remove_inbox_entries(conversation, [instance.pk])
+                refresh_participant_key(conversation)
+        elif action == 'post_clear':
+            instance.inbox_entries.all().delete()
+        return
+
+    if action == 'post_add':
+        add_inbox_entries(instance, pk_set)
+    elif action == 'post_remove':
+        remove_inbox_entries(instance, pk_set)
+    elif action == 'post_clear':
+        remove_inbox_entries(instance)
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        refresh_participant_key(instance)
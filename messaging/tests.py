@@ -0,0 +1,796 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import UserRole
+from .archive import archive_conversation, quiet_cutoff
+from .conversations import get_or_create_conversation, participant_key
+from .membership import membership_cache_key
+from .middleware import JWTAuthMiddleware
+from .models import Attachment, Conversation, InboxEntry, Message, MessageArchive, Notification, UploadStatus
+from .routing import websocket_urlpatterns
+from .search import search_messages
+from .throttling import parse_rate
+from .serializers import MessageSerializer
+
+User = get_user_model()
+
+
+class MessagingFixtures:
+    """Shared helpers: users, conversations and messages created through the ORM"""
+
+    def setUp(self):
+        # Badge, membership and throttle state lives in the cache
+        cache.clear()
+        self.user_count = 0
+
+    def create_user(self, role=UserRole.CLIENT):
+        self.user_count += 1
+        return User.objects.create_user(
+            email=f'user{self.user_count}@example.com', name=f'User {self.user_count}',
+            phone_number='1', password='pw12345!X', role=role
+        )
+
+    def create_conversation(self, *users, **kwargs):
+        conversation = Conversation.objects.create(**kwargs)
+        conversation.participants.set(users)
+        return conversation
+
+    def send(self, conversation, sender, content='Hello'):
+        return Message.objects.create(conversation=conversation, sender=sender, content=content)
+
+    def entry(self, conversation, user):
+        return InboxEntry.objects.get(conversation=conversation, user=user)
+
+
+class MessagingTestCase(MessagingFixtures, APITestCase):
+    """API tests run in a transaction rolled back after each test"""
+
+
+class InboxTests(MessagingTestCase):
+    """Denormalized last message and unread counts per participant"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+
+    def test_participants_get_inbox_entries(self):
+        self.assertEqual(
+            set(InboxEntry.objects.filter(conversation=self.conversation).values_list('user_id', flat=True)),
+            {self.alice.id, self.bob.id}
+        )
+
+    def test_messages_count_as_unread_for_recipients_only(self):
+        self.send(self.conversation, self.alice)
+        last = self.send(self.conversation, self.alice, 'Are you there?')
+
+        bob_entry = self.entry(self.conversation, self.bob)
+        alice_entry = self.entry(self.conversation, self.alice)
+        self.assertEqual(bob_entry.unread_count, 2)
+        self.assertEqual(bob_entry.last_message_id, last.id)
+        self.assertEqual(alice_entry.unread_count, 0)
+        self.assertEqual(alice_entry.last_read_message_id, last.id)
+
+    def test_reply_clears_the_senders_unread_count(self):
+        self.send(self.conversation, self.alice)
+        self.send(self.conversation, self.bob, 'Hi')
+
+        self.assertEqual(self.entry(self.conversation, self.bob).unread_count, 0)
+        self.assertEqual(self.entry(self.conversation, self.alice).unread_count, 1)
+
+    def test_conversation_list_reads_the_inbox(self):
+        self.send(self.conversation, self.alice, 'Quote attached')
+        self.client.force_authenticate(self.bob)
+
+        response = self.client.get(reverse('conversation-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        conversation = response.data['results'][0]
+        self.assertEqual(conversation['unread_count'], 1)
+        self.assertEqual(conversation['last_message']['content'], 'Quote attached')
+
+    def test_mark_read_resets_the_unread_count(self):
+        self.send(self.conversation, self.alice)
+        self.send(self.conversation, self.alice)
+        self.client.force_authenticate(self.bob)
+
+        response = self.client.post(reverse('conversation-mark-read', args=[self.conversation.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.entry(self.conversation, self.bob).unread_count, 0)
+
+
+class ReadCursorTests(MessagingTestCase):
+    """Messages are read once every other participant's cursor has reached them"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.carol = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob, self.carol)
+        self.messages = [self.send(self.conversation, self.alice, f'Message {index}') for index in range(3)]
+        self.url = reverse('conversation-message-list', args=[self.conversation.id])
+
+    def mark_read(self, user, message):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse('conversation-message-mark-read', args=[self.conversation.id, message.id])
+        )
+
+    def read_flags(self, user):
+        self.client.force_authenticate(user)
+        return [message['is_read'] for message in self.client.get(self.url).data['results']]
+
+    def test_read_only_when_every_recipient_has_read(self):
+        self.mark_read(self.bob, self.messages[1])
+
+        self.assertEqual(self.read_flags(self.alice), [False, False, False])
+        self.mark_read(self.carol, self.messages[2])
+        self.assertEqual(self.read_flags(self.alice), [True, True, False])
+        self.assertEqual(self.entry(self.conversation, self.bob).unread_count, 1)
+
+    def test_cursor_never_moves_backwards(self):
+        self.mark_read(self.bob, self.messages[2])
+        self.mark_read(self.bob, self.messages[0])
+
+        entry = self.entry(self.conversation, self.bob)
+        self.assertEqual(entry.last_read_message_id, self.messages[2].id)
+        self.assertEqual(entry.unread_count, 0)
+
+    def test_model_property_matches_the_cursors(self):
+        self.mark_read(self.bob, self.messages[0])
+        self.mark_read(self.carol, self.messages[0])
+
+        self.assertEqual([message.is_read for message in self.messages], [True, False, False])
+
+    def test_serializer_loads_cursors_once_without_view_context(self):
+        messages = list(Message.objects.filter(conversation=self.conversation).select_related('sender')
+                        .prefetch_related('attachments').order_by('id'))
+
+        with CaptureQueriesContext(connection) as queries:
+            data = MessageSerializer(messages, many=True).data
+
+        inbox_queries = [query for query in queries.captured_queries if 'messaging_inboxentry' in query['sql']]
+        self.assertEqual(len(inbox_queries), 1)
+        self.assertEqual([message['is_read'] for message in data], [False, False, False])
+
+
+class MessageHistoryPaginationTests(MessagingTestCase):
+    """Keyset windows over (created_at, id) with before/after cursors"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+        self.messages = [self.send(self.conversation, self.alice, f'Message {index}') for index in range(7)]
+        # Messages 2-4 share a timestamp, so the id breaks the tie
+        start = timezone.now() - timedelta(hours=1)
+        for message, minute in zip(self.messages, [0, 1, 2, 2, 2, 3, 4]):
+            Message.objects.filter(id=message.id).update(created_at=start + timedelta(minutes=minute))
+        self.url = reverse('conversation-message-list', args=[self.conversation.id])
+        self.client.force_authenticate(self.bob)
+
+    def contents(self, response):
+        return [message['content'] for message in response.data['results']]
+
+    def test_walk_back_through_history(self):
+        response = self.client.get(self.url, {'limit': 3})
+        pages = [self.contents(response)]
+        while response.data['next']:
+            response = self.client.get(self.url, {'limit': 3, 'before': response.data['next']})
+            pages.insert(0, self.contents(response))
+
+        self.assertEqual(pages[-1], ['Message 4', 'Message 5', 'Message 6'])
+        self.assertEqual(sum(pages, []), [f'Message {index}' for index in range(7)])
+        self.assertFalse(response.data['has_more'])
+
+    def test_catch_up_after_a_cursor(self):
+        response = self.client.get(self.url, {'limit': 2})
+        self.send(self.conversation, self.alice, 'Message 7')
+
+        response = self.client.get(self.url, {'after': response.data['after']})
+
+        self.assertEqual(self.contents(response), ['Message 7'])
+
+    def test_after_pages_forward_through_ties(self):
+        first = self.client.get(self.url, {'limit': 7}).data['results'][0]
+        cursor = self.client.get(self.url, {'limit': 7}).data['before']
+
+        response = self.client.get(self.url, {'after': cursor, 'limit': 3})
+
+        self.assertEqual(first['content'], 'Message 0')
+        self.assertEqual(self.contents(response), ['Message 1', 'Message 2', 'Message 3'])
+        self.assertTrue(response.data['has_more'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'before': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class MessageNotificationFanOutTests(MessagingTestCase):
+    """One unread MESSAGE notification per recipient and conversation"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.carol = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob, self.carol)
+        self.url = reverse('conversation-message-list', args=[self.conversation.id])
+
+    def post_message(self, sender, content='Hello'):
+        self.client.force_authenticate(sender)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'content': content}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def notifications(self, user):
+        return Notification.objects.filter(
+            user=user, notification_type='MESSAGE',
+            related_object_type='conversation', related_object_id=self.conversation.id
+        )
+
+    def test_messages_coalesce_into_one_notification(self):
+        for _ in range(3):
+            self.post_message(self.alice)
+
+        for user in (self.bob, self.carol):
+            notification = self.notifications(user).get()
+            self.assertEqual(notification.count, 3)
+            self.assertEqual(notification.title, f'3 new messages from {self.alice.name}')
+            self.assertFalse(notification.read)
+        self.assertFalse(self.notifications(self.alice).exists())
+
+    def test_read_notification_starts_a_new_count(self):
+        self.post_message(self.alice)
+        self.notifications(self.bob).update(read=True)
+
+        self.post_message(self.alice)
+
+        unread = self.notifications(self.bob).get(read=False)
+        self.assertEqual(unread.count, 1)
+        self.assertEqual(unread.title, f'New message from {self.alice.name}')
+        self.assertEqual(self.notifications(self.bob).count(), 2)
+
+
+class MessageSearchTests(MessagingTestCase):
+    """Full-text search kept in sync with message writes and scoped to the user's inbox"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.mallory = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+        self.url = reverse('conversation-search-messages')
+
+    def found(self, user, query):
+        return [message.id for message, _ in search_messages(user, query)]
+
+    def test_new_messages_are_indexed(self):
+        message = self.send(self.conversation, self.alice, 'The plumber arrives on Tuesday')
+
+        self.assertEqual(self.found(self.bob, 'plumber tuesday'), [message.id])
+        self.assertEqual(self.found(self.bob, 'plumb'), [message.id])
+        self.assertEqual(self.found(self.bob, 'electrician'), [])
+
+    def test_edits_and_deletes_update_the_index(self):
+        message = self.send(self.conversation, self.alice, 'Invoice for the roof')
+        message.content = 'Invoice for the gutters'
+        message.save()
+
+        self.assertEqual(self.found(self.bob, 'roof'), [])
+        self.assertEqual(self.found(self.bob, 'gutters'), [message.id])
+        message.delete()
+        self.assertEqual(self.found(self.bob, 'gutters'), [])
+
+    def test_results_are_scoped_to_the_users_conversations(self):
+        self.send(self.conversation, self.alice, 'Private estimate')
+        other = self.create_conversation(self.mallory, self.create_user())
+        visible = self.send(other, self.mallory, 'Public estimate')
+        self.client.force_authenticate(self.mallory)
+
+        response = self.client.get(self.url, {'q': 'estimate'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['message']['id'] for result in response.data['results']], [visible.id])
+
+    def test_snippets_mark_matches_and_escape_content(self):
+        self.send(self.conversation, self.alice, '<b>Deposit</b> received')
+        self.client.force_authenticate(self.bob)
+
+        response = self.client.get(self.url, {'q': 'deposit'})
+
+        self.assertEqual(response.data['results'][0]['snippet'], '&lt;b&gt;<mark>Deposit</mark>&lt;/b&gt; received')
+
+    def test_pages_by_id(self):
+        messages = [self.send(self.conversation, self.alice, f'Quote {index}') for index in range(3)]
+        self.client.force_authenticate(self.bob)
+
+        first = self.client.get(self.url, {'q': 'quote', 'limit': 2})
+        second = self.client.get(self.url, {'q': 'quote', 'limit': 2, 'before': first.data['next']})
+
+        self.assertEqual([result['message']['id'] for result in first.data['results']],
+                         [messages[2].id, messages[1].id])
+        self.assertEqual([result['message']['id'] for result in second.data['results']], [messages[0].id])
+        self.assertIsNone(second.data['next'])
+
+    def test_query_is_required(self):
+        self.client.force_authenticate(self.bob)
+
+        response = self.client.get(self.url, {'q': '  '})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConversationLookupTests(MessagingTestCase):
+    """One canonical conversation per participant set"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.url = reverse('conversation-lookup')
+        self.client.force_authenticate(self.alice)
+
+    def test_lookup_creates_then_returns_the_conversation(self):
+        created = self.client.post(self.url, {'participants': [self.bob.id]}, format='json')
+        found = self.client.post(self.url, {'participants': [self.bob.id, self.alice.id]}, format='json')
+
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(found.status_code, status.HTTP_200_OK)
+        self.assertEqual(found.data['id'], created.data['id'])
+
+    def test_lookup_needs_another_participant(self):
+        response = self.client.post(self.url, {'participants': [self.alice.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_created_conversation_claims_the_key(self):
+        response = self.client.post(
+            reverse('conversation-list'),
+            {'participants': [self.bob.id], 'initial_message': 'Hi'},
+            format='json'
+        )
+        found = self.client.post(self.url, {'participants': [self.bob.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(found.status_code, status.HTTP_200_OK)
+        self.assertEqual(found.data['id'], response.data['id'])
+
+    def test_concurrent_create_falls_back_to_the_winner(self):
+        winner = self.create_conversation(
+            self.alice, self.bob, participant_key=participant_key([self.alice.id, self.bob.id])
+        )
+
+        # The lookup misses, as if the other request committed just after it
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None):
+            conversation, created = get_or_create_conversation([self.alice.id, self.bob.id])
+
+        self.assertEqual(conversation, winner)
+        self.assertFalse(created)
+        self.assertEqual(Conversation.objects.count(), 1)
+
+
+class MembershipCacheTests(MessagingTestCase):
+    """Cached participant checks follow changes to the participants"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+        self.send(self.conversation, self.alice, 'Welcome')
+        self.url = reverse('conversation-message-list', args=[self.conversation.id])
+        self.client.force_authenticate(self.bob)
+
+    def test_membership_is_cached(self):
+        self.client.get(self.url)
+
+        self.assertIs(cache.get(membership_cache_key(self.conversation.id, self.bob.id)), True)
+
+    def test_removed_participant_loses_access(self):
+        self.assertEqual(len(self.client.get(self.url).data['results']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.remove(self.bob)
+
+        self.assertIsNone(cache.get(membership_cache_key(self.conversation.id, self.bob.id)))
+        self.assertEqual(self.client.get(self.url).data['results'], [])
+        response = self.client.post(self.url, {'content': 'Still here?'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_removal_from_the_user_side_drops_the_cache(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob.conversations.clear()
+
+        self.assertIsNone(cache.get(membership_cache_key(self.conversation.id, self.bob.id)))
+        self.assertEqual(self.client.get(self.url).data['results'], [])
+
+    def test_added_participant_gains_access(self):
+        carol = self.create_user()
+        self.client.force_authenticate(carol)
+        self.assertEqual(self.client.get(self.url).data['results'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.add(carol)
+
+        self.assertEqual(len(self.client.get(self.url).data['results']), 1)
+
+
+class MessageArchiveTests(MessagingTestCase):
+    """Archived history reads back seamlessly in front of the hot messages"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+        start = timezone.now() - timedelta(days=365)
+        for index in range(6):
+            message = self.send(self.conversation, self.alice, f'Message {index}')
+            Message.objects.filter(id=message.id).update(created_at=start + timedelta(minutes=index))
+        self.cutoff = quiet_cutoff(6)
+        self.url = reverse('conversation-message-list', args=[self.conversation.id])
+        self.client.force_authenticate(self.bob)
+
+    def contents(self, response):
+        return [message['content'] for message in response.data['results']]
+
+    def test_all_but_the_latest_message_is_archived(self):
+        archive = archive_conversation(self.conversation.id, self.cutoff)
+
+        self.assertEqual(archive.message_count, 5)
+        self.assertEqual(list(Message.objects.filter(conversation=self.conversation)
+                              .values_list('content', flat=True)), ['Message 5'])
+
+    def test_history_pages_across_the_archive_seam(self):
+        archive_conversation(self.conversation.id, self.cutoff)
+        for index in range(6, 8):
+            self.send(self.conversation, self.alice, f'Message {index}')
+
+        response = self.client.get(self.url, {'limit': 3})
+        pages = [self.contents(response)]
+        while response.data['next']:
+            response = self.client.get(self.url, {'limit': 3, 'before': response.data['next']})
+            pages.insert(0, self.contents(response))
+
+        self.assertEqual(sum(pages, []), [f'Message {index}' for index in range(8)])
+        self.assertEqual(pages[-2], ['Message 2', 'Message 3', 'Message 4'])
+
+    def test_after_cursor_continues_from_the_archive_into_hot_messages(self):
+        archive_conversation(self.conversation.id, self.cutoff)
+        self.send(self.conversation, self.alice, 'Message 6')
+        hot = self.client.get(self.url, {'limit': 2})
+        archived = self.client.get(self.url, {'limit': 1, 'before': hot.data['next']})
+
+        response = self.client.get(self.url, {'limit': 3, 'after': archived.data['after']})
+
+        self.assertEqual(self.contents(archived), ['Message 4'])
+        self.assertEqual(self.contents(response), ['Message 5', 'Message 6'])
+
+    def test_reply_after_the_cutoff_skips_the_conversation(self):
+        self.send(self.conversation, self.bob, 'Still interested?')
+
+        self.assertIsNone(archive_conversation(self.conversation.id, self.cutoff))
+        self.assertEqual(Message.objects.filter(conversation=self.conversation).count(), 7)
+        self.assertFalse(MessageArchive.objects.exists())
+
+    def test_command_archives_quiet_conversations(self):
+        active = self.create_conversation(self.alice, self.bob)
+        self.send(active, self.alice, 'Recent')
+        self.send(active, self.bob, 'Reply')
+
+        call_command('archive_conversations', stdout=StringIO())
+
+        self.assertEqual(list(MessageArchive.objects.values_list('conversation_id', flat=True)),
+                         [self.conversation.id])
+        self.assertEqual(Message.objects.filter(conversation=active).count(), 2)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, ATTACHMENT_CHUNK_SIZE=4)
+class AttachmentUploadTests(MessagingTestCase):
+    """Chunked uploads resume at Upload-Offset and are deduplicated by SHA-256"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+        self.client.force_authenticate(self.alice)
+
+    def open_upload(self, size):
+        response = self.client.post(
+            reverse('conversation-upload-list', args=[self.conversation.id]),
+            {'filename': 'quote.pdf', 'content_type': 'application/pdf', 'total_size': size},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['token']
+
+    def put_chunk(self, token, data, offset):
+        return self.client.put(
+            reverse('conversation-upload-chunk', args=[self.conversation.id, token]),
+            data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def upload(self, content):
+        token = self.open_upload(len(content))
+        for offset in range(0, len(content), 4):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.put_chunk(token, content[offset:offset + 4], offset)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], UploadStatus.PROCESSING)
+        return token
+
+    def get_upload(self, token):
+        return self.client.get(reverse('conversation-upload-detail', args=[self.conversation.id, token]))
+
+    def test_chunks_assemble_into_an_attachment(self):
+        token = self.upload(b'0123456789')
+
+        response = self.get_upload(token)
+
+        self.assertEqual(response.data['status'], UploadStatus.COMPLETE)
+        attachment = Attachment.objects.get()
+        self.assertEqual(attachment.size, 10)
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'0123456789')
+
+    def test_offset_mismatch_returns_the_offset_to_resume_from(self):
+        token = self.open_upload(10)
+        self.put_chunk(token, b'0123', 0)
+
+        response = self.put_chunk(token, b'0123', 0)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['received_size'], 4)
+        self.assertEqual(self.put_chunk(token, b'4567', 4).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_upload(token).data['received_size'], 8)
+
+    def test_oversized_chunk_is_rejected(self):
+        token = self.open_upload(10)
+
+        response = self.put_chunk(token, b'01234', 0)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_upload(token).data['received_size'], 0)
+
+    def test_identical_content_is_stored_once(self):
+        first = self.upload(b'same bytes')
+        second = self.upload(b'same bytes')
+
+        self.assertEqual(Attachment.objects.count(), 1)
+        self.assertEqual(self.get_upload(first).data['attachment']['id'],
+                         self.get_upload(second).data['attachment']['id'])
+
+    def test_non_participant_cannot_open_an_upload(self):
+        self.client.force_authenticate(self.create_user())
+
+        response = self.client.post(
+            reverse('conversation-upload-list', args=[self.conversation.id]),
+            {'filename': 'quote.pdf', 'content_type': 'application/pdf', 'total_size': 10},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(MESSAGING_RATE_LIMITS={
+    'message': {'default': '2/min', 'admin': None},
+    'conversation': {'default': '1/hour', 'contractor': '2/hour', 'admin': None},
+})
+class RateLimitTests(MessagingTestCase):
+    """Sliding-window limits per role on sending messages and starting conversations"""
+
+    def setUp(self):
+        super().setUp()
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+
+    def post_message(self, user, conversation=None):
+        self.client.force_authenticate(user)
+        conversation = conversation or self.conversation
+        return self.client.post(
+            reverse('conversation-message-list', args=[conversation.id]), {'content': 'Hi'}, format='json'
+        )
+
+    def start_conversation(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse('conversation-list'),
+            {'participants': [self.create_user().id], 'initial_message': 'Hi'},
+            format='json'
+        )
+
+    def test_limit_returns_429_with_retry_after(self):
+        self.post_message(self.alice)
+        self.post_message(self.alice)
+
+        response = self.post_message(self.alice)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+    def test_limit_is_per_user_and_conversation(self):
+        self.post_message(self.alice)
+        self.post_message(self.alice)
+        other = self.create_conversation(self.alice, self.create_user())
+
+        self.assertEqual(self.post_message(self.alice, other).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post_message(self.bob).status_code, status.HTTP_201_CREATED)
+
+    def test_admins_are_not_limited(self):
+        admin = self.create_user(role=UserRole.ADMIN)
+        self.conversation.participants.add(admin)
+
+        responses = [self.post_message(admin).status_code for _ in range(3)]
+
+        self.assertEqual(responses, [status.HTTP_201_CREATED] * 3)
+
+    def test_conversation_limit_depends_on_role(self):
+        contractor = self.create_user(role=UserRole.CONTRACTOR)
+
+        client_responses = [self.start_conversation(self.alice).status_code for _ in range(2)]
+        contractor_responses = [self.start_conversation(contractor).status_code for _ in range(3)]
+
+        self.assertEqual(client_responses, [status.HTTP_201_CREATED, status.HTTP_429_TOO_MANY_REQUESTS])
+        self.assertEqual(contractor_responses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_malformed_body_is_a_bad_request(self):
+        self.client.force_authenticate(self.alice)
+
+        response = self.client.post(
+            reverse('conversation-message-list', args=[self.conversation.id]), ['Hi'], format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('20/min'), (20, 60))
+        self.assertEqual(parse_rate('5/hour'), (5, 3600))
+        self.assertEqual(parse_rate(None), (None, None))
+        for rate in ('0/min', 'ten/min', '5', '5/week'):
+            with self.subTest(rate=rate), self.assertRaises(ImproperlyConfigured):
+                parse_rate(rate)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class MessagingConsumerTests(MessagingFixtures, TransactionTestCase):
+    """
+    The WebSocket gateway, end to end through the JWT middleware.
+
+    Events are published after commit, so these tests run outside a wrapping
+    transaction.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+        self.alice = self.create_user()
+        self.bob = self.create_user()
+        self.conversation = self.create_conversation(self.alice, self.bob)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(self.application, f'/ws/messaging/?token={AccessToken.for_user(user)}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_connection_requires_a_valid_token(self):
+        for path in ('/ws/messaging/', '/ws/messaging/?token=invalid'):
+            communicator = WebsocketCommunicator(self.application, path)
+
+            connected, code = await communicator.connect()
+
+            self.assertFalse(connected)
+            self.assertEqual(code, 4401)
+
+    async def test_token_in_the_authorization_header(self):
+        communicator = WebsocketCommunicator(
+            self.application, '/ws/messaging/',
+            headers=[(b'authorization', f'Bearer {AccessToken.for_user(self.alice)}'.encode())]
+        )
+
+        connected, _ = await communicator.connect()
+
+        self.assertTrue(connected)
+        await communicator.disconnect()
+
+    async def test_new_message_is_pushed_to_participants(self):
+        alice = await self.connect(self.alice)
+        bob = await self.connect(self.bob)
+
+        message = await database_sync_to_async(self.send)(self.conversation, self.alice, 'Are you free Monday?')
+
+        for communicator in (alice, bob):
+            event = await communicator.receive_json_from()
+            self.assertEqual(event['type'], 'message.created')
+            self.assertEqual(event['conversation'], self.conversation.id)
+            self.assertEqual(event['message']['id'], message.id)
+            self.assertEqual(event['message']['content'], 'Are you free Monday?')
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_read_receipt_is_pushed_to_the_sender(self):
+        message = await database_sync_to_async(self.send)(self.conversation, self.alice)
+        alice = await self.connect(self.alice)
+        bob = await self.connect(self.bob)
+
+        await bob.send_json_to({'type': 'read', 'message': message.id})
+
+        event = await alice.receive_json_from()
+        self.assertEqual(event, {
+            'type': 'message.read',
+            'conversation': self.conversation.id,
+            'user': self.bob.id,
+            'last_read_message_id': message.id,
+        })
+        self.assertTrue(await bob.receive_nothing())
+        entry = await database_sync_to_async(self.entry)(self.conversation, self.bob)
+        self.assertEqual(entry.unread_count, 0)
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_typing_is_relayed_to_the_other_participants(self):
+        alice = await self.connect(self.alice)
+        bob = await self.connect(self.bob)
+
+        await bob.send_json_to({'type': 'typing', 'conversation': self.conversation.id})
+
+        self.assertEqual(await alice.receive_json_from(), {
+            'type': 'typing', 'conversation': self.conversation.id, 'user': self.bob.id
+        })
+        self.assertTrue(await bob.receive_nothing())
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_non_participants_get_errors(self):
+        message = await database_sync_to_async(self.send)(self.conversation, self.alice)
+        mallory = await self.connect(await database_sync_to_async(self.create_user)())
+        alice = await self.connect(self.alice)
+
+        await mallory.send_json_to({'type': 'typing', 'conversation': self.conversation.id})
+        typing_error = await mallory.receive_json_from()
+        await mallory.send_json_to({'type': 'read', 'message': message.id})
+        read_error = await mallory.receive_json_from()
+
+        self.assertEqual(typing_error, {'type': 'error', 'detail': 'Conversation not found.'})
+        self.assertEqual(read_error, {'type': 'error', 'detail': 'Message not found.'})
+        self.assertTrue(await alice.receive_nothing())
+        await mallory.disconnect()
+        await alice.disconnect()
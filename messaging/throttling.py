@@ -0,0 +1,165 @@
+"""
+Sliding-window rate limits on creating messages and conversations.
+
+Each limit keeps two counters in the cache, one for the current fixed window
+and one for the previous window, and estimates the requests of the last
+full window as the current count plus the previous count weighted by how
+much of the previous window still overlaps it. A check is one get_many and
+at most one incr whatever the rate, and the estimate smooths out the bursts
+a plain fixed window allows at window edges.
+
+Limits are set per user role in MESSAGING_RATE_LIMITS; a role mapped to
+None is not limited. If the cache is unreachable, counters fall back to a
+per-process store so limits still apply on each worker.
+"""
+import logging
+import math
+import threading
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as '20/min' into (requests, window seconds).
+
+    Raises:
+        ImproperlyConfigured: If the rate is malformed, allows no requests or
+            uses an unknown period.
+    """
+    if rate is None:
+        return None, None
+    count, _, period = str(rate).partition('/')
+    try:
+        count = int(count)
+    except ValueError:
+        count = 0
+    if count < 1 or not period or period[0] not in DURATIONS:
+        raise ImproperlyConfigured(
+            f"Invalid messaging rate limit {rate!r}; expected '<count>/<s|min|hour|day>' with a count of at least 1"
+        )
+    return count, DURATIONS[period[0]]
+
+
+class LocalCounterStore:
+    """A per-process stand-in for the cache's get_many and incr"""
+
+    def __init__(self):
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.time()
+        with self.lock:
+            return {
+                key: self.counters[key][0] for key in keys
+                if key in self.counters and self.counters[key][1] > now
+            }
+
+    def incr(self, key, timeout):
+        now = time.time()
+        with self.lock:
+            # Drop expired counters now and then so the store stays small
+            if len(self.counters) > 10000:
+                self.counters = {k: v for k, v in self.counters.items() if v[1] > now}
+            value, expires = self.counters.get(key, (0, now + timeout))
+            if expires <= now:
+                value, expires = 0, now + timeout
+            self.counters[key] = (value + 1, expires)
+
+
+local_counters = LocalCounterStore()
+
+
+def get_counts(keys):
+    try:
+        return cache.get_many(keys)
+    except Exception:
+        logger.warning('Rate limit cache unavailable, using per-process counters', exc_info=True)
+        return local_counters.get_many(keys)
+
+
+def increment(key, timeout):
+    try:
+        # add() creates the counter with its expiry; incr() is atomic
+        cache.add(key, 0, timeout)
+        cache.incr(key)
+    except ValueError:
+        # The counter expired between add() and incr()
+        cache.set(key, 1, timeout)
+    except Exception:
+        logger.warning('Rate limit cache unavailable, using per-process counters', exc_info=True)
+        local_counters.incr(key, timeout)
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Limit a user's requests within a sliding window, with a rate per role"""
+    scope = None
+
+    def get_rate(self, request):
+        rates = settings.MESSAGING_RATE_LIMITS[self.scope]
+        return rates.get(request.user.role, rates['default'])
+
+    def get_ident(self, request, view):
+        return str(request.user.pk)
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if not request.user or not request.user.is_authenticated:
+            return True
+        limit, duration = parse_rate(self.get_rate(request))
+        if limit is None:
+            return True
+
+        now = time.time()
+        window = int(now // duration)
+        prefix = f'throttle:{self.scope}:{self.get_ident(request, view)}'
+        current_key, previous_key = f'{prefix}:{window}', f'{prefix}:{window - 1}'
+        counts = get_counts([current_key, previous_key])
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+        elapsed = now - window * duration
+        if previous * (1 - elapsed / duration) + current >= limit:
+            self.wait_seconds = self.retry_after(limit, duration, elapsed, previous, current)
+            return False
+        increment(current_key, duration * 2)
+        return True
+
+    @staticmethod
+    def retry_after(limit, duration, elapsed, previous, current):
+        """Return the seconds until the estimate falls below the limit again."""
+        if current < limit:
+            # The previous window's share decays during this window
+            return max(duration * (1 - (limit - current) / previous) - elapsed, 0)
+        # Wait for the next window, where this window's count decays in turn
+        return duration - elapsed + duration * (1 - limit / current)
+
+    def wait(self):
+        return math.ceil(self.wait_seconds) if self.wait_seconds is not None else None
+
+
+class MessageRateThrottle(SlidingWindowThrottle):
+    """Limit the messages a user sends to one conversation"""
+    scope = 'message'
+
+    def get_ident(self, request, view):
+        conversation_id = view.kwargs.get('conversation_pk')
+        if conversation_id is None and isinstance(request.data, Mapping):
+            conversation_id = request.data.get('conversation')
+        if conversation_id is None:
+            # Malformed bodies are rejected by the serializer; count them per user
+            return super().get_ident(request, view)
+        return f'{request.user.pk}:{conversation_id}'
+
+
+class ConversationRateThrottle(SlidingWindowThrottle):
+    """Limit the conversations a user starts"""
+    scope = 'conversation'
@@ -2,18 +2,25 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
 
-from .views import ConversationViewSet, MessageViewSet, NotificationViewSet
+from .views import (
+    AttachmentUploadViewSet, BadgeView, BroadcastViewSet, ConversationViewSet, MessageViewSet,
+    NotificationChangesView, NotificationViewSet
+)
 
 # Create a router for conversations
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet, basename='conversation')
 router.register(r'notifications', NotificationViewSet, basename='notification')
+router.register(r'broadcasts', BroadcastViewSet, basename='broadcast')
 
 # Create a nested router for messages within conversations
 conversation_router = routers.NestedDefaultRouter(router, r'conversations', lookup='conversation')
 conversation_router.register(r'messages', MessageViewSet, basename='conversation-message')
+conversation_router.register(r'uploads', AttachmentUploadViewSet, basename='conversation-upload')
 
 urlpatterns = [
+    path('badges/', BadgeView.as_view(), name='messaging-badges'),
+    path('notifications/changes/', NotificationChangesView.as_view(), name='notification-changes'),
     path('', include(router.urls)),
     path('', include(conversation_router.urls)),
 ]
@@ -1,15 +1,40 @@
-from rest_framework import viewsets, permissions, status, filters
+import math
+
+from rest_framework import viewsets, mixins, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Count, Exists, OuterRef
+from rest_framework.views import APIView
+from django.db.models import Exists, F, OuterRef, Prefetch
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views import View
+from channels.db import database_sync_to_async
 
-from .models import Conversation, Message, Notification
+from core.tasks import enqueue
+from users.permissions import IsAdmin
+from .archive import archived_messages
+from .attachments import UploadError, UploadOffsetMismatch, append_chunk, start_upload
+from .badges import get_badges, invalidate_badges
+from .broadcasts import send_broadcast
+from .conversations import get_or_create_conversation
+from .inbox import mark_inbox_read, mark_read_up_to, read_cursors
+from .middleware import authenticate_jwt
+from .membership import PARTICIPANT_USER, Participant, is_participant
+from .models import AttachmentUpload, Broadcast, Conversation, Message, Notification, InboxEntry, UploadStatus
+from .pagination import MessageHistoryPagination
+from .notification_feed import get_bus
+from .realtime import publish_read_receipt
+from .search import search_messages
+from .throttling import ConversationRateThrottle, MessageRateThrottle
 from .serializers import (
+    AttachmentUploadSerializer,
+    BroadcastSerializer,
     ConversationSerializer,
     ConversationCreateSerializer,
+    ConversationLookupSerializer,
     MessageSerializer,
     MessageCreateSerializer,
+    MessageSearchResultSerializer,
     NotificationSerializer
 )
 
@@ -22,19 +47,32 @@ class ConversationViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'participants__name', 'participants__email']
-    ordering_fields = ['updated_at', 'created_at']
-    ordering = ['-updated_at']
+    ordering_fields = ['last_activity', 'updated_at', 'created_at']
+    ordering = ['-last_activity', '-id']
 
     def get_queryset(self):
-        """Return only conversations where user is a participant"""
+        """Return only conversations where user is a participant, from their inbox entries"""
+        user = self.request.user
         return Conversation.objects.filter(
-            participants=self.request.user
+            inbox_entries__user=user
         ).annotate(
-            unread_messages=Count(
-                'messages',
-                filter=~Q(messages__read_by=self.request.user) & ~Q(messages__sender=self.request.user)
+            last_activity=F('inbox_entries__last_message_at'),
+            unread_messages=F('inbox_entries__unread_count')
+        ).prefetch_related(
+            'participants',
+            Prefetch(
+                'inbox_entries',
+                queryset=InboxEntry.objects.filter(user=user).select_related(
+                    'last_message__sender'
+                ).prefetch_related('last_message__attachments'),
+                to_attr='user_inbox_entries'
+            ),
+            Prefetch(
+                'inbox_entries',
+                queryset=InboxEntry.objects.only('conversation_id', 'user_id', 'last_read_message_id'),
+                to_attr='read_cursor_entries'
             )
-        ).order_by('-updated_at')
+        )
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -42,14 +80,65 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return ConversationCreateSerializer
         return ConversationSerializer
 
+    def get_throttles(self):
+        """Rate-limit starting conversations"""
+        if self.action in ('create', 'lookup'):
+            return [ConversationRateThrottle()]
+        return super().get_throttles()
+
+    @action(detail=False, methods=['post'])
+    def lookup(self, request):
+        """Get or create the conversation between exactly these participants"""
+        serializer = ConversationLookupSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        conversation, created = get_or_create_conversation(
+            [participant.id for participant in serializer.validated_data['participants']],
+            title=serializer.validated_data['title']
+        )
+        return Response(
+            ConversationSerializer(conversation, context={'request': request}).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'], url_path='search-messages')
+    def search_messages(self, request):
+        """
+        Full-text search over messages in the user's conversations.
+
+        Query parameters: q (required), before (id cursor from the previous
+        page) and limit.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'detail': 'q is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            before = int(request.query_params['before']) if request.query_params.get('before') else None
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'detail': 'before and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One extra row tells whether there is another page
+        results = search_messages(request.user, query, before=before, limit=limit + 1)
+        has_more = len(results) > limit
+        results = results[:limit]
+        return Response({
+            'results': [
+                {
+                    'message': MessageSearchResultSerializer(message).data,
+                    'snippet': snippet,
+                }
+                for message, snippet in results
+            ],
+            'next': results[-1][0].id if has_more else None,
+        })
+
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark all messages in conversation as read"""
         conversation = self.get_object()
-        unread_messages = conversation.messages.exclude(read_by=request.user)
-        
-        for message in unread_messages:
-            message.read_by.add(request.user)
+        cursor = mark_inbox_read(conversation, request.user)
+        if cursor:
+            publish_read_receipt(conversation.id, request.user.id, cursor)
         
         return Response({'status': 'messages marked as read'})
 
@@ -59,15 +148,21 @@ class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    pagination_class = MessageHistoryPagination
+
     def get_queryset(self):
         """Return only messages from conversations user is part of"""
+        user = self.request.user
+        messages = Message.objects.select_related('sender').prefetch_related('attachments')
         conversation_id = self.kwargs.get('conversation_pk')
         if conversation_id:
-            return Message.objects.filter(
-                conversation_id=conversation_id,
-                conversation__participants=self.request.user
-            )
-        return Message.objects.filter(conversation__participants=self.request.user)
+            # Authorize once, then read the conversation without any join
+            if not is_participant(user.id, conversation_id, self.request):
+                return messages.none()
+            return messages.filter(conversation_id=conversation_id)
+        return messages.filter(Exists(Participant.objects.filter(
+            conversation_id=OuterRef('conversation_id'), **{PARTICIPANT_USER: user.id}
+        )))
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -75,11 +170,32 @@ class MessageViewSet(viewsets.ModelViewSet):
             return MessageCreateSerializer
         return MessageSerializer
 
+    def get_throttles(self):
+        """Rate-limit sending messages"""
+        if self.action == 'create':
+            return [MessageRateThrottle()]
+        return super().get_throttles()
+
+    def archived_messages(self, key, direction, limit):
+        """Read archived history of the conversation for the paginator"""
+        conversation_id = self.kwargs.get('conversation_pk')
+        if not conversation_id or not is_participant(self.request.user.id, conversation_id, self.request):
+            return []
+        return archived_messages(conversation_id, key, direction, limit)
+
+    def get_serializer_context(self):
+        """Preload the conversation's read cursors so is_read needs no query per message"""
+        context = super().get_serializer_context()
+        conversation_id = self.kwargs.get('conversation_pk')
+        if conversation_id and self.action in ('list', 'retrieve'):
+            context['read_cursors'] = read_cursors([conversation_id])
+        return context
+
     def create(self, request, *args, **kwargs):
         """Create a new message"""
         # Set conversation from URL if not provided
         conversation_id = self.kwargs.get('conversation_pk')
-        if conversation_id and 'conversation' not in request.data:
+        if conversation_id and isinstance(request.data, dict) and 'conversation' not in request.data:
             request.data['conversation'] = conversation_id
             
         return super().create(request, *args, **kwargs)
@@ -88,10 +204,76 @@ class MessageViewSet(viewsets.ModelViewSet):
     def mark_read(self, request, pk=None, conversation_pk=None):
         """Mark a message as read"""
         message = self.get_object()
-        message.read_by.add(request.user)
+        cursor = mark_read_up_to(message, request.user)
+        if cursor:
+            publish_read_receipt(message.conversation_id, request.user.id, cursor)
         return Response({'status': 'message marked as read'})
 
 
+class AttachmentUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Chunked, resumable attachment uploads within a conversation.
+
+    POST opens an upload, PUT .../chunk/ with an Upload-Offset header sends the
+    next chunk as the raw request body, and GET returns the offset to resume from.
+    The last chunk is answered with 202 while the file is assembled; GET shows
+    the status moving from PROCESSING to COMPLETE (or FAILED).
+    """
+    serializer_class = AttachmentUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    lookup_field = 'token'
+
+    def get_queryset(self):
+        """Return only the user's own uploads in this conversation"""
+        return AttachmentUpload.objects.filter(
+            user=self.request.user,
+            conversation_id=self.kwargs.get('conversation_pk')
+        ).select_related('attachment')
+
+    def create(self, request, *args, **kwargs):
+        """Open an upload"""
+        conversation_id = self.kwargs.get('conversation_pk')
+        if not is_participant(request.user.id, conversation_id, request):
+            return Response({'detail': 'Conversation not found.'}, status=status.HTTP_404_NOT_FOUND)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = start_upload(
+                request.user,
+                Conversation.objects.get(pk=conversation_id),
+                serializer.validated_data['filename'],
+                serializer.validated_data['content_type'],
+                serializer.validated_data['total_size']
+            )
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, token=None, conversation_pk=None):
+        """Append the request body at Upload-Offset"""
+        upload = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response({'detail': 'Upload-Offset and Content-Length headers are required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Read the raw body as a stream; request.data is never touched
+            append_chunk(upload, request.stream, offset, length)
+        except UploadOffsetMismatch as e:
+            upload.refresh_from_db()
+            return Response({'detail': str(e), 'received_size': upload.received_size},
+                            status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.status == UploadStatus.PROCESSING:
+            # The file is assembled in the background; GET the upload to follow its status
+            return Response(self.get_serializer(upload).data, status=status.HTTP_202_ACCEPTED)
+        return Response(self.get_serializer(upload).data)
+
+
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for managing notifications"""
     serializer_class = NotificationSerializer
@@ -116,4 +298,87 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def mark_all_read(self, request):
         """Mark all notifications as read"""
         self.get_queryset().update(read=True)
+        invalidate_badges([request.user.id])
         return Response({'status': 'all notifications marked as read'})
+
+
+class NotificationChangesView(View):
+    """
+    Long-poll for notifications newer than a cursor.
+
+    Returns at once when there are notifications with an id greater than
+    `since`, otherwise waits up to `timeout` seconds for one to be created.
+    Without `since` the current cursor is returned so clients can start.
+
+    This is an async Django view rather than a DRF action so a waiting
+    request only holds an awaited subscription, not a thread: under ASGI every
+    sync view shares one thread, and an idle poll would block the others.
+    """
+    long_poll_timeout = 25
+    max_long_poll_timeout = 55
+    changes_limit = 100
+
+    async def get(self, request):
+        user = await authenticate_jwt(request)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        since = request.GET.get('since')
+        if since is None:
+            return JsonResponse({'results': [], 'cursor': await self.latest_id(user)})
+        try:
+            since = int(since)
+            timeout = float(request.GET.get('timeout', self.long_poll_timeout))
+            if not math.isfinite(timeout):
+                raise ValueError('timeout must be finite')
+        except ValueError:
+            return JsonResponse({'detail': 'since must be a notification id and timeout a number of seconds.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        timeout = min(max(timeout, 0), self.max_long_poll_timeout)
+
+        subscription = await get_bus().subscribe(user.id)
+        try:
+            results, cursor = await self.newer_notifications(user, since)
+            if not results and timeout and await subscription.wait(timeout):
+                results, cursor = await self.newer_notifications(user, since)
+        finally:
+            await subscription.close()
+
+        return JsonResponse({'results': results, 'cursor': cursor})
+
+    @database_sync_to_async
+    def latest_id(self, user):
+        latest = Notification.objects.filter(user=user).order_by('-id').values_list('id', flat=True).first()
+        return latest or 0
+
+    @database_sync_to_async
+    def newer_notifications(self, user, since):
+        notifications = list(
+            Notification.objects.filter(user=user, id__gt=since).order_by('id')[:self.changes_limit]
+        )
+        cursor = notifications[-1].id if notifications else since
+        return NotificationSerializer(notifications, many=True).data, cursor
+
+
+class BadgeView(APIView):
+    """Unread message, notification and upcoming appointment counts for the app shell"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(get_badges(request.user))
+
+
+class BroadcastViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Announcements from admins to users selected by role and area.
+
+    Creating a broadcast queues it for sending; poll it for progress.
+    """
+    queryset = Broadcast.objects.all()
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsAdmin]
+
+    def perform_create(self, serializer):
+        broadcast = serializer.save(created_by=self.request.user)
+        enqueue(send_broadcast, broadcast.id)
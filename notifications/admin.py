@@ -0,0 +1,53 @@
+from django.contrib import admin
+from .models import Notification, NotificationDelivery, NotificationSetting, NotificationTemplate, SMSVerification
+
+
+@admin.register(NotificationTemplate)
+class NotificationTemplateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'description', 'subject', 'updated_at']
+    search_fields = ['name', 'description', 'subject']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(NotificationSetting)
+class NotificationSettingAdmin(admin.ModelAdmin):
+    list_display = ['user', 'email_enabled', 'sms_enabled', 'push_enabled', 'updated_at']
+    list_filter = ['email_enabled', 'sms_enabled', 'push_enabled']
+    search_fields = ['user__email', 'user__name']
+    raw_id_fields = ['user']
+
+
+class NotificationDeliveryInline(admin.TabularInline):
+    model = NotificationDelivery
+    extra = 0
+    readonly_fields = ['channel', 'status', 'attempts', 'next_attempt_at', 'last_error']
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'notification_type', 'title', 'read', 'email_status', 'push_status', 'created_at']
+    list_filter = ['notification_type', 'read', 'email_status', 'sms_status', 'push_status']
+    search_fields = ['title', 'message', 'user__email', 'user__name']
+    readonly_fields = ['created_at', 'updated_at']
+    raw_id_fields = ['user']
+    inlines = [NotificationDeliveryInline]
+
+
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'notification', 'channel', 'status', 'attempts', 'next_attempt_at']
+    list_filter = ['channel', 'status']
+    readonly_fields = ['created_at', 'updated_at']
+    raw_id_fields = ['notification']
+
+
+@admin.register(SMSVerification)
+class SMSVerificationAdmin(admin.ModelAdmin):
+    list_display = ['user', 'phone_number', 'is_verified', 'expires_at', 'created_at']
+    list_filter = ['is_verified']
+    search_fields = ['user__email', 'phone_number']
+    raw_id_fields = ['user']
@@ -0,0 +1,232 @@
+"""
+The notification delivery pipeline.
+
+Producers call notify() once per event. It only queues a background task, so
+requests never wait on rendering or sending. The task renders the compiled
+template for every recipient and reads their cached channel preferences. It
+then inserts the notifications and one NotificationDelivery row per enabled
+channel in bulk. SMS and push deliveries created during a user's quiet hours
+are not due until the quiet hours end.
+
+Deliveries are sent per channel in batches. A dispatcher leases a batch of
+due rows (pushing next_attempt_at past the lease so a crashed sender's
+batch is retried later), hands the whole batch to the channel's transport and
+records the outcome with a few bulk UPDATEs. Failed sends are retried with
+exponential backoff up to NOTIFICATION_MAX_ATTEMPTS; the deliver_notifications
+command picks up retries that come due.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.tasks import enqueue
+from .models import Channel, DeliveryStatus, Notification, NotificationDelivery
+from .preferences import (
+    EXTERNAL_CHANNELS, QUIET_CHANNELS, enabled_channels, get_preference_masks, preference_category, quiet_hours_end
+)
+from .rendering import get_compiled_template
+from .transports import get_transport
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+LEASE_DURATION = timedelta(minutes=5)
+
+
+def notify(user_ids, template_name, context=None, notification_type='SYSTEM', related_object=None, channels=None,
+           user_contexts=None):
+    """
+    Queue a templated notification to users; returns immediately.
+
+    Args:
+        user_ids: The ids of the recipients.
+        template_name: The name of a NotificationTemplate.
+        context: Template variables, rendered as they are at call time; each
+            recipient is also available as user.
+        notification_type: One of Notification.NOTIFICATION_TYPES.
+        related_object: A model instance the notification is about.
+        channels: Restrict delivery to these channels, e.g. EXTERNAL_CHANNELS
+            when the in-app notification already exists.
+        user_contexts: Template variables per recipient, keyed by user id and
+            merged over context, so one call can notify users about different
+            objects.
+    """
+    enqueue(
+        create_notifications,
+        list(user_ids),
+        template_name,
+        context or {},
+        notification_type,
+        related_object.pk if related_object is not None else None,
+        related_object._meta.model_name if related_object is not None else '',
+        list(channels) if channels is not None else None,
+        user_contexts or {}
+    )
+
+
+def recipient_channels(user, mask, category, rendered):
+    """Return the channels a notification can be delivered over to a user."""
+    channels = [Channel.IN_APP]
+    for channel in enabled_channels(mask, category):
+        if channel == Channel.EMAIL and (not user.email or not rendered['email_body']):
+            continue
+        if channel == Channel.SMS and (not user.phone_number or not rendered['sms_body']):
+            continue
+        if channel == Channel.PUSH and not rendered['push_body']:
+            continue
+        channels.append(channel)
+    return channels
+
+
+def create_notifications(user_ids, template_name, context, notification_type, related_object_id=None,
+                         related_object_type='', channels=None, user_contexts=None):
+    """Render and store notifications and their deliveries (background task)."""
+    template = get_compiled_template(template_name)
+    if template is None:
+        logger.warning(f"Notification template {template_name} does not exist")
+        return
+    users = User.objects.filter(id__in=user_ids, is_active=True).only('id', 'name', 'email', 'phone_number', 'role')
+    masks = get_preference_masks(user_ids)
+    category = preference_category(template_name, notification_type)
+
+    now = timezone.now()
+    notifications = []
+    notification_channels = []
+    held_until = {}
+    for user in users:
+        rendered = template.render({**context, **(user_contexts or {}).get(user.id, {}), 'user': user})
+        selected = recipient_channels(user, masks[user.id], category, rendered)
+        if channels is not None:
+            selected = [channel for channel in selected if channel in channels]
+        notification = Notification(
+            user=user,
+            template_id=template.id,
+            notification_type=notification_type,
+            title=rendered['subject'],
+            message=rendered['push_body'] or rendered['subject'],
+            email_body=rendered['email_body'],
+            sms_body=rendered['sms_body'],
+            related_object_id=related_object_id,
+            related_object_type=related_object_type,
+        )
+        for channel in Channel:
+            setattr(notification, f'{channel}_status',
+                    DeliveryStatus.PENDING if channel in selected else DeliveryStatus.SKIPPED)
+        notifications.append(notification)
+        notification_channels.append(selected)
+        held_until[user.id] = quiet_hours_end(masks[user.id], now)
+    if not notifications:
+        return
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        if notifications[0].pk is None:
+            # The backend cannot return ids from a bulk insert
+            notifications = list(Notification.objects.filter(
+                user_id__in=[notification.user_id for notification in notifications],
+                template_id=template.id,
+                created_at__gte=now
+            ).order_by('id'))
+        NotificationDelivery.objects.bulk_create([
+            NotificationDelivery(
+                notification=notification,
+                channel=channel,
+                next_attempt_at=(held_until[notification.user_id] if channel in QUIET_CHANNELS else None) or now
+            )
+            for notification, selected in zip(notifications, notification_channels)
+            for channel in selected
+        ])
+    enqueue(dispatch_pending, sorted({channel for selected in notification_channels for channel in selected}))
+
+
+def lease_batch(channel, batch_size):
+    """Claim a batch of due deliveries of a channel for sending."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = NotificationDelivery.objects.filter(
+            status=DeliveryStatus.PENDING, channel=channel, next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        NotificationDelivery.objects.filter(id__in=ids).update(
+            next_attempt_at=now + LEASE_DURATION,
+            attempts=F('attempts') + 1,
+            updated_at=now
+        )
+    return list(NotificationDelivery.objects.filter(id__in=ids).select_related('notification__user'))
+
+
+def record_results(channel, deliveries, errors):
+    """Mark sent deliveries, and reschedule or give up on failed ones."""
+    now = timezone.now()
+    sent = [delivery for delivery in deliveries if delivery.id not in errors]
+    retried, failed = [], []
+    for delivery in deliveries:
+        if delivery.id not in errors:
+            continue
+        delivery.last_error = errors[delivery.id][:1000]
+        delivery.updated_at = now
+        if delivery.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            delivery.status = DeliveryStatus.FAILED
+            failed.append(delivery)
+        else:
+            delivery.next_attempt_at = now + timedelta(
+                seconds=settings.NOTIFICATION_RETRY_DELAY * 2 ** (delivery.attempts - 1)
+            )
+            retried.append(delivery)
+
+    with transaction.atomic():
+        if sent:
+            NotificationDelivery.objects.filter(id__in=[delivery.id for delivery in sent]).update(
+                status=DeliveryStatus.SENT, last_error='', updated_at=now
+            )
+            Notification.objects.filter(id__in=[delivery.notification_id for delivery in sent]).update(
+                **{f'{channel}_status': DeliveryStatus.SENT}
+            )
+        if retried or failed:
+            NotificationDelivery.objects.bulk_update(
+                retried + failed, ['status', 'next_attempt_at', 'last_error', 'updated_at']
+            )
+        if failed:
+            Notification.objects.filter(id__in=[delivery.notification_id for delivery in failed]).update(
+                **{f'{channel}_status': DeliveryStatus.FAILED}
+            )
+
+
+def dispatch_channel(channel, batch_size=None, max_batches=None):
+    """
+    Send due deliveries of one channel a batch at a time.
+
+    Returns:
+        tuple: The number of deliveries sent and failed.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    transport = get_transport(channel)
+    sent = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        deliveries = lease_batch(channel, batch_size)
+        if not deliveries:
+            break
+        batches += 1
+        try:
+            errors = transport.send_batch(deliveries)
+        except Exception as e:
+            logger.exception(f"{channel} transport failed")
+            errors = {delivery.id: str(e) for delivery in deliveries}
+        record_results(channel, deliveries, errors)
+        sent += len(deliveries) - len(errors)
+        failed += len(errors)
+    return sent, failed
+
+
+def dispatch_pending(channels=None):
+    """Send due deliveries of the given channels, or all channels (background task)."""
+    for channel in channels or [Channel.IN_APP, *EXTERNAL_CHANNELS]:
+        dispatch_channel(channel)
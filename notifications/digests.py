@@ -0,0 +1,136 @@
+"""
+Daily and weekly email digests of unread in-app notifications.
+
+A run summarizes, for every user who opted in to the frequency, the unread
+notifications of the period that no digest has covered yet. One grouped
+query counts them per user and notification type; users are then handled a
+batch at a time with one query for their names and addresses, the cached
+digest template, one SMTP session for the batch's emails and one UPDATE
+marking what was summarized. Notifications created after the run started
+are left for the next run.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Max, Sum
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from messaging.models import Notification as InAppNotification
+from .models import DigestFrequency
+from .rendering import get_compiled_template
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DIGEST_TEMPLATE = 'notification_digest'
+PERIODS = {
+    DigestFrequency.DAILY: timedelta(days=1),
+    DigestFrequency.WEEKLY: timedelta(weeks=1),
+}
+TYPE_LABELS = dict(InAppNotification.NOTIFICATION_TYPES)
+
+
+def pending_notifications(frequency, since, upper_id):
+    """Return the unread, undigested notifications of users opted in to a frequency."""
+    return InAppNotification.objects.filter(
+        read=False,
+        digested_at__isnull=True,
+        created_at__gte=since,
+        id__lte=upper_id,
+        user__is_active=True,
+        user__notification_setting__digest_frequency=frequency,
+        user__notification_setting__email_enabled=True,
+    )
+
+
+def digest_groups(frequency, since, upper_id):
+    """
+    Count pending notifications per user and type in one grouped query.
+
+    Returns:
+        dict: user id -> list of {'label', 'count', 'latest'}, in user id order.
+    """
+    groups = {}
+    rows = pending_notifications(frequency, since, upper_id).order_by('user_id', 'notification_type').values(
+        'user_id', 'notification_type'
+    ).annotate(total=Sum('count'), latest=Max('created_at'))
+    for row in rows:
+        groups.setdefault(row['user_id'], []).append({
+            'label': TYPE_LABELS.get(row['notification_type'], row['notification_type']),
+            'count': row['total'],
+            'latest': row['latest'],
+        })
+    return groups
+
+
+def send_digest_batch(template, frequency, groups, since, upper_id, now):
+    """
+    Email the digests of a batch of users over one connection and mark their notifications.
+
+    Returns:
+        int: The number of digests sent.
+    """
+    users = User.objects.filter(id__in=list(groups)).only('id', 'name', 'email')
+    period = DigestFrequency(frequency).label.lower()
+    sent_user_ids = []
+    connection = get_connection()
+    connection.open()
+    try:
+        for user in users:
+            rendered = template.render({
+                'user': user,
+                'groups': groups[user.id],
+                'total': sum(group['count'] for group in groups[user.id]),
+                'period': period,
+                'site_url': settings.SITE_URL,
+            })
+            message = EmailMultiAlternatives(
+                subject=rendered['subject'],
+                body=strip_tags(rendered['email_body']),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[user.email],
+                connection=connection
+            )
+            message.attach_alternative(rendered['email_body'], 'text/html')
+            try:
+                message.send()
+            except Exception:
+                logger.exception(f"Could not send the {period} digest to user {user.id}")
+                continue
+            sent_user_ids.append(user.id)
+    finally:
+        connection.close()
+
+    pending_notifications(frequency, since, upper_id).filter(user_id__in=sent_user_ids).update(digested_at=now)
+    return len(sent_user_ids)
+
+
+def send_digests(frequency, batch_size=200, stdout=None):
+    """
+    Send the digests of every user opted in to a frequency.
+
+    Returns:
+        int: The number of digests sent.
+    """
+    template = get_compiled_template(DIGEST_TEMPLATE)
+    if template is None:
+        logger.warning(f"Notification template {DIGEST_TEMPLATE} does not exist")
+        return 0
+    now = timezone.now()
+    since = now - PERIODS[frequency]
+    upper_id = InAppNotification.objects.aggregate(Max('id'))['id__max'] or 0
+
+    groups = digest_groups(frequency, since, upper_id)
+    user_ids = list(groups)
+    sent = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = {user_id: groups[user_id] for user_id in user_ids[start:start + batch_size]}
+        sent += send_digest_batch(template, frequency, batch, since, upper_id, now)
+        if stdout:
+            stdout.write(f'{sent} of {len(user_ids)} digests sent')
+    return sent
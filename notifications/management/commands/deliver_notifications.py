@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from notifications.delivery import dispatch_channel
+from notifications.models import Channel
+
+
+class Command(BaseCommand):
+    help = 'Sends notification deliveries that are due, including retries of failed sends'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--channel',
+            choices=Channel.values,
+            action='append',
+            help='Only send this channel (repeatable; default: all channels)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Deliveries sent per batch (default: NOTIFICATION_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        for channel in options['channel'] or Channel.values:
+            sent, failed = dispatch_channel(channel, options['batch_size'])
+            self.stdout.write(f'{channel}: {sent} sent, {failed} failed')
+        self.stdout.write(self.style.SUCCESS('Notification delivery finished'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from notifications.digests import send_digests
+from notifications.models import DigestFrequency
+
+
+class Command(BaseCommand):
+    help = 'Emails daily or weekly digests of unread notifications to users who opted in'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequency',
+            choices=[DigestFrequency.DAILY.lower(), DigestFrequency.WEEKLY.lower()],
+            default='daily',
+            help='Which digest to send'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of users whose digests are sent per SMTP session'
+        )
+
+    def handle(self, *args, **options):
+        sent = send_digests(options['frequency'].upper(), options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} {options["frequency"]} digests'))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:27
+
+from django.db import migrations, models
+
+DIGEST_TEMPLATE = {
+    'name': 'notification_digest',
+    'description': 'Daily or weekly email summary of unread notifications',
+    'subject': '{{ total }} unread notification{{ total|pluralize }} on A-List Home Pros',
+    'email_body': """
+        <p>Hello {{ user.name }},</p>
+        <p>Here is your {{ period }} summary of what you have not read yet:</p>
+        <ul>
+            {% for group in groups %}<li>{{ group.count }} {{ group.label|lower }}{{ group.count|pluralize }} (latest {{ group.latest|date:"M j, P" }})</li>{% endfor %}
+        </ul>
+        <p><a href="{{ site_url }}">Log in to your account</a> to catch up.</p>
+        <p>Thank you for using A-List Home Pros!</p>
+    """,
+}
+
+
+def create_digest_template(apps, schema_editor):
+    NotificationTemplate = apps.get_model('notifications', 'NotificationTemplate')
+    NotificationTemplate.objects.get_or_create(
+        name=DIGEST_TEMPLATE['name'],
+        defaults={key: value for key, value in DIGEST_TEMPLATE.items() if key != 'name'}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationsetting',
+            name='digest_frequency',
+            field=models.CharField(choices=[('NONE', 'No digest'), ('DAILY', 'Daily'), ('WEEKLY', 'Weekly')], default='NONE', help_text='How often to email a summary of unread notifications', max_length=10),
+        ),
+        migrations.RunPython(create_digest_template, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+STATUS_CHANGE_TEMPLATE = {
+    'name': 'appointment_status_change',
+    'description': 'Notification for appointment status changes',
+    'subject': 'Your appointment on {{ appointment.appointment_date }} is now {{ appointment.get_status_display|lower }}',
+    'email_body': """
+        <p>Hello {{ user.name }},</p>
+        <p>The status of your appointment on {{ appointment.appointment_date }} has been updated to {{ appointment.get_status_display }}.</p>
+        <p>Appointment details:</p>
+        <ul>
+            <li>Date: {{ appointment.appointment_date }}</li>
+            <li>Time: {{ appointment.start_time }} - {{ appointment.end_time }}</li>
+            <li>Contractor: {{ appointment.contractor.business_name }}</li>
+        </ul>
+        {% if appointments|length > 1 %}<p>{{ appointments|length }} of your appointments are affected.</p>{% endif %}
+        <p>Log in to your account for more details.</p>
+        <p>Thank you for using A-List Home Pros!</p>
+    """,
+    'sms_body': 'Your appointment on {{ appointment.appointment_date }} has been updated to {{ appointment.get_status_display }}. Log in to A-List Home Pros for details.',
+    'push_body': 'Appointment on {{ appointment.appointment_date }} updated to {{ appointment.get_status_display }}.',
+}
+
+
+def create_status_change_template(apps, schema_editor):
+    NotificationTemplate = apps.get_model('notifications', 'NotificationTemplate')
+    NotificationTemplate.objects.get_or_create(
+        name=STATUS_CHANGE_TEMPLATE['name'],
+        defaults={key: value for key, value in STATUS_CHANGE_TEMPLATE.items() if key != 'name'}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notificationsetting_digest_frequency'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_status_change_template, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_appointment_status_change_template'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationsetting',
+            name='quiet_hours_end',
+            field=models.TimeField(blank=True, help_text='Held SMS and push notifications are sent at this time', null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationsetting',
+            name='quiet_hours_start',
+            field=models.TimeField(blank=True, help_text='SMS and push notifications are held from this time (server time zone)', null=True),
+        ),
+    ]
@@ -0,0 +1,174 @@
+from django.db import models
+from django.conf import settings
+from core.models import TimeStampedModel
+
+
+class NotificationTemplate(TimeStampedModel):
+    """Django template source of a notification for each delivery channel"""
+    name = models.CharField(max_length=100, unique=True)
+    description = models.CharField(max_length=255, blank=True)
+    subject = models.CharField(max_length=255)
+    email_body = models.TextField(blank=True)
+    sms_body = models.TextField(blank=True)
+    push_body = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class DigestFrequency(models.TextChoices):
+    NONE = 'NONE', 'No digest'
+    DAILY = 'DAILY', 'Daily'
+    WEEKLY = 'WEEKLY', 'Weekly'
+
+
+class NotificationSetting(TimeStampedModel):
+    """A user's delivery preferences per channel and kind of notification"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notification_setting'
+    )
+    digest_frequency = models.CharField(
+        max_length=10,
+        choices=DigestFrequency.choices,
+        default=DigestFrequency.NONE,
+        help_text='How often to email a summary of unread notifications'
+    )
+    email_enabled = models.BooleanField(default=True)
+    sms_enabled = models.BooleanField(default=False)
+    push_enabled = models.BooleanField(default=True)
+    new_message_email = models.BooleanField(default=True)
+    new_message_sms = models.BooleanField(default=False)
+    new_message_push = models.BooleanField(default=True)
+    appointment_reminder_email = models.BooleanField(default=True)
+    appointment_reminder_sms = models.BooleanField(default=False)
+    appointment_reminder_push = models.BooleanField(default=True)
+    appointment_status_change_email = models.BooleanField(default=True)
+    appointment_status_change_sms = models.BooleanField(default=False)
+    appointment_status_change_push = models.BooleanField(default=True)
+    payment_email = models.BooleanField(default=True)
+    payment_sms = models.BooleanField(default=False)
+    payment_push = models.BooleanField(default=True)
+    marketing_email = models.BooleanField(default=False)
+    marketing_sms = models.BooleanField(default=False)
+    marketing_push = models.BooleanField(default=False)
+    quiet_hours_start = models.TimeField(
+        null=True,
+        blank=True,
+        help_text='SMS and push notifications are held from this time (server time zone)'
+    )
+    quiet_hours_end = models.TimeField(
+        null=True,
+        blank=True,
+        help_text='Held SMS and push notifications are sent at this time'
+    )
+    
+    def __str__(self):
+        return f"Notification settings for {self.user.email}"
+
+
+class DeliveryStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    SENT = 'SENT', 'Sent'
+    DELIVERED = 'DELIVERED', 'Delivered'
+    READ = 'READ', 'Read'
+    FAILED = 'FAILED', 'Failed'
+    SKIPPED = 'SKIPPED', 'Skipped'
+
+
+class Notification(TimeStampedModel):
+    """A notification rendered from a template, with its delivery status per channel"""
+    NOTIFICATION_TYPES = (
+        ('MESSAGE', 'New Message'),
+        ('APPOINTMENT', 'Appointment Update'),
+        ('PAYMENT', 'Payment Update'),
+        ('REVIEW', 'New Review'),
+        ('SYSTEM', 'System Notification'),
+        ('MARKETING', 'Marketing'),
+    )
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='system_notifications'
+    )
+    template = models.ForeignKey(
+        NotificationTemplate,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notifications'
+    )
+    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    email_body = models.TextField(blank=True)
+    sms_body = models.TextField(blank=True)
+    read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+    in_app_status = models.CharField(max_length=20, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING)
+    email_status = models.CharField(max_length=20, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING)
+    sms_status = models.CharField(max_length=20, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING)
+    push_status = models.CharField(max_length=20, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING)
+    related_object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_object_type = models.CharField(max_length=50, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.notification_type} notification for {self.user.email}"
+
+
+class Channel(models.TextChoices):
+    IN_APP = 'in_app', 'In-app'
+    EMAIL = 'email', 'Email'
+    SMS = 'sms', 'SMS'
+    PUSH = 'push', 'Push'
+
+
+class NotificationDelivery(TimeStampedModel):
+    """One channel's pending or finished send of a notification"""
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='deliveries'
+    )
+    channel = models.CharField(max_length=10, choices=Channel.choices)
+    status = models.CharField(max_length=20, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            # The dispatcher's scan for due sends of a channel
+            models.Index(fields=['status', 'channel', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} delivery of notification {self.notification_id} ({self.status})"
+
+
+class SMSVerification(TimeStampedModel):
+    """A one-time code sent by SMS to verify a phone number"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='sms_verifications'
+    )
+    phone_number = models.CharField(max_length=20)
+    verification_code = models.CharField(max_length=10)
+    expires_at = models.DateTimeField()
+    is_verified = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"SMS verification for {self.phone_number}"
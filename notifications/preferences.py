@@ -0,0 +1,119 @@
+"""
+Compact, cached delivery preferences.
+
+A user's NotificationSetting flags are packed into the bits of one integer
+cached per user, so deciding the channels for a batch of recipients is one
+cache get_many, plus one query for the users that were not cached. The
+bits above the flags hold the user's quiet hours, if any.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Channel, NotificationSetting
+
+PREFERENCE_CACHE_TIMEOUT = 24 * 60 * 60
+
+EXTERNAL_CHANNELS = (Channel.EMAIL, Channel.SMS, Channel.PUSH)
+# Channels that interrupt the user and are held during quiet hours
+QUIET_CHANNELS = (Channel.SMS, Channel.PUSH)
+CATEGORIES = ('new_message', 'appointment_reminder', 'appointment_status_change', 'payment', 'marketing')
+CATEGORY_BY_TYPE = {
+    'MESSAGE': 'new_message',
+    'APPOINTMENT': 'appointment_status_change',
+    'PAYMENT': 'payment',
+    'MARKETING': 'marketing',
+}
+
+FLAG_FIELDS = [f'{channel}_enabled' for channel in EXTERNAL_CHANNELS] + [
+    f'{category}_{channel}' for category in CATEGORIES for channel in EXTERNAL_CHANNELS
+]
+FLAG_BITS = {field: 1 << index for index, field in enumerate(FLAG_FIELDS)}
+QUIET_HOURS_FIELDS = ['quiet_hours_start', 'quiet_hours_end']
+QUIET_HOURS_SHIFT = len(FLAG_FIELDS)
+MINUTES_PER_DAY = 24 * 60
+
+
+def pack_setting(setting):
+    """Pack a NotificationSetting's flags and quiet hours into an integer."""
+    mask = sum(bit for field, bit in FLAG_BITS.items() if getattr(setting, field))
+    start, end = setting.quiet_hours_start, setting.quiet_hours_end
+    if start is not None and end is not None and start != end:
+        # Stored as 1 + start minute * 1440 + end minute, so 0 means no quiet hours
+        window = 1 + (start.hour * 60 + start.minute) * MINUTES_PER_DAY + end.hour * 60 + end.minute
+        mask |= window << QUIET_HOURS_SHIFT
+    return mask
+
+
+DEFAULT_MASK = pack_setting(NotificationSetting())
+
+
+def preference_cache_key(user_id):
+    return f'notifications:preferences:{user_id}'
+
+
+def preference_category(template_name, notification_type):
+    """Return the preference category of a notification, or None if only the channel switches apply."""
+    if template_name in CATEGORIES:
+        return template_name
+    return CATEGORY_BY_TYPE.get(notification_type)
+
+
+def get_preference_masks(user_ids):
+    """
+    Return user id -> packed preferences for the given users.
+
+    Users without a NotificationSetting get the model's defaults.
+    """
+    keys = {preference_cache_key(user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(keys)
+    masks = {keys[key]: mask for key, mask in cached.items()}
+    missing = [user_id for user_id in user_ids if user_id not in masks]
+    if missing:
+        found = {
+            setting.user_id: pack_setting(setting)
+            for setting in NotificationSetting.objects.filter(user_id__in=missing).only(
+                'user_id', *FLAG_FIELDS, *QUIET_HOURS_FIELDS
+            )
+        }
+        loaded = {user_id: found.get(user_id, DEFAULT_MASK) for user_id in missing}
+        cache.set_many(
+            {preference_cache_key(user_id): mask for user_id, mask in loaded.items()},
+            PREFERENCE_CACHE_TIMEOUT
+        )
+        masks.update(loaded)
+    return masks
+
+
+def enabled_channels(mask, category):
+    """Return the external channels a user accepts for a category."""
+    return [
+        channel for channel in EXTERNAL_CHANNELS
+        if mask & FLAG_BITS[f'{channel}_enabled']
+        and (category is None or mask & FLAG_BITS[f'{category}_{channel}'])
+    ]
+
+
+def quiet_hours_end(mask, now=None):
+    """
+    Return when a user's quiet hours end if they are in them, otherwise None.
+
+    Quiet hours are read in the server's time zone and may span midnight.
+    """
+    window = mask >> QUIET_HOURS_SHIFT
+    if not window:
+        return None
+    start, end = divmod(window - 1, MINUTES_PER_DAY)
+    local = timezone.localtime(now)
+    minute = local.hour * 60 + local.minute
+    if not (start <= minute < end if start < end else minute >= start or minute < end):
+        return None
+    until = local.replace(hour=end // 60, minute=end % 60, second=0, microsecond=0)
+    if until <= local:
+        until += timedelta(days=1)
+    return until
+
+
+def invalidate_preferences(user_id):
+    cache.delete(preference_cache_key(user_id))
@@ -0,0 +1,87 @@
+"""
+Compiled, cached notification templates.
+
+Template rows are cached by name, and each process compiles a template's
+subject and bodies once per version (its updated_at), so rendering a batch
+of notifications parses nothing and reads nothing from the database. Saving
+a template drops its cached row and the next render compiles the new version.
+"""
+import threading
+
+from django.core.cache import cache
+from django.template import Context, Engine
+
+from .models import NotificationTemplate
+
+TEMPLATE_CACHE_TIMEOUT = 60 * 60
+TEXT_FIELDS = ('subject', 'sms_body', 'push_body')
+HTML_FIELDS = ('email_body',)
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def template_cache_key(name):
+    return f'notifications:template:{name}'
+
+
+class CompiledTemplate:
+    """A notification template with every field parsed once"""
+
+    def __init__(self, row):
+        engine = Engine.get_default()
+        self.id = row['id']
+        self.version = row['version']
+        self.fields = {}
+        for field in TEXT_FIELDS:
+            # Subjects, SMS and push are plain text and must not be HTML-escaped
+            self.fields[field] = engine.from_string(
+                '{% autoescape off %}' + row[field] + '{% endautoescape %}'
+            ) if row[field] else None
+        for field in HTML_FIELDS:
+            self.fields[field] = engine.from_string(row[field]) if row[field] else None
+
+    def render(self, context):
+        """Return field -> rendered text; fields without a template are ''."""
+        context = Context(context)
+        return {
+            field: template.render(context).strip() if template else ''
+            for field, template in self.fields.items()
+        }
+
+
+def get_template_row(name):
+    """Return the cached fields of a template, or None if there is no such template."""
+    key = template_cache_key(name)
+    row = cache.get(key)
+    if row is None:
+        template = NotificationTemplate.objects.filter(name=name).first()
+        row = {
+            'id': template.id,
+            'version': template.updated_at.isoformat(),
+            **{field: getattr(template, field) for field in TEXT_FIELDS + HTML_FIELDS},
+        } if template else {}
+        cache.set(key, row, TEMPLATE_CACHE_TIMEOUT)
+    return row or None
+
+
+def get_compiled_template(name):
+    """
+    Return a template ready to render.
+
+    Returns:
+        CompiledTemplate: The template, or None if there is no such template.
+    """
+    row = get_template_row(name)
+    if row is None:
+        return None
+    compiled = _compiled.get(name)
+    if compiled is None or compiled.version != row['version']:
+        compiled = CompiledTemplate(row)
+        with _compiled_lock:
+            _compiled[name] = compiled
+    return compiled
+
+
+def invalidate_template(name):
+    cache.delete(template_cache_key(name))
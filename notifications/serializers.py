@@ -0,0 +1,30 @@
+from rest_framework import serializers
+
+from .models import Notification, NotificationSetting
+from .preferences import FLAG_FIELDS
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    """Serializer for templated notifications and their delivery status"""
+    class Meta:
+        model = Notification
+        fields = ['id', 'notification_type', 'title', 'message', 'read', 'read_at',
+                  'in_app_status', 'email_status', 'sms_status', 'push_status',
+                  'related_object_id', 'related_object_type', 'created_at']
+        read_only_fields = fields
+
+
+class NotificationSettingSerializer(serializers.ModelSerializer):
+    """Serializer for a user's notification preferences"""
+    class Meta:
+        model = NotificationSetting
+        fields = ['id', *FLAG_FIELDS, 'quiet_hours_start', 'quiet_hours_end', 'digest_frequency', 'updated_at']
+        read_only_fields = ['id', 'updated_at']
+    
+    def validate(self, attrs):
+        """Quiet hours need both a start and an end"""
+        start = attrs.get('quiet_hours_start', getattr(self.instance, 'quiet_hours_start', None))
+        end = attrs.get('quiet_hours_end', getattr(self.instance, 'quiet_hours_end', None))
+        if (start is None) != (end is None):
+            raise serializers.ValidationError("Quiet hours need both a start and an end time")
+        return attrs
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import NotificationSetting, NotificationTemplate
+from .preferences import invalidate_preferences
+from .rendering import invalidate_template
+
+
+@receiver(post_save, sender=NotificationTemplate)
+@receiver(post_delete, sender=NotificationTemplate)
+def template_changed(sender, instance, **kwargs):
+    """Drop the cached template so the next render compiles the new version"""
+    invalidate_template(instance.name)
+
+
+@receiver(post_save, sender=NotificationSetting)
+@receiver(post_delete, sender=NotificationSetting)
+def setting_changed(sender, instance, **kwargs):
+    """Drop the user's cached preferences"""
+    invalidate_preferences(instance.user_id)
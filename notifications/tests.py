@@ -0,0 +1,337 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from messaging.models import Notification as InAppNotification
+from .delivery import create_notifications, dispatch_channel, lease_batch, notify
+from .digests import digest_groups, send_digests
+from .models import (
+    Channel, DeliveryStatus, DigestFrequency, Notification, NotificationDelivery, NotificationSetting,
+    NotificationTemplate
+)
+from .preferences import get_preference_masks, quiet_hours_end
+from .transports import LocalStubTransport, Transport
+
+User = get_user_model()
+
+
+class FailingTransport(Transport):
+    """Fail every send, as a provider outage would"""
+
+    def send_batch(self, deliveries):
+        return {delivery.id: 'Provider unavailable' for delivery in deliveries}
+
+
+class NotificationTestCase(APITestCase):
+    """Shared helpers: a template and users with notification settings"""
+
+    def setUp(self):
+        # Templates and preferences are cached
+        cache.clear()
+        LocalStubTransport.outbox.clear()
+        self.user_count = 0
+        NotificationTemplate.objects.create(
+            name='job_update',
+            subject='Update for {{ user.name }}',
+            email_body='<p>{{ detail }}</p>',
+            sms_body='{{ detail }}',
+            push_body='{{ detail }}',
+        )
+
+    def create_user(self, **preferences):
+        self.user_count += 1
+        user = User.objects.create_user(
+            email=f'user{self.user_count}@example.com', name=f'User {self.user_count}',
+            phone_number='1', password='pw12345!X'
+        )
+        NotificationSetting.objects.create(user=user, **preferences)
+        return user
+
+    def create_notifications(self, users, notification_type='SYSTEM'):
+        """Store notifications and their deliveries without dispatching them"""
+        create_notifications([user.id for user in users], 'job_update', {'detail': 'Job confirmed'},
+                             notification_type)
+
+    def channels(self, user):
+        return set(NotificationDelivery.objects.filter(notification__user=user).values_list('channel', flat=True))
+
+
+class DeliveryPipelineTests(NotificationTestCase):
+    """notify() renders, stores and sends a notification over each enabled channel"""
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_notify_sends_over_every_enabled_channel(self):
+        user = self.create_user()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify([user.id], 'job_update', {'detail': 'Job confirmed'})
+
+        notification = Notification.objects.get(user=user)
+        self.assertEqual(notification.title, 'Update for User 1')
+        self.assertEqual(
+            [notification.in_app_status, notification.email_status, notification.sms_status, notification.push_status],
+            [DeliveryStatus.SENT, DeliveryStatus.SENT, DeliveryStatus.SKIPPED, DeliveryStatus.SENT]
+        )
+        self.assertEqual(InAppNotification.objects.get(user=user).content, 'Job confirmed')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [user.email])
+        self.assertEqual(list(LocalStubTransport.outbox), [(Channel.PUSH, user.id, 'Job confirmed')])
+
+    def test_missing_template_creates_nothing(self):
+        user = self.create_user()
+
+        create_notifications([user.id], 'no_such_template', {}, 'SYSTEM')
+
+        self.assertFalse(Notification.objects.exists())
+
+
+class PreferenceTests(NotificationTestCase):
+    """Channel switches and per-category flags decide the deliveries"""
+
+    def test_channel_switches(self):
+        no_email = self.create_user(email_enabled=False)
+        with_sms = self.create_user(sms_enabled=True)
+
+        self.create_notifications([no_email, with_sms])
+
+        self.assertEqual(self.channels(no_email), {Channel.IN_APP, Channel.PUSH})
+        self.assertEqual(self.channels(with_sms), {Channel.IN_APP, Channel.EMAIL, Channel.SMS, Channel.PUSH})
+
+    def test_category_flags(self):
+        user = self.create_user(sms_enabled=True, new_message_push=False)
+
+        self.create_notifications([user], notification_type='MESSAGE')
+
+        # new_message_sms is off by default, so sms_enabled alone is not enough
+        self.assertEqual(self.channels(user), {Channel.IN_APP, Channel.EMAIL})
+
+    def test_saving_settings_drops_the_cached_preferences(self):
+        user = self.create_user()
+        before = get_preference_masks([user.id])[user.id]
+
+        setting = user.notification_setting
+        setting.push_enabled = False
+        setting.save()
+
+        self.assertNotEqual(get_preference_masks([user.id])[user.id], before)
+        self.create_notifications([user])
+        self.assertEqual(self.channels(user), {Channel.IN_APP, Channel.EMAIL})
+
+
+class LeaseTests(NotificationTestCase):
+    """A dispatcher claims due deliveries so no other dispatcher sends them"""
+
+    def test_leased_deliveries_are_not_leased_again(self):
+        users = [self.create_user() for _ in range(3)]
+        self.create_notifications(users)
+
+        first = lease_batch(Channel.IN_APP, 2)
+        second = lease_batch(Channel.IN_APP, 10)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(lease_batch(Channel.IN_APP, 10), [])
+        self.assertFalse({delivery.id for delivery in first} & {delivery.id for delivery in second})
+        for delivery in NotificationDelivery.objects.filter(channel=Channel.IN_APP):
+            self.assertEqual(delivery.attempts, 1)
+            self.assertGreater(delivery.next_attempt_at, timezone.now())
+
+    def test_sent_deliveries_are_marked(self):
+        user = self.create_user()
+        self.create_notifications([user])
+
+        self.assertEqual(dispatch_channel(Channel.IN_APP), (1, 0))
+
+        delivery = NotificationDelivery.objects.get(notification__user=user, channel=Channel.IN_APP)
+        self.assertEqual(delivery.status, DeliveryStatus.SENT)
+        self.assertEqual(dispatch_channel(Channel.IN_APP), (0, 0))
+
+
+@override_settings(
+    NOTIFICATION_MAX_ATTEMPTS=3,
+    NOTIFICATION_RETRY_DELAY=60,
+    NOTIFICATION_TRANSPORTS={
+        'in_app': 'notifications.transports.InAppTransport',
+        'email': 'notifications.transports.EmailTransport',
+        'sms': 'notifications.transports.LocalStubTransport',
+        'push': 'notifications.tests.FailingTransport',
+    }
+)
+class RetryTests(NotificationTestCase):
+    """Failed sends are retried with exponential backoff, then given up"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.create_notifications([self.user])
+
+    def delivery(self):
+        return NotificationDelivery.objects.get(notification__user=self.user, channel=Channel.PUSH)
+
+    def make_due(self):
+        NotificationDelivery.objects.filter(channel=Channel.PUSH).update(next_attempt_at=timezone.now())
+
+    def test_failures_back_off_exponentially(self):
+        delays = []
+        for _ in range(2):
+            started = timezone.now()
+            self.assertEqual(dispatch_channel(Channel.PUSH), (0, 1))
+            delivery = self.delivery()
+            delays.append((delivery.next_attempt_at - started).total_seconds())
+            # Not due again until the delay has passed
+            self.assertEqual(dispatch_channel(Channel.PUSH), (0, 0))
+            self.make_due()
+
+        self.assertEqual(delivery.status, DeliveryStatus.PENDING)
+        self.assertEqual(delivery.last_error, 'Provider unavailable')
+        self.assertAlmostEqual(delays[0], 60, delta=5)
+        self.assertAlmostEqual(delays[1], 120, delta=5)
+
+    def test_gives_up_after_max_attempts(self):
+        for _ in range(3):
+            dispatch_channel(Channel.PUSH)
+            self.make_due()
+
+        delivery = self.delivery()
+        self.assertEqual(delivery.status, DeliveryStatus.FAILED)
+        self.assertEqual(delivery.attempts, 3)
+        self.assertEqual(delivery.notification.push_status, DeliveryStatus.FAILED)
+        self.assertEqual(dispatch_channel(Channel.PUSH), (0, 0))
+
+
+class QuietHoursTests(NotificationTestCase):
+    """SMS and push are held until a user's quiet hours end"""
+
+    def window_around_now(self):
+        now = timezone.localtime()
+        return (now - datetime.timedelta(hours=1)).time(), (now + datetime.timedelta(hours=1)).time().replace(
+            second=0, microsecond=0
+        )
+
+    def test_interrupting_channels_wait_for_the_end_of_quiet_hours(self):
+        start, end = self.window_around_now()
+        user = self.create_user(sms_enabled=True, quiet_hours_start=start, quiet_hours_end=end)
+
+        self.create_notifications([user])
+
+        deliveries = {
+            delivery.channel: delivery.next_attempt_at
+            for delivery in NotificationDelivery.objects.filter(notification__user=user)
+        }
+        self.assertEqual(timezone.localtime(deliveries[Channel.PUSH]).time(), end)
+        self.assertEqual(deliveries[Channel.SMS], deliveries[Channel.PUSH])
+        self.assertLessEqual(deliveries[Channel.EMAIL], timezone.now())
+        self.assertEqual(lease_batch(Channel.PUSH, 10), [])
+        self.assertEqual(len(lease_batch(Channel.EMAIL, 10)), 1)
+
+    def test_windows_may_span_midnight(self):
+        user = self.create_user(quiet_hours_start=datetime.time(22), quiet_hours_end=datetime.time(7))
+        mask = get_preference_masks([user.id])[user.id]
+        zone = timezone.get_current_timezone()
+
+        late = quiet_hours_end(mask, datetime.datetime(2026, 3, 2, 23, 30, tzinfo=zone))
+        early = quiet_hours_end(mask, datetime.datetime(2026, 3, 3, 6, 59, tzinfo=zone))
+
+        self.assertEqual(late, datetime.datetime(2026, 3, 3, 7, tzinfo=zone))
+        self.assertEqual(early, datetime.datetime(2026, 3, 3, 7, tzinfo=zone))
+        self.assertIsNone(quiet_hours_end(mask, datetime.datetime(2026, 3, 3, 7, tzinfo=zone)))
+        self.assertIsNone(quiet_hours_end(mask, datetime.datetime(2026, 3, 3, 12, tzinfo=zone)))
+
+    def test_settings_need_both_ends(self):
+        user = self.create_user()
+        self.client.force_authenticate(user)
+
+        response = self.client.patch(reverse('notification-settings'), {'quiet_hours_start': '22:00'}, format='json')
+        saved = self.client.patch(
+            reverse('notification-settings'), {'quiet_hours_start': '22:00', 'quiet_hours_end': '07:00'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(saved.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(quiet_hours_end(
+            get_preference_masks([user.id])[user.id],
+            datetime.datetime(2026, 3, 3, 23, tzinfo=timezone.get_current_timezone())
+        ))
+
+
+class DigestTests(NotificationTestCase):
+    """Unread in-app notifications are summarized per user and type, once"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user(digest_frequency=DigestFrequency.DAILY)
+        self.messages = self.add(self.user, 'MESSAGE', count=3)
+        self.payment = self.add(self.user, 'PAYMENT')
+        self.add(self.user, 'MESSAGE')
+        self.read = self.add(self.user, 'MESSAGE', read=True)
+        self.old = self.add(self.user, 'REVIEW')
+        InAppNotification.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - datetime.timedelta(days=2))
+
+    def add(self, user, notification_type, **kwargs):
+        return InAppNotification.objects.create(
+            user=user, notification_type=notification_type, title='Update', content='Update', **kwargs
+        )
+
+    def test_notifications_are_grouped_per_type_in_one_query(self):
+        since = timezone.now() - datetime.timedelta(days=1)
+
+        with self.assertNumQueries(1):
+            groups = digest_groups(DigestFrequency.DAILY, since, self.old.pk)
+
+        self.assertEqual(list(groups), [self.user.id])
+        self.assertEqual(
+            [(group['label'], group['count']) for group in groups[self.user.id]],
+            [('New Message', 4), ('Payment Update', 1)]
+        )
+
+    def test_digest_is_emailed_and_marks_what_it_covered(self):
+        self.assertEqual(send_digests(DigestFrequency.DAILY), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        email = mail.outbox[0]
+        self.assertEqual(email.to, [self.user.email])
+        self.assertEqual(email.subject, '5 unread notifications on A-List Home Pros')
+        self.assertIn('4 new messages', email.alternatives[0][0])
+        self.assertIn('1 payment update', email.alternatives[0][0])
+        digested = set(InAppNotification.objects.filter(digested_at__isnull=False).values_list('pk', flat=True))
+        self.assertEqual(len(digested), 3)
+        self.assertNotIn(self.read.pk, digested)
+        self.assertNotIn(self.old.pk, digested)
+
+    def test_second_run_sends_nothing_new(self):
+        send_digests(DigestFrequency.DAILY)
+        mail.outbox.clear()
+
+        self.assertEqual(send_digests(DigestFrequency.DAILY), 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_only_opted_in_users_with_email_get_digests(self):
+        weekly = self.create_user(digest_frequency=DigestFrequency.WEEKLY)
+        no_email = self.create_user(digest_frequency=DigestFrequency.DAILY, email_enabled=False)
+        self.add(weekly, 'MESSAGE')
+        self.add(no_email, 'MESSAGE')
+
+        send_digests(DigestFrequency.DAILY)
+
+        self.assertEqual([email.to for email in mail.outbox], [[self.user.email]])
+        self.assertEqual(send_digests(DigestFrequency.WEEKLY), 1)
+
+    def test_each_batch_uses_one_connection(self):
+        for _ in range(2):
+            self.add(self.create_user(digest_frequency=DigestFrequency.DAILY), 'PAYMENT')
+
+        with mock.patch('notifications.digests.get_connection', wraps=get_connection) as connections:
+            sent = send_digests(DigestFrequency.DAILY, batch_size=2)
+
+        self.assertEqual(sent, 3)
+        self.assertEqual(connections.call_count, 2)
+        self.assertEqual(len(mail.outbox), 3)
@@ -0,0 +1,106 @@
+"""
+Transports that send a batch of deliveries over one channel.
+
+Each transport's send_batch takes NotificationDelivery rows with their
+notification and user loaded, and returns the errors of the sends that
+failed; the others count as sent. SMS and push use a local stub that only
+logs and records what it would send until real providers are configured in
+NOTIFICATION_TRANSPORTS.
+"""
+import logging
+from collections import deque
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+
+from messaging.badges import invalidate_badges
+from messaging.models import Notification as InAppNotification
+from messaging.notification_feed import notify_users
+
+logger = logging.getLogger(__name__)
+
+IN_APP_TYPES = {choice for choice, _ in InAppNotification.NOTIFICATION_TYPES}
+
+
+class Transport:
+    """Send a batch of deliveries over one channel"""
+
+    def send_batch(self, deliveries):
+        """
+        Send deliveries.
+
+        Returns:
+            dict: delivery id -> error message of each failed send.
+        """
+        raise NotImplementedError
+
+
+class InAppTransport(Transport):
+    """Add the notifications to the in-app notification feed in one insert"""
+
+    def send_batch(self, deliveries):
+        notifications = [delivery.notification for delivery in deliveries]
+        InAppNotification.objects.bulk_create([
+            InAppNotification(
+                user_id=notification.user_id,
+                notification_type=(
+                    notification.notification_type if notification.notification_type in IN_APP_TYPES else 'SYSTEM'
+                ),
+                title=notification.title,
+                content=notification.message,
+                related_object_id=notification.related_object_id,
+                related_object_type=notification.related_object_type,
+            )
+            for notification in notifications
+        ])
+        user_ids = [notification.user_id for notification in notifications]
+        notify_users(user_ids)
+        invalidate_badges(user_ids)
+        return {}
+
+
+class EmailTransport(Transport):
+    """Send the emails of a batch over one SMTP connection"""
+
+    def send_batch(self, deliveries):
+        errors = {}
+        connection = get_connection()
+        connection.open()
+        try:
+            for delivery in deliveries:
+                notification = delivery.notification
+                message = EmailMultiAlternatives(
+                    subject=notification.title,
+                    body=strip_tags(notification.email_body),
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[notification.user.email],
+                    connection=connection
+                )
+                message.attach_alternative(notification.email_body, 'text/html')
+                try:
+                    message.send()
+                except Exception as e:
+                    errors[delivery.id] = str(e)
+        finally:
+            connection.close()
+        return errors
+
+
+class LocalStubTransport(Transport):
+    """Log sends instead of calling a provider, keeping the latest in outbox for inspection"""
+    outbox = deque(maxlen=1000)
+
+    def send_batch(self, deliveries):
+        for delivery in deliveries:
+            notification = delivery.notification
+            text = notification.sms_body if delivery.channel == 'sms' else notification.message
+            logger.info(f"{delivery.channel} to user {notification.user_id}: {text}")
+            self.outbox.append((delivery.channel, notification.user_id, text))
+        return {}
+
+
+def get_transport(channel):
+    """Return the configured transport of a channel."""
+    return import_string(settings.NOTIFICATION_TRANSPORTS[channel])()
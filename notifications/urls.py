@@ -0,0 +1,12 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from .views import NotificationSettingView, NotificationViewSet
+
+router = DefaultRouter()
+router.register(r'notifications', NotificationViewSet, basename='system-notification')
+
+urlpatterns = [
+    path('settings/', NotificationSettingView.as_view(), name='notification-settings'),
+    path('', include(router.urls)),
+]
@@ -0,0 +1,42 @@
+from rest_framework import generics, permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.utils import timezone
+
+from .models import Notification, NotificationSetting
+from .serializers import NotificationSerializer, NotificationSettingSerializer
+
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """The user's templated notifications"""
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        """Mark a notification as read"""
+        notification = self.get_object()
+        if not notification.read:
+            notification.read = True
+            notification.read_at = timezone.now()
+            notification.save(update_fields=['read', 'read_at', 'updated_at'])
+        return Response({'status': 'notification marked as read'})
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        """Mark all of the user's notifications as read"""
+        self.get_queryset().filter(read=False).update(read=True, read_at=timezone.now())
+        return Response({'status': 'all notifications marked as read'})
+
+
+class NotificationSettingView(generics.RetrieveUpdateAPIView):
+    """Get or update the user's notification preferences"""
+    serializer_class = NotificationSettingSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_object(self):
+        setting, _ = NotificationSetting.objects.get_or_create(user=self.request.user)
+        return setting
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AvailabilitySlot, UnavailableDate, Appointment, AppointmentNote
+from .models import AvailabilitySlot, UnavailableDate, Appointment, AppointmentNote, CalendarFeed
 
 
 class AppointmentNoteInline(admin.TabularInline):
@@ -49,3 +49,10 @@ class AppointmentNoteAdmin(admin.ModelAdmin):
     def note_preview(self, obj):
         return obj.note[:50] + '...' if len(obj.note) > 50 else obj.note
     note_preview.short_description = 'Note Preview'
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'created_at', 'updated_at']
+    search_fields = ['user__email', 'user__name']
+    readonly_fields = ['token', 'created_at', 'updated_at']
@@ -0,0 +1,87 @@
+"""
+External calendar import into contractor unavailability.
+
+An ICS calendar is parsed as a stream, recurring events are expanded within
+a horizon, and the resulting blocked dates are diffed against the
+contractor's existing unavailable dates so only the delta is written.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .ics import blocked_dates, iter_events
+from .models import UnavailableDate, UnavailableDateSource
+from .unavailability import apply_unavailability
+
+IMPORT_REASON = 'Busy in external calendar'
+DELETE_BATCH_SIZE = 500
+
+
+def import_unavailability(contractor, lines, user=None, horizon_days=180):
+    """
+    Sync a contractor's imported unavailable dates with an ICS calendar.
+
+    Dates the calendar blocks are added unless the contractor already has an
+    unavailable date for them. Previously imported dates the calendar no
+    longer blocks are removed; manually entered dates are never touched.
+    Appointments on newly blocked dates go through the usual unavailability
+    pipeline.
+
+    Args:
+        contractor: The ContractorProfile to import into.
+        lines: An iterable of raw ICS lines (bytes or str), e.g. a file.
+        user: The user performing the import, defaults to the contractor.
+        horizon_days: How many days ahead recurring events are expanded.
+
+    Returns:
+        dict: Counts of added, removed and unchanged dates, plus the impact
+        summary for affected appointments.
+    """
+    horizon_start = timezone.now().date()
+    horizon_end = horizon_start + timedelta(days=horizon_days)
+
+    wanted = blocked_dates(iter_events(lines), horizon_start, horizon_end)
+
+    existing = UnavailableDate.objects.filter(
+        contractor=contractor,
+        date__range=(horizon_start, horizon_end)
+    ).values_list('id', 'date', 'source')
+
+    existing_dates = set()
+    stale_ids = []
+    for unavailable_id, day, source in existing:
+        existing_dates.add(day)
+        if source == UnavailableDateSource.CALENDAR and day not in wanted:
+            stale_ids.append(unavailable_id)
+
+    new_dates = sorted(wanted - existing_dates)
+
+    with transaction.atomic():
+        for offset in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+            UnavailableDate.objects.filter(id__in=stale_ids[offset:offset + DELETE_BATCH_SIZE]).delete()
+
+        UnavailableDate.objects.bulk_create(
+            [
+                UnavailableDate(
+                    contractor=contractor,
+                    date=day,
+                    reason=IMPORT_REASON,
+                    source=UnavailableDateSource.CALENDAR
+                )
+                for day in new_dates
+            ],
+            batch_size=500
+        )
+
+        impact = apply_unavailability(contractor, new_dates, user or contractor.user, reason=IMPORT_REASON)
+
+    return {
+        'horizon_start': horizon_start,
+        'horizon_end': horizon_end,
+        'blocked_dates': len(wanted),
+        'added': len(new_dates),
+        'removed': len(stale_ids),
+        'unchanged': len(wanted) - len(new_dates),
+        'impact': impact,
+    }
@@ -0,0 +1,480 @@
+"""
+iCalendar (RFC 5545) support for appointment calendar feeds and imports.
+
+Documents are produced and parsed line by line, so a feed can be streamed
+straight from a database iterator and an uploaded calendar can be read
+without holding the whole file in memory.
+"""
+import calendar
+import re
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.utils import timezone
+
+CRLF = '\r\n'
+
+# Appointment statuses mapped to iCalendar event statuses
+EVENT_STATUSES = {
+    'REQUESTED': 'TENTATIVE',
+    'CONFIRMED': 'CONFIRMED',
+    'COMPLETED': 'CONFIRMED',
+    'CANCELLED': 'CANCELLED',
+    'RESCHEDULED': 'CANCELLED',
+}
+
+
+def escape_text(value):
+    """Escape a value for use in an iCalendar TEXT property."""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + CRLF
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return (CRLF + ' ').join(parts) + CRLF
+
+
+def format_local(day, time_of_day):
+    """Format a date and time as a floating (wall clock) iCalendar DATE-TIME."""
+    return datetime.combine(day, time_of_day).strftime('%Y%m%dT%H%M%S')
+
+
+def format_utc(value):
+    """Format an aware datetime as a UTC iCalendar DATE-TIME."""
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def uid_domain():
+    """Return the domain used to build globally unique event ids."""
+    return urlparse(settings.SITE_URL).hostname or 'alistpros.com'
+
+
+def appointment_event(appointment, for_contractor, domain):
+    """
+    Render one appointment as VEVENT content lines.
+
+    Args:
+        appointment: The appointment, with client, contractor and
+            service_category loaded.
+        for_contractor: Whether the feed belongs to the contractor, which
+            decides whose name appears in the summary.
+        domain: The domain used in the event UID.
+
+    Returns:
+        list: Folded content lines for the event.
+    """
+    service = appointment.service_category.name if appointment.service_category_id else 'Appointment'
+    if for_contractor:
+        summary = f"{service} with {appointment.client.name}"
+    else:
+        summary = f"{service} with {appointment.contractor.business_name}"
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{appointment.id}@{domain}',
+        f'DTSTAMP:{format_utc(appointment.updated_at)}',
+        f'LAST-MODIFIED:{format_utc(appointment.updated_at)}',
+        f'DTSTART:{format_local(appointment.appointment_date, appointment.start_time)}',
+        f'DTEND:{format_local(appointment.appointment_date, appointment.end_time)}',
+        f'SUMMARY:{escape_text(summary)}',
+        f'STATUS:{EVENT_STATUSES.get(appointment.status, "CONFIRMED")}',
+    ]
+    if appointment.location:
+        lines.append(f'LOCATION:{escape_text(appointment.location)}')
+    if appointment.notes:
+        lines.append(f'DESCRIPTION:{escape_text(appointment.notes)}')
+    lines.append('END:VEVENT')
+    return [fold_line(line) for line in lines]
+
+
+def stream_calendar(appointments, calendar_name, for_contractor=False):
+    """
+    Yield an iCalendar document for the given appointments.
+
+    Args:
+        appointments: An iterable of appointments, ideally a queryset iterator.
+        calendar_name: The display name of the calendar.
+        for_contractor: Whether the feed belongs to the contractor.
+
+    Yields:
+        str: Chunks of the document, one per event after the header.
+    """
+    yield ''.join(fold_line(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//A-List Home Pros//Appointments//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(calendar_name)}',
+    ])
+
+    domain = uid_domain()
+    for appointment in appointments:
+        yield ''.join(appointment_event(appointment, for_contractor, domain))
+
+    yield fold_line('END:VCALENDAR')
+
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
+DURATION_RE = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+
+class ICSEvent:
+    """The parts of a VEVENT needed to work out which dates it blocks"""
+    __slots__ = ('uid', 'start', 'end', 'duration', 'rrule', 'exdates', 'recurrence_id', 'busy')
+
+    def __init__(self):
+        self.uid = None
+        self.start = None
+        self.end = None
+        self.duration = None
+        self.rrule = None
+        self.exdates = set()
+        self.recurrence_id = None
+        self.busy = True
+
+
+def unfold_lines(lines):
+    """
+    Join folded iCalendar content lines.
+
+    Args:
+        lines: An iterable of raw lines, as bytes or str, e.g. an open file.
+
+    Yields:
+        str: Logical content lines without line endings.
+    """
+    current = None
+    for raw in lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8', errors='replace')
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t'):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_content_line(line):
+    """Split a content line into its upper-cased name, parameters and value."""
+    in_quotes = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        return None, {}, ''
+
+    name, *raw_params = head.split(';')
+    params = {}
+    for raw_param in raw_params:
+        key, _, param_value = raw_param.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def parse_ics_datetime(value, params=None):
+    """
+    Parse a DATE or DATE-TIME value.
+
+    UTC values are converted to wall clock time in the project time zone;
+    floating and TZID values are kept as the wall clock time they give.
+    """
+    value = value.strip()
+    if (params or {}).get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value[:8], '%Y%m%d').date()
+    if value.endswith('Z'):
+        parsed = datetime.strptime(value[:-1], '%Y%m%dT%H%M%S').replace(tzinfo=dt_timezone.utc)
+        return timezone.localtime(parsed).replace(tzinfo=None)
+    return datetime.strptime(value[:15], '%Y%m%dT%H%M%S')
+
+
+def parse_duration(value):
+    """Parse an iCalendar DURATION value into a timedelta."""
+    match = DURATION_RE.match(value.strip())
+    if not match:
+        return None
+    parts = {key: int(number) for key, number in match.groupdict().items() if key != 'sign' and number}
+    duration = timedelta(**parts)
+    return -duration if match.group('sign') == '-' else duration
+
+
+def as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def iter_events(lines):
+    """
+    Parse VEVENT components from a stream of raw iCalendar lines.
+
+    Only the properties needed to compute blocked dates are kept, and nested
+    components such as VALARM are skipped.
+
+    Yields:
+        ICSEvent: One per VEVENT with a start date.
+    """
+    event = None
+    nested = 0
+    for line in unfold_lines(lines):
+        name, params, value = parse_content_line(line)
+        if name is None:
+            continue
+
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT':
+                event, nested = ICSEvent(), 0
+            elif event is not None:
+                nested += 1
+            continue
+        if name == 'END':
+            if value.upper() == 'VEVENT' and event is not None:
+                if event.start is not None:
+                    yield event
+                event = None
+            elif event is not None:
+                nested -= 1
+            continue
+        if event is None or nested:
+            continue
+
+        try:
+            if name == 'UID':
+                event.uid = value
+            elif name == 'DTSTART':
+                event.start = parse_ics_datetime(value, params)
+            elif name == 'DTEND':
+                event.end = parse_ics_datetime(value, params)
+            elif name == 'DURATION':
+                event.duration = parse_duration(value)
+            elif name == 'RRULE':
+                event.rrule = {
+                    key.upper(): part
+                    for key, _, part in (item.partition('=') for item in value.split(';'))
+                }
+            elif name == 'EXDATE':
+                event.exdates.update(as_date(parse_ics_datetime(item, params)) for item in value.split(','))
+            elif name == 'RECURRENCE-ID':
+                event.recurrence_id = as_date(parse_ics_datetime(value, params))
+            elif name == 'TRANSP':
+                event.busy = event.busy and value.upper() != 'TRANSPARENT'
+            elif name == 'STATUS':
+                event.busy = event.busy and value.upper() != 'CANCELLED'
+        except ValueError:
+            # Skip malformed properties rather than the whole calendar
+            continue
+
+
+def add_months(year, month, count):
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+
+def nth_weekdays(year, month, byday):
+    """Resolve BYDAY entries such as MO, 2TU or -1FR within a month."""
+    days_in_month = calendar.monthrange(year, month)[1]
+    result = []
+    for item in byday:
+        match = re.match(r'^([+-]?\d+)?([A-Z]{2})$', item)
+        if not match or match.group(2) not in WEEKDAYS:
+            continue
+        weekday = WEEKDAYS[match.group(2)]
+        matching = [
+            day for day in range(1, days_in_month + 1)
+            if date(year, month, day).weekday() == weekday
+        ]
+        if match.group(1):
+            ordinal = int(match.group(1))
+            if 0 < abs(ordinal) <= len(matching):
+                result.append(matching[ordinal - 1 if ordinal > 0 else ordinal])
+        else:
+            result.extend(matching)
+    return sorted(set(result))
+
+
+def candidate_dates(start, rule, horizon_end, fast_forward_to=None):
+    """
+    Yield candidate occurrence dates for a recurrence rule, in order.
+
+    Supports DAILY, WEEKLY, MONTHLY and YEARLY rules with INTERVAL, BYDAY
+    and BYMONTHDAY. Daily and weekly rules without COUNT skip straight to
+    ``fast_forward_to`` instead of walking every period since DTSTART.
+    """
+    freq = rule.get('FREQ', '').upper()
+    interval = max(int(rule.get('INTERVAL', 1) or 1), 1)
+    byday = [item.strip().upper() for item in rule.get('BYDAY', '').split(',') if item.strip()]
+    bymonthday = [int(item) for item in rule.get('BYMONTHDAY', '').split(',') if item.strip()]
+
+    if freq == 'DAILY':
+        period = 0
+        if fast_forward_to and fast_forward_to > start:
+            period = (fast_forward_to - start).days // interval
+        while True:
+            candidate = start + timedelta(days=period * interval)
+            if candidate > horizon_end:
+                return
+            yield candidate
+            period += 1
+
+    elif freq == 'WEEKLY':
+        weekdays = sorted({WEEKDAYS[item[-2:]] for item in byday if item[-2:] in WEEKDAYS}) or [start.weekday()]
+        first_week = start - timedelta(days=start.weekday())
+        period = 0
+        if fast_forward_to and fast_forward_to > first_week:
+            period = max(((fast_forward_to - first_week).days // 7) // interval - 1, 0)
+        while True:
+            week = first_week + timedelta(weeks=period * interval)
+            if week > horizon_end:
+                return
+            for weekday in weekdays:
+                yield week + timedelta(days=weekday)
+            period += 1
+
+    elif freq in ('MONTHLY', 'YEARLY'):
+        step = interval if freq == 'MONTHLY' else interval * 12
+        period = 0
+        while True:
+            year, month = add_months(start.year, start.month, period * step)
+            if date(year, month, 1) > horizon_end:
+                return
+            days_in_month = calendar.monthrange(year, month)[1]
+            if byday and freq == 'MONTHLY':
+                days = nth_weekdays(year, month, byday)
+            elif bymonthday:
+                days = sorted({day if day > 0 else days_in_month + day + 1 for day in bymonthday})
+            else:
+                days = [start.day]
+            for day in days:
+                if 1 <= day <= days_in_month:
+                    yield date(year, month, day)
+            period += 1
+
+
+def iter_occurrences(event, horizon_start, horizon_end):
+    """
+    Yield the start of each occurrence of an event that may touch the horizon.
+
+    Args:
+        event: The parsed ICSEvent.
+        horizon_start: The first date of interest.
+        horizon_end: The last date of interest.
+    """
+    if not event.rrule:
+        yield event.start
+        return
+
+    rule = event.rrule
+    start_date = as_date(event.start)
+    count = int(rule['COUNT']) if rule.get('COUNT', '').isdigit() else None
+    until = as_date(parse_ics_datetime(rule['UNTIL'])) if rule.get('UNTIL') else None
+    # Allow for multi-day events that started before the horizon
+    fast_forward_to = horizon_start - timedelta(days=7) if count is None else None
+
+    emitted = 0
+    for candidate in candidate_dates(start_date, rule, horizon_end, fast_forward_to):
+        if candidate < start_date:
+            continue
+        if until and candidate > until:
+            return
+        emitted += 1
+        if candidate not in event.exdates:
+            if isinstance(event.start, datetime):
+                yield datetime.combine(candidate, event.start.time())
+            else:
+                yield candidate
+        if count and emitted >= count:
+            return
+
+
+def event_span(event):
+    """Return how long each occurrence of an event lasts."""
+    if event.end is not None:
+        if isinstance(event.start, datetime) and isinstance(event.end, datetime):
+            return event.end - event.start
+        return as_date(event.end) - as_date(event.start)
+    if event.duration is not None:
+        return event.duration
+    return timedelta(days=1) if not isinstance(event.start, datetime) else timedelta(0)
+
+
+def blocked_dates(events, horizon_start, horizon_end):
+    """
+    Collect the dates covered by busy events within a horizon.
+
+    All-day events block every date up to their exclusive end date; timed
+    events block each date they touch. Occurrences replaced by a
+    RECURRENCE-ID override are taken from the override instead.
+
+    Args:
+        events: An iterable of ICSEvent, e.g. from iter_events().
+        horizon_start: The first date to consider.
+        horizon_end: The last date to consider.
+
+    Returns:
+        set: The blocked dates.
+    """
+    masters = []
+    overridden = {}
+    dates = set()
+
+    def add_occurrence(occurrence, span):
+        if isinstance(occurrence, datetime):
+            first = occurrence.date()
+            last = (occurrence + span - timedelta(microseconds=1)).date() if span > timedelta(0) else first
+        else:
+            first = occurrence
+            last = occurrence + max(span, timedelta(days=1)) - timedelta(days=1)
+        day = max(first, horizon_start)
+        while day <= min(last, horizon_end):
+            dates.add(day)
+            day += timedelta(days=1)
+
+    for event in events:
+        if event.recurrence_id is not None:
+            overridden.setdefault(event.uid, set()).add(event.recurrence_id)
+        if event.rrule and event.recurrence_id is None:
+            masters.append(event)
+        elif event.busy:
+            add_occurrence(event.start, event_span(event))
+
+    for event in masters:
+        if not event.busy:
+            continue
+        event.exdates |= overridden.get(event.uid, set())
+        span = event_span(event)
+        for occurrence in iter_occurrences(event, horizon_start, horizon_end):
+            add_occurrence(occurrence, span)
+
+    return dates
@@ -0,0 +1,265 @@
+import random
+import time
+from datetime import time as dt_time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from contractors.models import ContractorProfile, ServiceCategory
+from core.benchmarks import BenchmarkRecorder, write_report
+from scheduling.models import AvailabilitySlot, UnavailableDate, Appointment, AppointmentStatus
+from scheduling.serializers import AppointmentCreateSerializer
+from scheduling.views import AppointmentViewSet
+from users.models import UserRole
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'bench.invalid'
+BATCH_SIZE = 5000
+
+
+class RollbackBenchmarkData(Exception):
+    """Raised to roll back the seeded data once the benchmark has finished"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks booking validation, availability lookups and upcoming appointments '
+        'against synthetic data, and writes p50/p95 latency and query counts to JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=10000,
+            help='Number of synthetic appointments to seed (e.g. 10000, 100000, 1000000)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Timed iterations per benchmark case'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed, so runs with the same seed use the same data'
+        )
+        parser.add_argument(
+            '--output',
+            default='scheduling_benchmark.json',
+            help='Path of the JSON report'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of rolling it back'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.today = timezone.now().date()
+        scale = options['scale']
+
+        self.stdout.write(f'Seeding scheduling data at scale {scale}...')
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                self.seed(scale)
+                seed_seconds = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(f'Seeded in {seed_seconds:.1f}s'))
+
+                recorder = BenchmarkRecorder()
+                self.run_benchmarks(recorder, options['iterations'])
+                report = recorder.report(
+                    suite='scheduling',
+                    scale=scale,
+                    seed=options['seed'],
+                    iterations=options['iterations'],
+                    seed_seconds=round(seed_seconds, 2),
+                    rows={
+                        'contractors': len(self.contractor_ids),
+                        'clients': len(self.client_ids),
+                        'availability_slots': AvailabilitySlot.objects.count(),
+                        'unavailable_dates': UnavailableDate.objects.count(),
+                        'appointments': Appointment.objects.count(),
+                    }
+                )
+
+                if not options['keep']:
+                    raise RollbackBenchmarkData
+        except RollbackBenchmarkData:
+            pass
+
+        write_report(options['output'], report)
+        for name, result in report['benchmarks'].items():
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                f"{result['queries_p50']} queries"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def seed(self, scale):
+        """Create synthetic users, contractors, slots, unavailable dates and appointments"""
+        password = make_password(None)
+        num_contractors = max(scale // 100, 10)
+        num_clients = max(scale // 50, 10)
+
+        ServiceCategory.objects.bulk_create([
+            ServiceCategory(name=f'Benchmark Category {index}') for index in range(10)
+        ])
+        category_ids = list(ServiceCategory.objects.filter(
+            name__startswith='Benchmark Category'
+        ).values_list('id', flat=True))
+
+        User.objects.bulk_create(
+            [
+                User(email=f'bench-contractor-{index}@{EMAIL_DOMAIN}', name=f'Bench Contractor {index}',
+                     role=UserRole.CONTRACTOR, password=password)
+                for index in range(num_contractors)
+            ] + [
+                User(email=f'bench-client-{index}@{EMAIL_DOMAIN}', name=f'Bench Client {index}',
+                     role=UserRole.CLIENT, password=password)
+                for index in range(num_clients)
+            ],
+            batch_size=BATCH_SIZE
+        )
+        contractor_user_ids = list(User.objects.filter(
+            email__startswith='bench-contractor-', email__endswith=EMAIL_DOMAIN
+        ).order_by('id').values_list('id', flat=True))
+        self.client_ids = list(User.objects.filter(
+            email__startswith='bench-client-', email__endswith=EMAIL_DOMAIN
+        ).order_by('id').values_list('id', flat=True))
+
+        ContractorProfile.objects.bulk_create(
+            [ContractorProfile(user_id=user_id, business_name=f'Bench Pro {user_id}')
+             for user_id in contractor_user_ids],
+            batch_size=BATCH_SIZE
+        )
+        self.contractor_ids = list(ContractorProfile.objects.filter(
+            user_id__in=contractor_user_ids
+        ).order_by('id').values_list('id', flat=True))
+
+        Through = ContractorProfile.service_categories.through
+        self.contractor_categories = {}
+        links = []
+        for contractor_id in self.contractor_ids:
+            chosen = self.random.sample(category_ids, 2)
+            self.contractor_categories[contractor_id] = chosen
+            links.extend(Through(contractorprofile_id=contractor_id, servicecategory_id=category_id)
+                         for category_id in chosen)
+        Through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+        # Weekday working hours plus a short Saturday for every contractor
+        slots = []
+        for contractor_id in self.contractor_ids:
+            for day in range(5):
+                slots.append(AvailabilitySlot(contractor_id=contractor_id, day_of_week=day,
+                                              start_time=dt_time(8), end_time=dt_time(18)))
+            slots.append(AvailabilitySlot(contractor_id=contractor_id, day_of_week=5,
+                                          start_time=dt_time(9), end_time=dt_time(13)))
+        AvailabilitySlot.objects.bulk_create(slots, batch_size=BATCH_SIZE)
+
+        UnavailableDate.objects.bulk_create(
+            [
+                UnavailableDate(contractor_id=contractor_id,
+                                date=self.today + timedelta(days=self.random.randint(-90, 180)),
+                                reason='Benchmark')
+                for contractor_id in self.contractor_ids
+                for _ in range(3)
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+        statuses = [
+            AppointmentStatus.REQUESTED, AppointmentStatus.CONFIRMED,
+            AppointmentStatus.COMPLETED, AppointmentStatus.CANCELLED,
+        ]
+        created = 0
+        while created < scale:
+            batch = []
+            for _ in range(min(BATCH_SIZE, scale - created)):
+                contractor_id = self.random.choice(self.contractor_ids)
+                hour = self.random.randint(8, 16)
+                batch.append(Appointment(
+                    client_id=self.random.choice(self.client_ids),
+                    contractor_id=contractor_id,
+                    service_category_id=self.random.choice(self.contractor_categories[contractor_id]),
+                    appointment_date=self.today + timedelta(days=self.random.randint(-365, 180)),
+                    start_time=dt_time(hour),
+                    end_time=dt_time(hour + 1),
+                    status=self.random.choices(statuses, weights=[2, 3, 4, 1])[0],
+                    location='Benchmark location',
+                ))
+            Appointment.objects.bulk_create(batch)
+            created += len(batch)
+
+    def random_booking(self):
+        """Return attrs for a plausible booking request on a weekday"""
+        contractor_id = self.random.choice(self.contractor_ids)
+        day = self.today + timedelta(days=self.random.randint(1, 120))
+        while day.weekday() > 4:
+            day += timedelta(days=1)
+        hour = self.random.randint(8, 16)
+        return contractor_id, day, dt_time(hour), dt_time(hour + 1)
+
+    def run_benchmarks(self, recorder, iterations):
+        contractors = ContractorProfile.objects.in_bulk(self.contractor_ids)
+        categories = ServiceCategory.objects.in_bulk(
+            {category_id for chosen in self.contractor_categories.values() for category_id in chosen}
+        )
+        factory = APIRequestFactory()
+        client_users = User.objects.in_bulk(self.client_ids[:iterations + 10])
+        contractor_users = {profile.id: profile.user for profile in
+                            ContractorProfile.objects.filter(id__in=self.contractor_ids[:iterations + 10])
+                            .select_related('user')}
+
+        def validate_booking(index):
+            contractor_id, day, start, end = self.random_booking()
+            serializer = AppointmentCreateSerializer()
+            try:
+                serializer.validate({
+                    'contractor': contractors[contractor_id],
+                    'service_category': categories[self.contractor_categories[contractor_id][0]],
+                    'appointment_date': day,
+                    'start_time': start,
+                    'end_time': end,
+                })
+            except serializers.ValidationError:
+                return 'rejected'
+            return 'accepted'
+
+        def availability_lookup(index):
+            contractor_id, day, start, end = self.random_booking()
+            return 'available' if AvailabilitySlot.objects.filter(
+                contractor_id=contractor_id,
+                day_of_week=day.weekday(),
+                start_time__lte=start,
+                end_time__gte=end
+            ).exists() else 'unavailable'
+
+        upcoming_view = AppointmentViewSet.as_view({'get': 'upcoming'})
+
+        def upcoming_for(user):
+            request = factory.get('/api/scheduling/appointments/upcoming/')
+            force_authenticate(request, user=user)
+            response = upcoming_view(request)
+            response.render()
+            return str(response.status_code)
+
+        client_list = list(client_users.values())
+        contractor_list = list(contractor_users.values())
+
+        recorder.measure('appointment_create_validate', validate_booking, iterations)
+        recorder.measure('availability_slot_lookup', availability_lookup, iterations)
+        recorder.measure('upcoming_client', lambda index: upcoming_for(client_list[index % len(client_list)]),
+                         iterations)
+        recorder.measure('upcoming_contractor',
+                         lambda index: upcoming_for(contractor_list[index % len(contractor_list)]), iterations)
@@ -0,0 +1,59 @@
+import sys
+from contextlib import contextmanager
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from contractors.models import ContractorProfile
+from scheduling.calendar_import import import_unavailability
+
+
+class Command(BaseCommand):
+    help = 'Imports busy dates from an ICS calendar into a contractor\'s unavailable dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'contractor_id',
+            type=int,
+            help='ID of the contractor profile to import into'
+        )
+        parser.add_argument(
+            'source',
+            help='Path to an .ics file, an http(s) URL, or - to read from stdin'
+        )
+        parser.add_argument(
+            '--horizon-days',
+            type=int,
+            default=180,
+            help='How many days ahead recurring events are expanded'
+        )
+
+    @contextmanager
+    def open_source(self, source):
+        """Open the calendar as a line iterator without reading it all at once"""
+        if source == '-':
+            yield sys.stdin.buffer
+        elif source.startswith(('http://', 'https://')):
+            with urlopen(source, timeout=30) as response:
+                yield response
+        else:
+            try:
+                with open(source, 'rb') as calendar_file:
+                    yield calendar_file
+            except OSError as e:
+                raise CommandError(f'Could not open {source}: {e}')
+
+    def handle(self, *args, **options):
+        try:
+            contractor = ContractorProfile.objects.select_related('user').get(id=options['contractor_id'])
+        except ContractorProfile.DoesNotExist:
+            raise CommandError(f"Contractor profile {options['contractor_id']} does not exist")
+
+        with self.open_source(options['source']) as lines:
+            result = import_unavailability(contractor, lines, horizon_days=options['horizon_days'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported calendar for {contractor.business_name}: "
+            f"{result['added']} added, {result['removed']} removed, {result['unchanged']} unchanged, "
+            f"{result['impact']['affected_count']} appointments need rescheduling"
+        ))
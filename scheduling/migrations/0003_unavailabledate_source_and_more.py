@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0002_calendarfeed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unavailabledate',
+            name='source',
+            field=models.CharField(choices=[('MANUAL', 'Manual'), ('CALENDAR', 'Calendar Import')], default='MANUAL', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='unavailabledate',
+            index=models.Index(fields=['contractor', 'date'], name='scheduling__contrac_70d125_idx'),
+        ),
+    ]
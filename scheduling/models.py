@@ -34,6 +34,11 @@ class AvailabilitySlot(TimeStampedModel):
         return f"{self.contractor.business_name} - {day_names[self.day_of_week]} {self.start_time} to {self.end_time}"
 
 
+class UnavailableDateSource(models.TextChoices):
+    MANUAL = 'MANUAL', 'Manual'
+    CALENDAR = 'CALENDAR', 'Calendar Import'
+
+
 class UnavailableDate(TimeStampedModel):
     """Specific dates when a contractor is unavailable"""
     contractor = models.ForeignKey(
@@ -43,9 +48,17 @@ class UnavailableDate(TimeStampedModel):
     )
     date = models.DateField()
     reason = models.CharField(max_length=255, blank=True)
+    source = models.CharField(
+        max_length=20,
+        choices=UnavailableDateSource.choices,
+        default=UnavailableDateSource.MANUAL
+    )
     
     class Meta:
         ordering = ['date']
+        indexes = [
+            models.Index(fields=['contractor', 'date']),
+        ]
         
     def __str__(self):
         return f"{self.contractor.business_name} - Unavailable on {self.date}"
@@ -116,3 +129,16 @@ class AppointmentNote(TimeStampedModel):
         
     def __str__(self):
         return f"Note for appointment {self.appointment.id} by {self.user.name}"
+
+
+class CalendarFeed(TimeStampedModel):
+    """Secret token giving read-only calendar (ICS) access to a user's appointments"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed'
+    )
+    token = models.CharField(max_length=64, unique=True)
+    
+    def __str__(self):
+        return f"Calendar feed for {self.user.email}"
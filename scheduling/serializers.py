@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from contractors.models import ContractorProfile, ServiceCategory
 from contractors.serializers import ServiceCategorySerializer, ContractorProfileSerializer
 from users.serializers import UserSerializer
@@ -26,8 +27,19 @@ class UnavailableDateSerializer(serializers.ModelSerializer):
     """Serializer for contractor unavailable dates"""
     class Meta:
         model = UnavailableDate
-        fields = ['id', 'contractor', 'date', 'reason']
-        read_only_fields = ['id']
+        fields = ['id', 'contractor', 'date', 'reason', 'source']
+        read_only_fields = ['id', 'source']
+
+
+class CalendarImportSerializer(serializers.Serializer):
+    """Serializer for importing unavailable dates from an ICS calendar"""
+    file = serializers.FileField()
+    contractor = serializers.PrimaryKeyRelatedField(
+        queryset=ContractorProfile.objects.all(),
+        required=False,
+        help_text='Only used by admins; contractors always import into their own profile'
+    )
+    horizon_days = serializers.IntegerField(min_value=1, max_value=730, default=180)
 
 
 class AppointmentNoteSerializer(serializers.ModelSerializer):
@@ -112,7 +124,7 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
             status__in=['REQUESTED', 'CONFIRMED'],
         ).filter(
             # Check for time overlap
-            models.Q(start_time__lt=end_time, end_time__gt=start_time)
+            Q(start_time__lt=end_time, end_time__gt=start_time)
         )
         
         if overlapping_appointments.exists():
@@ -167,7 +179,7 @@ class AppointmentUpdateSerializer(serializers.ModelSerializer):
                 status__in=['REQUESTED', 'CONFIRMED'],
             ).exclude(id=instance.id).filter(
                 # Check for time overlap
-                models.Q(start_time__lt=end_time, end_time__gt=start_time)
+                Q(start_time__lt=end_time, end_time__gt=start_time)
             )
             
             if overlapping_appointments.exists():
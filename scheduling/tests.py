@@ -0,0 +1,92 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from contractors.models import ContractorProfile, ServiceCategory
+from users.models import UserRole
+from .models import Appointment, AppointmentStatus, CalendarFeed, UnavailableDate
+
+User = get_user_model()
+
+
+class UnavailableDateOwnershipTests(APITestCase):
+    """Contractors may only block dates on their own calendar"""
+
+    def setUp(self):
+        self.category = ServiceCategory.objects.create(name='Plumbing')
+        self.contractor = self.create_contractor('owner@example.com')
+        self.other_contractor = self.create_contractor('other@example.com')
+        self.client_user = User.objects.create_user(
+            email='client@example.com', name='Client', phone_number='1',
+            password='pw12345!X', role=UserRole.CLIENT
+        )
+        self.date = datetime.date.today() + datetime.timedelta(days=3)
+        self.appointment = Appointment.objects.create(
+            client=self.client_user,
+            contractor=self.contractor,
+            service_category=self.category,
+            appointment_date=self.date,
+            start_time=datetime.time(9),
+            end_time=datetime.time(10),
+            location='Home'
+        )
+        self.payload = {'contractor': self.contractor.pk, 'date': self.date.isoformat()}
+
+    def create_contractor(self, email):
+        user = User.objects.create_user(
+            email=email, name=email, phone_number='1',
+            password='pw12345!X', role=UserRole.CONTRACTOR
+        )
+        return ContractorProfile.objects.create(user=user, business_name=email)
+
+    def test_other_contractor_cannot_create(self):
+        self.client.force_authenticate(self.other_contractor.user)
+        response = self.client.post(reverse('unavailable-date-list'), self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(UnavailableDate.objects.exists())
+        self.appointment.refresh_from_db()
+        self.assertNotEqual(self.appointment.status, AppointmentStatus.RESCHEDULED)
+
+    def test_other_contractor_cannot_preview_impact(self):
+        self.client.force_authenticate(self.other_contractor.user)
+        response = self.client.post(reverse('unavailable-date-impact'), self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_owner_can_create(self):
+        self.client.force_authenticate(self.contractor.user)
+        response = self.client.post(reverse('unavailable-date-list'), self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.status, AppointmentStatus.RESCHEDULED)
+
+
+class CalendarFeedICSViewTests(APITestCase):
+    """The ICS feed must serve calendar clients that ask for text/calendar"""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            email='client@example.com', name='Client', phone_number='1',
+            password='pw12345!X', role=UserRole.CLIENT
+        )
+        self.feed = CalendarFeed.objects.create(user=user, token='feedtoken')
+        self.url = reverse('calendar-feed-ics', kwargs={'token': self.feed.token})
+
+    def test_accept_text_calendar(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/calendar')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        self.assertIn(b'BEGIN:VCALENDAR', b''.join(response.streaming_content))
+
+    def test_unknown_token(self):
+        response = self.client.get(
+            reverse('calendar-feed-ics', kwargs={'token': 'missing'}), HTTP_ACCEPT='text/calendar'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,149 @@
+"""
+Impact handling for contractor unavailability on the A-List Home Pros platform.
+
+When a contractor blocks out one or more dates, every open appointment on
+those dates is moved to RESCHEDULED in bulk, an audit note is written for
+each one and the affected clients are notified in a single batch, in the app
+right away and by email, SMS or push through the notification pipeline.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from messaging.models import Notification
+from messaging.badges import invalidate_badges
+from messaging.notification_feed import notify_users
+from notifications.delivery import notify
+from notifications.preferences import EXTERNAL_CHANNELS
+from .models import Appointment, AppointmentNote, AppointmentStatus
+
+# Appointments in these states still hold the contractor's time
+ACTIVE_STATUSES = [AppointmentStatus.REQUESTED, AppointmentStatus.CONFIRMED]
+
+
+def get_affected_appointments(contractor, dates):
+    """
+    Return the open appointments a contractor has on any of the given dates.
+
+    Args:
+        contractor: The ContractorProfile blocking out the dates.
+        dates: An iterable of dates being marked as unavailable.
+
+    Returns:
+        QuerySet: Requested or confirmed appointments on those dates.
+    """
+    return Appointment.objects.filter(
+        contractor=contractor,
+        appointment_date__in=list(dates),
+        status__in=ACTIVE_STATUSES
+    ).select_related('client').order_by('appointment_date', 'start_time')
+
+
+def summarize_impact(appointments):
+    """
+    Build the impact summary shown to the contractor.
+
+    Args:
+        appointments: The affected appointments.
+
+    Returns:
+        dict: The number of affected appointments and clients, and one entry
+        per appointment.
+    """
+    return {
+        'affected_count': len(appointments),
+        'affected_clients': len({appointment.client_id for appointment in appointments}),
+        'appointments': [
+            {
+                'id': appointment.id,
+                'client_name': appointment.client.name,
+                'date': appointment.appointment_date,
+                'start_time': appointment.start_time,
+                'end_time': appointment.end_time,
+                'status': appointment.status,
+            }
+            for appointment in appointments
+        ],
+    }
+
+
+def preview_unavailability_impact(contractor, dates):
+    """
+    Return the impact summary of blocking out dates without changing anything.
+    """
+    return summarize_impact(list(get_affected_appointments(contractor, dates)))
+
+
+def apply_unavailability(contractor, dates, user, reason=''):
+    """
+    Reschedule every open appointment affected by newly unavailable dates.
+
+    The affected appointments are loaded with one query, moved to
+    RESCHEDULED with one UPDATE, and their audit notes and client
+    notifications are written with one bulk insert each. Email, SMS and push
+    are queued with a single notify() call for all affected clients.
+
+    Args:
+        contractor: The ContractorProfile blocking out the dates.
+        dates: An iterable of dates being marked as unavailable.
+        user: The user making the change, recorded as the note author.
+        reason: Optional reason given for the unavailability.
+
+    Returns:
+        dict: The impact summary, with statuses as they were before the change.
+    """
+    with transaction.atomic():
+        appointments = list(get_affected_appointments(contractor, dates).select_for_update())
+        summary = summarize_impact(appointments)
+        if not appointments:
+            return summary
+
+        Appointment.objects.filter(
+            id__in=[appointment.id for appointment in appointments]
+        ).update(status=AppointmentStatus.RESCHEDULED, updated_at=timezone.now())
+
+        note_text = f"Appointment needs rescheduling: {contractor.business_name} is unavailable on this date"
+        if reason:
+            note_text = f"{note_text} ({reason})"
+
+        AppointmentNote.objects.bulk_create([
+            AppointmentNote(appointment=appointment, user=user, note=note_text)
+            for appointment in appointments
+        ])
+
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=appointment.client_id,
+                notification_type='APPOINTMENT',
+                title=f"Your appointment on {appointment.appointment_date} needs rescheduling",
+                content=(
+                    f"{contractor.business_name} is no longer available on {appointment.appointment_date}. "
+                    "Please choose a new time."
+                ),
+                related_object_id=appointment.id,
+                related_object_type='appointment'
+            )
+            for appointment in appointments
+        ])
+        notify_users(appointment.client_id for appointment in appointments)
+        invalidate_badges([contractor.user_id] + [appointment.client_id for appointment in appointments])
+
+        # One external notification per client, about their earliest affected
+        # appointment, rendered from the rows as they are after the update
+        client_appointments = {}
+        rescheduled = Appointment.objects.filter(
+            id__in=[appointment.id for appointment in appointments]
+        ).select_related('client', 'contractor').order_by('appointment_date', 'start_time')
+        for appointment in rescheduled:
+            client_appointments.setdefault(appointment.client_id, []).append(appointment)
+        notify(
+            list(client_appointments),
+            'appointment_status_change',
+            notification_type='APPOINTMENT',
+            channels=EXTERNAL_CHANNELS,
+            user_contexts={
+                client_id: {'appointment': client_list[0], 'appointments': client_list}
+                for client_id, client_list in client_appointments.items()
+            }
+        )
+
+    return summary
@@ -6,7 +6,9 @@ from .views import (
     AvailabilitySlotViewSet,
     UnavailableDateViewSet,
     AppointmentViewSet,
-    AppointmentNoteViewSet
+    AppointmentNoteViewSet,
+    CalendarFeedViewSet,
+    CalendarFeedICSView
 )
 
 # Create a router for main viewsets
@@ -14,6 +16,7 @@ router = DefaultRouter()
 router.register(r'availability-slots', AvailabilitySlotViewSet, basename='availability-slot')
 router.register(r'unavailable-dates', UnavailableDateViewSet, basename='unavailable-date')
 router.register(r'appointments', AppointmentViewSet, basename='appointment')
+router.register(r'calendar-feed', CalendarFeedViewSet, basename='calendar-feed')
 
 # Create a nested router for appointment notes
 appointment_router = routers.NestedDefaultRouter(router, r'appointments', lookup='appointment')
@@ -22,4 +25,5 @@ appointment_router.register(r'notes', AppointmentNoteViewSet, basename='appointm
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(appointment_router.urls)),
+    path('calendar/<str:token>.ics', CalendarFeedICSView.as_view(), name='calendar-feed-ics'),
 ]
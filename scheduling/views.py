@@ -1,19 +1,33 @@
+import secrets
+from datetime import timedelta
+
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import AvailabilitySlot, UnavailableDate, Appointment, AppointmentNote
+from .calendar_import import import_unavailability
+from .ics import stream_calendar
+from .models import AvailabilitySlot, UnavailableDate, Appointment, AppointmentNote, CalendarFeed
 from .serializers import (
     AvailabilitySlotSerializer,
     UnavailableDateSerializer,
     AppointmentSerializer,
     AppointmentCreateSerializer,
     AppointmentUpdateSerializer,
-    AppointmentNoteSerializer
+    AppointmentNoteSerializer,
+    CalendarImportSerializer
 )
+from .unavailability import apply_unavailability, preview_unavailability_impact
 from users.permissions import IsOwnerOrAdmin
 from contractors.models import ContractorProfile
 
@@ -83,6 +97,91 @@ class UnavailableDateViewSet(viewsets.ModelViewSet):
         # For clients, return unavailable dates for all contractors
         return UnavailableDate.objects.all()
 
+    def resolve_contractor(self, requested=None):
+        """
+        Return the contractor an unavailable date may be written for.
+
+        Admins may act on any contractor; contractors only on their own profile.
+        Returns None when the requesting user may not act on the contractor.
+        """
+        user = self.request.user
+        if user.is_admin:
+            return requested
+        contractor = getattr(user, 'contractor_profile', None)
+        if contractor is None or (requested is not None and requested.pk != contractor.pk):
+            return None
+        return contractor
+
+    def create(self, request, *args, **kwargs):
+        """Create an unavailable date and reschedule the appointments it affects"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        contractor = self.resolve_contractor(serializer.validated_data['contractor'])
+        if contractor is None:
+            return Response(
+                {'detail': 'You can only manage your own unavailable dates'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        with transaction.atomic():
+            unavailable_date = serializer.save(contractor=contractor)
+            impact = apply_unavailability(
+                contractor,
+                [unavailable_date.date],
+                request.user,
+                reason=unavailable_date.reason
+            )
+
+        data = dict(serializer.data)
+        data['impact'] = impact
+        headers = self.get_success_headers(serializer.data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=False, methods=['post'])
+    def impact(self, request):
+        """Preview the appointments affected by an unavailable date without saving it"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        contractor = self.resolve_contractor(serializer.validated_data['contractor'])
+        if contractor is None:
+            return Response(
+                {'detail': 'You can only manage your own unavailable dates'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        impact = preview_unavailability_impact(
+            contractor,
+            [serializer.validated_data['date']]
+        )
+        return Response(impact)
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser],
+            serializer_class=CalendarImportSerializer, url_path='import-ics')
+    def import_ics(self, request):
+        """Sync unavailable dates with an uploaded ICS calendar"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if request.user.is_admin and serializer.validated_data.get('contractor'):
+            contractor = serializer.validated_data['contractor']
+        else:
+            contractor = self.resolve_contractor()
+        if contractor is None:
+            return Response(
+                {'detail': 'Only contractors can import calendars'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        result = import_unavailability(
+            contractor,
+            serializer.validated_data['file'],
+            user=request.user,
+            horizon_days=serializer.validated_data['horizon_days']
+        )
+        return Response(result)
+
 
 class AppointmentViewSet(viewsets.ModelViewSet):
     """ViewSet for managing appointments"""
@@ -245,3 +344,86 @@ class AppointmentNoteViewSet(viewsets.ModelViewSet):
             )
         
         return queryset.order_by('-created_at')
+
+
+class CalendarFeedViewSet(viewsets.ViewSet):
+    """ViewSet for managing the current user's calendar feed link"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_feed_data(self, request, feed):
+        return {
+            'url': request.build_absolute_uri(reverse('calendar-feed-ics', args=[feed.token])),
+            'created_at': feed.created_at,
+            'updated_at': feed.updated_at,
+        }
+
+    def list(self, request):
+        """Return the calendar feed link, creating it on first use"""
+        feed, created = CalendarFeed.objects.get_or_create(
+            user=request.user,
+            defaults={'token': secrets.token_urlsafe(32)}
+        )
+        return Response(self.get_feed_data(request, feed))
+
+    @action(detail=False, methods=['post'])
+    def rotate(self, request):
+        """Replace the feed token, invalidating the previous link"""
+        feed, created = CalendarFeed.objects.update_or_create(
+            user=request.user,
+            defaults={'token': secrets.token_urlsafe(32)}
+        )
+        return Response(self.get_feed_data(request, feed))
+
+
+class CalendarFeedICSView(View):
+    """
+    Serve a user's appointments as an iCalendar feed, authenticated by the feed token.
+
+    The ETag and Last-Modified headers come from a single aggregate query, so
+    unchanged polls are answered with 304 before any event rows are read.
+    This is a plain Django view rather than a DRF one: calendar clients send
+    ``Accept: text/calendar``, which DRF content negotiation would reject with 406.
+    """
+    http_method_names = ['get', 'head', 'options']
+    history_days = 90
+    chunk_size = 500
+
+    def get(self, request, token):
+        try:
+            feed = CalendarFeed.objects.select_related('user__contractor_profile').get(token=token)
+        except CalendarFeed.DoesNotExist:
+            raise Http404
+
+        user = feed.user
+        contractor_profile = getattr(user, 'contractor_profile', None)
+        since = timezone.now().date() - timedelta(days=self.history_days)
+
+        if contractor_profile is not None:
+            appointments = Appointment.objects.filter(contractor=contractor_profile)
+        else:
+            appointments = Appointment.objects.filter(client=user)
+        appointments = appointments.filter(appointment_date__gte=since)
+
+        state = appointments.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        last_modified = state['last_modified'] or feed.updated_at
+        etag = quote_etag(f"{since.isoformat()}-{state['count']}-{last_modified.timestamp()}")
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp())
+        )
+        if not_modified is not None:
+            return not_modified
+
+        events = appointments.select_related(
+            'client', 'contractor', 'service_category'
+        ).order_by('appointment_date', 'start_time').iterator(chunk_size=self.chunk_size)
+
+        response = StreamingHttpResponse(
+            stream_calendar(events, f"A-List Home Pros - {user.name}", for_contractor=contractor_profile is not None),
+            content_type='text/calendar; charset=utf-8'
+        )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        response['Cache-Control'] = 'private, max-age=300'
+        response['Content-Disposition'] = 'inline; filename="appointments.ics"'
+        return response
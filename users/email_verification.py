@@ -1,15 +1,26 @@
 """
 Email verification functionality for the A-List Home Pros platform.
+
+Tokens are signed and time-limited by default (EMAIL_VERIFICATION_MODE =
+'signed'): the token carries the user id and a hash of the user's
+verification state, signed with the secret key, so issuing one writes
+nothing and using one is a single conditional UPDATE. The hash covers the
+email address and verified flag, so a token stops working once the email is
+verified or changed. The 'stored' mode keeps the EmailVerification table,
+and tokens it issued are still accepted in signed mode until they expire.
 """
 import secrets
 from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.core import signing
 from django.utils import timezone
-from django.utils.html import strip_tags
+from django.utils.crypto import constant_time_compare, salted_hmac
 from datetime import timedelta
 
-from .models import EmailVerification
+from core.outbox import queue_email
+from .models import CustomUser, EmailVerification
+
+TOKEN_SALT = 'users.email_verification'
+EXPIRATION_DAYS = 3
 
 
 def generate_verification_token():
@@ -17,79 +28,153 @@ def generate_verification_token():
     return secrets.token_urlsafe(32)
 
 
-def send_verification_email(user):
+def verification_state_hash(user):
+    """Hash the parts of a user that a verification token must still match."""
+    return salted_hmac(
+        TOKEN_SALT, f'{user.pk}:{user.email}:{user.email_verified}', algorithm='sha256'
+    ).hexdigest()[:20]
+
+
+def make_signed_token(user):
+    """Return a signed, timestamped verification token for the user."""
+    return signing.dumps({'u': user.pk, 'h': verification_state_hash(user)}, salt=TOKEN_SALT)
+
+
+def issue_verification_token(user):
     """
-    Send a verification email to the user.
+    Return a new verification token for the user.
     
-    Args:
-        user: The user to send the verification email to.
-        
-    Returns:
-        bool: True if the email was sent successfully, False otherwise.
+    Signed mode writes nothing; stored mode creates or replaces the user's
+    EmailVerification row.
     """
-    # Create or update verification token
+    if settings.EMAIL_VERIFICATION_MODE == 'signed':
+        return make_signed_token(user)
     verification, created = EmailVerification.objects.update_or_create(
         user=user,
         defaults={
             'token': generate_verification_token(),
-            'expires_at': timezone.now() + timedelta(days=3)
+            'expires_at': timezone.now() + timedelta(days=EXPIRATION_DAYS)
         }
     )
+    return verification.token
+
+
+def send_verification_email(user):
+    """
+    Queue a verification email to the user.
     
-    # Build verification URL
-    verification_url = f"{settings.SITE_URL}/api/users/verify-email/{verification.token}/"
+    The email is rendered and sent by the outbox worker, so the caller only
+    pays for the token and the outbox insert.
     
-    # Prepare email content
-    context = {
-        'user': user,
-        'verification_url': verification_url,
-        'expiration_days': 3,
-    }
+    Args:
+        user: The user to send the verification email to.
+        
+    Returns:
+        bool: True once the email is queued.
+    """
+    token = issue_verification_token(user)
+    verification_url = f"{settings.SITE_URL}/api/users/verify-email/{token}/{user.pk}/"
     
-    html_message = render_to_string('users/email_verification.html', context)
-    plain_message = strip_tags(html_message)
+    queue_email(
+        to_email=user.email,
+        subject='Verify Your Email - A-List Home Pros',
+        template_name='users/email_verification.html',
+        context={
+            'verification_url': verification_url,
+            'expiration_days': EXPIRATION_DAYS,
+        },
+        user=user
+    )
+    return True
+
+
+def verify_signed_token(token, user_id=None):
+    """
+    Verify a signed token and mark the user's email as verified.
     
-    # Send email
+    Returns:
+        user: The verified user, None if the token is invalid or expired.
+        
+    Raises:
+        signing.BadSignature: If the token is not a signed token at all.
+    """
     try:
-        send_mail(
-            subject='Verify Your Email - A-List Home Pros',
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending verification email: {e}")
-        return False
-
-
-def verify_email_token(token):
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=timedelta(days=EXPIRATION_DAYS))
+    except signing.SignatureExpired:
+        return None
+    if user_id is not None and str(payload['u']) != str(user_id):
+        return None
+    
+    user = CustomUser.objects.filter(pk=payload['u']).only('id', 'email', 'email_verified').first()
+    if user is None or not constant_time_compare(payload['h'], verification_state_hash(user)):
+        return None
+    # The state hash includes the flag, so only an unverified user gets here
+    if not CustomUser.objects.filter(pk=user.pk, email_verified=False).update(email_verified=True):
+        return None
+    user.email_verified = True
+    return user
+
+
+def verify_stored_token(token, user_id=None):
+    """Verify a token from the EmailVerification table, deleting it once used."""
+    verification = EmailVerification.objects.select_related('user').filter(token=token).first()
+    if verification is None:
+        return None
+    if user_id is not None and str(verification.user_id) != str(user_id):
+        return None
+    
+    # Check if token is expired
+    if verification.expires_at < timezone.now():
+        return None
+    
+    # Mark user as verified
+    user = verification.user
+    user.email_verified = True
+    user.save(update_fields=['email_verified'])
+    
+    # Delete the verification token
+    verification.delete()
+    
+    return user
+
+
+def verify_email_token(token, user_id=None):
     """
     Verify an email verification token.
     
     Args:
         token: The token to verify.
+        user_id: The user id from the verification link, if any; it must
+            match the token's user.
         
     Returns:
         user: The user associated with the token if valid, None otherwise.
     """
     try:
-        verification = EmailVerification.objects.get(token=token)
-        
-        # Check if token is expired
-        if verification.expires_at < timezone.now():
-            return None
-        
-        # Mark user as verified
-        user = verification.user
-        user.email_verified = True
-        user.save()
-        
-        # Delete the verification token
-        verification.delete()
-        
-        return user
-    except EmailVerification.DoesNotExist:
-        return None
+        return verify_signed_token(token, user_id)
+    except signing.BadSignature:
+        # Issued in stored mode, or before signed tokens existed
+        return verify_stored_token(token, user_id)
+
+
+def cleanup_verification_rows(batch_size=1000, delete_all=False):
+    """
+    Delete legacy EmailVerification rows in chunks of batch_size.
+    
+    Args:
+        batch_size: Rows deleted per statement.
+        delete_all: Delete every row rather than only expired ones and
+            those of users who are already verified.
+    
+    Returns:
+        int: The number of rows deleted.
+    """
+    rows = EmailVerification.objects.all()
+    if not delete_all:
+        rows = rows.filter(expires_at__lt=timezone.now()) | rows.filter(user__email_verified=True)
+    deleted = 0
+    while True:
+        ids = list(rows.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += EmailVerification.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,18 @@
+"""
+Password hashing with a configurable cost.
+
+PASSWORD_HASH_ITERATIONS sets the PBKDF2 work factor, so login CPU cost can
+be sized for peak bursts (see the benchmark_login command). Hashes made with
+a different iteration count are upgraded transparently: Django rehashes and
+saves the password on the user's next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count from settings"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,112 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from core.benchmarks import BenchmarkRecorder, write_report
+from users.email_verification import issue_verification_token, verify_email_token
+from users.models import EmailVerification, UserRole
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'bench.invalid'
+BATCH_SIZE = 5000
+
+
+class RollbackBenchmarkData(Exception):
+    """Raised to roll back the seeded data once the benchmark has finished"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks issuing and verifying email verification tokens in stored and signed mode, '
+        'and writes p50/p95 latency and query counts to JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=10000,
+            help='Number of synthetic unverified users to seed'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=500,
+            help='Timed iterations per benchmark case'
+        )
+        parser.add_argument(
+            '--output',
+            default='email_verification_benchmark.json',
+            help='Path of the JSON report'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        # Every case needs fresh users: warmup and timed calls for each of four cases
+        num_users = max(options['users'], (iterations + 3) * 4)
+
+        self.stdout.write(f'Seeding {num_users} users...')
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                password = make_password(None)
+                User.objects.bulk_create(
+                    [
+                        User(email=f'bench-verify-{index}@{EMAIL_DOMAIN}', name=f'Bench User {index}',
+                             role=UserRole.CLIENT, password=password)
+                        for index in range(num_users)
+                    ],
+                    batch_size=BATCH_SIZE
+                )
+                users = list(User.objects.filter(
+                    email__startswith='bench-verify-', email__endswith=EMAIL_DOMAIN
+                ).order_by('id'))
+                seed_seconds = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(f'Seeded in {seed_seconds:.1f}s'))
+
+                recorder = BenchmarkRecorder()
+                self.run_benchmarks(recorder, users, iterations)
+                report = recorder.report(
+                    suite='email_verification',
+                    users=num_users,
+                    iterations=iterations,
+                    seed_seconds=round(seed_seconds, 2),
+                    rows={'email_verifications': EmailVerification.objects.count()}
+                )
+                raise RollbackBenchmarkData
+        except RollbackBenchmarkData:
+            pass
+
+        write_report(options['output'], report)
+        for name, result in report['benchmarks'].items():
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                f"{result['queries_p50']} queries"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def run_benchmarks(self, recorder, users, iterations):
+        per_case = iterations + recorder.warmup
+        for offset, mode in enumerate(['stored', 'signed']):
+            issue_users = users[offset * 2 * per_case:(offset * 2 + 1) * per_case]
+            verify_users = users[(offset * 2 + 1) * per_case:(offset * 2 + 2) * per_case]
+            with override_settings(EMAIL_VERIFICATION_MODE=mode):
+                recorder.measure(
+                    f'issue_{mode}',
+                    lambda index: issue_verification_token(issue_users[index % len(issue_users)]) and None,
+                    iterations
+                )
+                # Warmup spends tokens too, so every call takes the next unused one
+                pending = iter([(issue_verification_token(user), user.pk) for user in verify_users])
+                result = recorder.measure(
+                    f'verify_{mode}',
+                    lambda index: 'valid' if verify_email_token(*next(pending)) else 'invalid',
+                    iterations
+                )
+                if result['outcomes'] != {'valid': iterations}:
+                    raise CommandError(f"verify_{mode} rejected fresh tokens: {result['outcomes']}")
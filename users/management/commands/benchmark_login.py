@@ -0,0 +1,131 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.benchmarks import BenchmarkRecorder, write_report
+from users.models import UserRole
+from users.views import CustomTokenObtainPairView
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'bench.invalid'
+PASSWORD = 'Bench-login-password-1'
+BATCH_SIZE = 5000
+
+
+class RollbackBenchmarkData(Exception):
+    """Raised to roll back the seeded data once the benchmark has finished"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the login endpoint and password hashing at the configured hasher cost, '
+        'and writes p50/p95 latency, query counts and logins per CPU core to JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Number of synthetic users to seed'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Timed iterations per benchmark case'
+        )
+        parser.add_argument(
+            '--hash-iterations',
+            type=int,
+            default=None,
+            help='PBKDF2 iterations to benchmark (default: PASSWORD_HASH_ITERATIONS)'
+        )
+        parser.add_argument(
+            '--output',
+            default='login_benchmark.json',
+            help='Path of the JSON report'
+        )
+
+    def handle(self, *args, **options):
+        hash_iterations = options['hash_iterations'] or settings.PASSWORD_HASH_ITERATIONS
+        iterations = options['iterations']
+        # The rehash case needs a fresh user per call
+        num_users = max(options['users'], iterations + 3)
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=hash_iterations):
+            self.stdout.write(f'Seeding {num_users} users at {hash_iterations} PBKDF2 iterations...')
+            try:
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    # Every user shares one hash; the benchmark is about cost, not uniqueness
+                    password = make_password(PASSWORD)
+                    User.objects.bulk_create(
+                        [
+                            User(email=f'bench-login-{index}@{EMAIL_DOMAIN}', name=f'Bench User {index}',
+                                 role=UserRole.CLIENT, password=password)
+                            for index in range(num_users)
+                        ],
+                        batch_size=BATCH_SIZE
+                    )
+                    self.emails = list(User.objects.filter(
+                        email__startswith='bench-login-', email__endswith=EMAIL_DOMAIN
+                    ).order_by('id').values_list('email', flat=True))
+                    seed_seconds = time.perf_counter() - started
+
+                    recorder = BenchmarkRecorder()
+                    self.run_benchmarks(recorder, password, iterations)
+                    p50_seconds = recorder.results['login']['p50_ms'] / 1000
+                    report = recorder.report(
+                        suite='login',
+                        users=num_users,
+                        iterations=iterations,
+                        hash_iterations=hash_iterations,
+                        seed_seconds=round(seed_seconds, 2),
+                        # Hashing is CPU bound, so one core serves about 1 / p50 logins a second
+                        logins_per_core_per_second=round(1 / p50_seconds, 1) if p50_seconds else None
+                    )
+                    raise RollbackBenchmarkData
+            except RollbackBenchmarkData:
+                pass
+
+        write_report(options['output'], report)
+        for name, result in report['benchmarks'].items():
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                f"{result['queries_p50']} queries"
+            )
+        self.stdout.write(f"About {report['logins_per_core_per_second']} logins per second per core")
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def run_benchmarks(self, recorder, password, iterations):
+        factory = APIRequestFactory()
+        view = CustomTokenObtainPairView.as_view()
+
+        def login(email, password=PASSWORD):
+            request = factory.post('/api/users/token/', {'email': email, 'password': password}, format='json')
+            response = view(request)
+            return 'ok' if response.status_code == 200 else str(response.status_code)
+
+        recorder.measure('check_password', lambda index: check_password(PASSWORD, password) and None, iterations)
+        recorder.measure('login', lambda index: login(self.emails[index % len(self.emails)]), iterations)
+        recorder.measure(
+            'login_wrong_password',
+            lambda index: login(self.emails[index % len(self.emails)], 'wrong-password'),
+            iterations
+        )
+
+        # Users whose hash predates the configured cost pay a rehash and UPDATE once
+        stale_iterations = max(settings.PASSWORD_HASH_ITERATIONS // 2, 1)
+        User.objects.filter(email__in=self.emails).update(
+            password=PBKDF2PasswordHasher().encode(PASSWORD, PBKDF2PasswordHasher().salt(), stale_iterations)
+        )
+        fresh_emails = iter(self.emails)
+        recorder.measure('login_rehash', lambda index: login(next(fresh_emails)), iterations)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from users.email_verification import cleanup_verification_rows
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired or used legacy email verification rows in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per statement'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Delete every stored token, e.g. once signed tokens have been in use for their lifetime'
+        )
+
+    def handle(self, *args, **options):
+        deleted = cleanup_verification_rows(options['batch_size'], delete_all=options['all'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} email verification rows'))
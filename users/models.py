@@ -75,16 +75,6 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
-
-class EmailVerification(TimeStampedModel):
-    """Model to store email verification tokens."""
-    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='email_verification')
-    token = models.CharField(max_length=100, unique=True)
-    expires_at = models.DateTimeField()
-    
-    def __str__(self):
-        return f"Email verification for {self.user.email}"
-
     @property
     def is_admin(self):
         return self.role == UserRole.ADMIN
@@ -96,3 +86,13 @@ class EmailVerification(TimeStampedModel):
     @property
     def is_client(self):
         return self.role == UserRole.CLIENT
+
+
+class EmailVerification(TimeStampedModel):
+    """Model to store email verification tokens."""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='email_verification')
+    token = models.CharField(max_length=100, unique=True)
+    expires_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Email verification for {self.user.email}"
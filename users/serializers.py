@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from .models import UserRole
@@ -16,6 +17,17 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'is_verified', 'date_joined')
 
 
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Token pair serializer that also returns the authenticated user
+    """
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # self.user is the instance authenticate() already loaded
+        data['user'] = UserSerializer(self.user).data
+        return data
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
     Serializer for user registration
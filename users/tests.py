@@ -1,3 +1,147 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import OutboundEmail
+from .email_verification import EXPIRATION_DAYS, issue_verification_token, verify_email_token
+from .models import EmailVerification, UserRole
+
+User = get_user_model()
+
+
+class EmailVerificationTests(APITestCase):
+    """Signed verification tokens work once, for one user, until they expire"""
+
+    def setUp(self):
+        self.user = self.create_user('client@example.com')
+
+    def create_user(self, email):
+        return User.objects.create_user(
+            email=email, name='Client', phone_number='1', password='pw12345!X', role=UserRole.CLIENT
+        )
+
+    def verify(self, token, user):
+        return self.client.get(reverse('verify_email', args=[token, user.pk]))
+
+    def test_signed_token_verifies(self):
+        with self.assertNumQueries(0):
+            token = issue_verification_token(self.user)
+
+        response = self.verify(token, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.email_verified)
+
+    def test_token_cannot_be_replayed(self):
+        token = issue_verification_token(self.user)
+        self.verify(token, self.user)
+
+        response = self.verify(token, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_token_is_rejected(self):
+        token = issue_verification_token(self.user)
+        later = time.time() + (EXPIRATION_DAYS + 1) * 24 * 60 * 60
+
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            response = self.verify(token, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.email_verified)
+
+    def test_tampered_token_is_rejected(self):
+        token = issue_verification_token(self.user)
+        tampered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+
+        self.assertIsNone(verify_email_token(tampered, self.user.pk))
+        self.assertIsNone(verify_email_token(token, self.create_user('other@example.com').pk))
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.email_verified)
+
+    def test_token_stops_working_when_the_email_changes(self):
+        token = issue_verification_token(self.user)
+        self.user.email = 'new@example.com'
+        self.user.save()
+
+        self.assertIsNone(verify_email_token(token, self.user.pk))
+
+    def test_stored_tokens_are_still_accepted(self):
+        with override_settings(EMAIL_VERIFICATION_MODE='stored'):
+            token = issue_verification_token(self.user)
+
+        response = self.verify(token, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(EmailVerification.objects.exists())
+
+    def test_registration_queues_the_email(self):
+        response = self.client.post(reverse('register'), {
+            'email': 'new@example.com', 'name': 'New', 'phone_number': '1', 'role': UserRole.CLIENT,
+            'password': 'Str0ng-Passw0rd!', 'password2': 'Str0ng-Passw0rd!',
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(OutboundEmail.objects.get().to_email, 'new@example.com')
+        self.assertFalse(EmailVerification.objects.exists())
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class PasswordRehashTests(APITestCase):
+    """Logging in upgrades hashes made with another work factor"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='client@example.com', name='Client', phone_number='1', password='pw12345!X', role=UserRole.CLIENT
+        )
+
+    def set_hash(self, encoded):
+        User.objects.filter(pk=self.user.pk).update(password=encoded)
+
+    def login(self, password='pw12345!X'):
+        return self.client.post(
+            reverse('token_obtain_pair'), {'email': self.user.email, 'password': password}, format='json'
+        )
+
+    def stored_hash(self):
+        self.user.refresh_from_db()
+        return self.user.password
+
+    def test_new_passwords_use_the_configured_iterations(self):
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_rehashes_an_outdated_iteration_count(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=500):
+            self.set_hash(make_password('pw12345!X'))
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$500$'))
+
+        response = self.login()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1000$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_login_upgrades_legacy_hashers(self):
+        self.set_hash(make_password('pw12345!X', hasher='pbkdf2_sha1'))
+
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1000$'))
+
+    def test_failed_login_keeps_the_old_hash(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=500):
+            self.set_hash(make_password('pw12345!X'))
+        old_hash = self.stored_hash()
+
+        response = self.login('wrong-password')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.stored_hash(), old_hash)
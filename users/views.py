@@ -9,7 +9,8 @@ from .serializers import (
     UserRegistrationSerializer, 
     PasswordChangeSerializer,
     UserUpdateSerializer,
-    AdminUserUpdateSerializer
+    AdminUserUpdateSerializer,
+    CustomTokenObtainPairSerializer
 )
 from .permissions import IsAdmin, IsOwnerOrAdmin
 from .email_verification import send_verification_email, verify_email_token
@@ -44,6 +45,8 @@ class RegisterView(generics.CreateAPIView):
 
 
 class VerifyEmailView(APIView):
+    permission_classes = [permissions.AllowAny]
+
     def get(self, request, *args, **kwargs):
         token = kwargs.get('token')
         user_id = kwargs.get('user_id')
@@ -98,13 +101,5 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        
-        if response.status_code == 200:
-            # Add user info to response
-            user = User.objects.get(email=request.data['email'])
-            user_data = UserSerializer(user).data
-            response.data['user'] = user_data
-            
-        return response
+    """Obtain a token pair together with the user's profile"""
+    serializer_class = CustomTokenObtainPairSerializer